@@ -21,3 +21,166 @@ GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID")
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
 # CORS settings
+
+# Concurrency
+# Threads used for CPU-bound model inference (torch releases the GIL during forward passes)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# Threads used to run blocking pymongo calls off the event loop
+MONGO_IO_WORKERS = int(os.getenv("MONGO_IO_WORKERS", "8"))
+# Threads used for geocoding, which can block for seconds on Nominatim's 1 request/second limit
+GEOCODE_WORKERS = int(os.getenv("GEOCODE_WORKERS", "2"))
+# Timeout (seconds) for outbound HTTP calls such as Serper
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# Enrichment cache (summaries / emotions / embeddings)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ITEMS = int(os.getenv("CACHE_MAX_ITEMS", "10000"))
+# SQLite file for the persistent tier; set to an empty string to keep the cache in memory only
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", ".cache/enrichment.sqlite3")
+
+# Serper response cache
+# Results younger than SERPER_CACHE_TTL seconds are served as-is; for a further
+# SERPER_STALE_TTL seconds they are served stale while one background refresh runs.
+SERPER_CACHE_TTL = float(os.getenv("SERPER_CACHE_TTL", "60"))
+SERPER_STALE_TTL = float(os.getenv("SERPER_STALE_TTL", "300"))
+SERPER_CACHE_MAX_ITEMS = int(os.getenv("SERPER_CACHE_MAX_ITEMS", "1000"))
+
+# Serper client
+SERPER_MAX_RETRIES = int(os.getenv("SERPER_MAX_RETRIES", "3"))
+SERPER_BACKOFF_BASE = float(os.getenv("SERPER_BACKOFF_BASE", "0.5"))
+SERPER_BACKOFF_MAX = float(os.getenv("SERPER_BACKOFF_MAX", "8"))
+SERPER_MAX_CONNECTIONS = int(os.getenv("SERPER_MAX_CONNECTIONS", "20"))
+# Coverage per /query: results per page x pages, fetched concurrently
+SERPER_NUM_RESULTS = int(os.getenv("SERPER_NUM_RESULTS", "10"))
+SERPER_PAGES = int(os.getenv("SERPER_PAGES", "1"))
+
+# Vector search backend: "atlas" ($vectorSearch) or "local" (in-process IVF index)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "atlas").lower()
+VECTOR_INDEX_PATH = os.getenv("VECTOR_INDEX_PATH", ".cache/vector_index")
+VECTOR_INDEX_NLIST = int(os.getenv("VECTOR_INDEX_NLIST", "64"))
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+# Persist the local index after this many incremental inserts (and on shutdown)
+VECTOR_INDEX_SAVE_EVERY = int(os.getenv("VECTOR_INDEX_SAVE_EVERY", "500"))
+
+# Atlas $vectorSearch candidate sizing (see mongo_vector.num_candidates_for)
+VECTOR_CANDIDATES_PER_RESULT = int(os.getenv("VECTOR_CANDIDATES_PER_RESULT", "20"))
+VECTOR_MAX_CANDIDATES = int(os.getenv("VECTOR_MAX_CANDIDATES", "10000"))
+# Locations with at most this many documents are searched exactly (ENN)
+VECTOR_EXACT_THRESHOLD = int(os.getenv("VECTOR_EXACT_THRESHOLD", "1000"))
+# Seconds a per-location document count is reused before re-counting
+VECTOR_CARDINALITY_TTL = float(os.getenv("VECTOR_CARDINALITY_TTL", "300"))
+
+# How embeddings are written to MongoDB: "array" (BSON doubles), "float32" or "int8"
+# (packed BSON binary vectors; see utils/vector_codec.py)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "array").lower()
+
+# Cross-request dynamic batching for emotion classification: queued texts from all
+# in-flight requests are flushed together at CLASSIFY_MAX_BATCH items or after
+# CLASSIFY_MAX_WAIT_MS, whichever comes first
+CLASSIFY_BATCHING = os.getenv("CLASSIFY_BATCHING", "true").lower() == "true"
+CLASSIFY_MAX_BATCH = int(os.getenv("CLASSIFY_MAX_BATCH", "32"))
+CLASSIFY_MAX_WAIT_MS = float(os.getenv("CLASSIFY_MAX_WAIT_MS", "5"))
+# Max padded tokens (rows x longest row) per classification forward pass; inputs are
+# sorted by length and chunked so one long text never pads a whole batch
+CLASSIFY_TOKEN_BUDGET = int(os.getenv("CLASSIFY_TOKEN_BUDGET", "8192"))
+
+# Local model inference backend: "torch" (fp32 reference), "int8" (torch dynamic
+# quantization), "onnx" or "onnx-int8" (ONNX Runtime); see utils/inference_backend.py.
+# EMOTION_BACKEND / EMBEDDING_BACKEND override it per model.
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+EMOTION_BACKEND = os.getenv("EMOTION_BACKEND", INFERENCE_BACKEND).lower()
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", INFERENCE_BACKEND).lower()
+# Exported ONNX graphs are written here once and reused
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", ".cache/onnx")
+# Hub ids or local paths of the local models (e.g. a tiny random model for tests)
+EMOTION_MODEL = os.getenv("EMOTION_MODEL", "boltuix/bert-emotion")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "sshleifer/distilbart-cnn-12-6")
+
+# Summarization routing by approximate token count (words + punctuation marks):
+# texts up to SUMMARY_PASSTHROUGH_TOKENS are kept as-is, texts up to
+# SUMMARY_ABSTRACTIVE_TOKENS get an extractive summary of SUMMARY_EXTRACTIVE_SENTENCES
+# sentences, and only longer ones reach the abstractive model (Gemini / distilbart)
+SUMMARY_PASSTHROUGH_TOKENS = int(os.getenv("SUMMARY_PASSTHROUGH_TOKENS", "80"))
+SUMMARY_ABSTRACTIVE_TOKENS = int(os.getenv("SUMMARY_ABSTRACTIVE_TOKENS", "400"))
+SUMMARY_EXTRACTIVE_SENTENCES = int(os.getenv("SUMMARY_EXTRACTIVE_SENTENCES", "3"))
+
+# Gemini summarization: concurrent calls per process, token-bucket rate limit
+# (sustained requests/second and burst, split across parallel ingest workers),
+# per-item retries with jittered backoff
+GEMINI_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8"))
+GEMINI_RPS = float(os.getenv("GEMINI_RPS", "5"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "5"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "30"))
+# Vertex AI endpoint override; an http:// URL (e.g. a local fake) is called without credentials
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+# Summarize items Gemini still fails on with the local model (loads distilbart on first use)
+SUMMARY_LOCAL_FALLBACK = os.getenv("SUMMARY_LOCAL_FALLBACK", "true").lower() == "true"
+
+# Warm up Mongo and the models in the background when the API starts (progress at
+# GET /ready); with false everything loads on first use
+WARM_UP_ON_STARTUP = os.getenv("WARM_UP_ON_STARTUP", "true").lower() == "true"
+
+# Embedding dimensionality reduction (see utils/dim_reduction.py). EMBEDDING_DIMS=0 keeps
+# full width; otherwise vectors are cut to that width by "truncate" (Matryoshka models)
+# or "pca" (projection fitted with `python -m app.db.schema_setup --fit-pca`)
+EMBEDDING_DIMS = int(os.getenv("EMBEDDING_DIMS", "0"))
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "truncate").lower()
+
+# Emotion rollups (see services/emotion_rollups.py): time buckets maintained per
+# location on every insert; empty disables them. The timeline endpoint reads at most
+# TIMELINE_MAX_BUCKETS buckets per request
+ROLLUP_GRANULARITIES = [g.strip() for g in os.getenv("ROLLUP_GRANULARITIES", "hour,day").split(",") if g.strip()]
+TIMELINE_MAX_BUCKETS = int(os.getenv("TIMELINE_MAX_BUCKETS", "1000"))
+
+# Geocoding (see utils/geo_utils.py): "nominatim" or "static" (a JSON file at
+# GEOCODER_PLACES_PATH mapping location -> {latitude, longitude, display_name}).
+# Results are cached persistently; "not found" answers for GEOCODE_NEGATIVE_TTL seconds
+GEOCODER = os.getenv("GEOCODER", "nominatim").lower()
+GEOCODER_PLACES_PATH = os.getenv("GEOCODER_PLACES_PATH", "")
+GEOCODER_USER_AGENT = os.getenv("GEOCODER_USER_AGENT", "live_sentient_app")
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL", "86400"))
+# Timeouts and service errors are cached for GEOCODE_ERROR_TTL seconds, so an outage
+# costs one slow lookup per place rather than one per request
+GEOCODE_ERROR_TTL = float(os.getenv("GEOCODE_ERROR_TTL", "60"))
+# The geocode cache does not follow CACHE_ENABLED: it is always on, keeps up to
+# GEOCODE_CACHE_MAX_ITEMS in memory and persists to GEOCODE_CACHE_PATH (empty: memory only)
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", ".cache/geocode.sqlite3")
+GEOCODE_CACHE_MAX_ITEMS = int(os.getenv("GEOCODE_CACHE_MAX_ITEMS", "10000"))
+# POST /query waits at most GEOCODE_WAIT seconds for the geocode before storing; a
+# later answer is set on the stored documents when it arrives
+GEOCODE_WAIT = float(os.getenv("GEOCODE_WAIT", "1"))
+# Default radius of GET /news/near
+NEAR_RADIUS_KM = float(os.getenv("NEAR_RADIUS_KM", "50"))
+
+# Near-duplicate detection before enrichment (see utils/dedup.py): articles whose
+# MinHash-estimated Jaccard similarity reaches DEDUP_THRESHOLD reuse the canonical
+# copy's enrichment. Ingest keeps up to DEDUP_MAX_ITEMS signatures per worker
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_MAX_ITEMS = int(os.getenv("DEDUP_MAX_ITEMS", "250000"))
+
+# Logging (see utils/log.py): level of the "app" logger, and at most LOG_RATE_LIMIT
+# records per message every LOG_RATE_WINDOW seconds (0 disables the limit)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_RATE_LIMIT = int(os.getenv("LOG_RATE_LIMIT", "10"))
+LOG_RATE_WINDOW = float(os.getenv("LOG_RATE_WINDOW", "60"))
+
+# POST /query/stream enriches distinct articles in chunks of this many and emits
+# each chunk as soon as it is done; 1 streams article by article, larger values batch
+# more per model call
+QUERY_STREAM_CHUNK = int(os.getenv("QUERY_STREAM_CHUNK", "4"))
+
+# Background enrichment jobs (see services/job_queue.py). With JOB_QUEUE "memory" or
+# "sqlite" (kept in JOB_DB_PATH), POST /query answers 202 with a job id once the
+# headlines are fetched and JOB_WORKERS jobs run at a time. More than
+# JOB_QUEUE_MAX_DEPTH waiting jobs get 429; results stay at GET /jobs/{id} for
+# JOB_RESULT_TTL seconds. Empty keeps enrichment inline
+JOB_QUEUE = os.getenv("JOB_QUEUE", "").lower()
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "100"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", ".cache/jobs.sqlite3")
@@ -8,11 +8,16 @@ load_dotenv(dotenv_path=".env.test" if os.getenv("TESTING") else ".env")
 ATLAS_URI = os.getenv("ATLAS_URI")  # from .env
 DB_NAME = os.getenv("DB")
 COLLECTION_NAME = os.getenv("COLLECTION")
+# Fitted embedding projections (PCA) live next to the news collection
+PROJECTIONS_COLLECTION_NAME = f"{COLLECTION_NAME}_projections"
+# Per-location emotion rollups (see services/emotion_rollups.py)
+ROLLUPS_COLLECTION_NAME = f"{COLLECTION_NAME}_emotion_rollups"
 
 
 class AtlasClient():
    def __init__ (self, ATLAS_URI, DB_NAME):
-       self.mongodb_client = MongoClient(ATLAS_URI)
+       # connect=False: no network until the first operation, so importing is instant
+       self.mongodb_client = MongoClient(ATLAS_URI, connect=False)
        self.database = self.mongodb_client[DB_NAME]
    ## A quick way to test if we can connect to Atlas instance
    def ping (self):
@@ -26,6 +31,5 @@ class AtlasClient():
        return items
    
 atlas_client = AtlasClient (ATLAS_URI, DB_NAME)
-atlas_client.ping()
-print ('Connected to Atlas instance! We are good to go!')
+# Connectivity is checked by the app's warm-up (see /ready), not at import time
 
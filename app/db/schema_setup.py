@@ -1,5 +1,17 @@
 # schema_setup.py
-from app.db.mongo_client import atlas_client, COLLECTION_NAME
+import argparse
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
+
+from app.config import EMBEDDING_DIMS, EMBEDDING_STORAGE
+from app.db.mongo_client import atlas_client, COLLECTION_NAME, PROJECTIONS_COLLECTION_NAME
+from app.services.emotion_rollups import create_rollup_indexes, rollups, update_rollups
+from app.utils.dim_reduction import PCAReducer, projection_key, save_projection
+from app.utils.geo_utils import canonical_location, geo_point, resolve_location
+from app.utils.vector_codec import FORMATS, encode_vector, decode_float32, vector_format
 db =  atlas_client.database
 
 def create_indexes():
@@ -25,13 +37,234 @@ def create_indexes():
         name="location_index"
     )
 
+    # Canonical location key: exact-match filter for vectorSearch and cardinality counts
+    collection.create_index(
+        [("location_key", 1), ("timestamp", -1)],
+        name="location_key_index"
+    )
+
+    # Coordinates of the geocoded location: radius queries (GET /news/near)
+    collection.create_index(
+        [("geo", "2dsphere")],
+        name="geo_2dsphere_index"
+    )
+
     # Optional: index on timestamp if you want timeline visualizations
     collection.create_index(
         [("timestamp", -1)],
         name="timestamp_desc_index"
     )
 
+    # Timeline reads: one rollup per (location, granularity, bucket)
+    create_rollup_indexes()
+
     print("[✓] Indexes created successfully.")
 
+
+def create_vector_index(dims: int = 384, name: str = "vector_index"):
+    """
+    Create the Atlas Vector Search index with `location_key` as a filter
+    field, which `$vectorSearch` pre-filtering requires. Only works on Atlas.
+    """
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    model = SearchIndexModel(
+        name=name,
+        type="vectorSearch",
+        definition={
+            "fields": [
+                {"type": "vector", "path": "embedding", "numDimensions": dims, "similarity": "cosine"},
+                {"type": "filter", "path": "location_key"},
+            ]
+        },
+    )
+    try:
+        collection.create_search_index(model)
+        print(f"[✓] Vector search index `{name}` requested ({dims} dims, filter: location_key).")
+    except OperationFailure as e:
+        print(f"[!] Could not create vector search index `{name}`: {e}")
+
+
+def backfill_location_keys(batch_size: int = 1000):
+    """
+    Add `location_key` to documents written before it existed.
+    """
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    cursor = collection.find(
+        {"location": {"$exists": True}, "location_key": {"$exists": False}},
+        {"location": 1},
+    )
+    ops, updated = [], 0
+    for doc in cursor:
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"location_key": canonical_location(doc["location"])}}))
+        if len(ops) >= batch_size:
+            updated += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += collection.bulk_write(ops, ordered=False).modified_count
+    print(f"[✓] Backfilled location_key on {updated} documents.")
+
+
+def backfill_geo():
+    """
+    Geocode each distinct location (through the geocode cache) and set `geo`
+    on documents that lack it.
+    """
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    locations = collection.distinct("location", {"location": {"$exists": True}, "geo": {"$exists": False}})
+    updated, unresolved = 0, []
+    for location in locations:
+        point = geo_point(resolve_location(location))
+        if point is None:
+            unresolved.append(location)
+            continue
+        updated += collection.update_many(
+            {"location": location, "geo": {"$exists": False}}, {"$set": {"geo": point}}
+        ).modified_count
+    print(f"[✓] Set geo on {updated} documents ({len(locations) - len(unresolved)}/{len(locations)} locations resolved).")
+    if unresolved:
+        print(f"[!] Could not geocode: {', '.join(unresolved[:20])}{' ...' if len(unresolved) > 20 else ''}")
+
+
+def migrate_embeddings(fmt: str, batch_size: int = 500):
+    """
+    Re-encode every stored embedding into `fmt` ("array", "float32" or "int8").
+    Documents already in the target format are left untouched.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown embedding format {fmt!r}; expected one of {FORMATS}")
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    cursor = collection.find({"embedding": {"$exists": True, "$ne": []}}, {"embedding": 1}, batch_size=batch_size)
+    ops, converted = [], 0
+    for doc in cursor:
+        if vector_format(doc["embedding"]) == fmt:
+            continue
+        values = decode_float32(doc["embedding"]).tolist()
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encode_vector(values, fmt)}}))
+        if len(ops) >= batch_size:
+            converted += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        converted += collection.bulk_write(ops, ordered=False).modified_count
+    print(f"[✓] Converted {converted} embeddings to `{fmt}`.")
+
+
+def rebuild_rollups(batch_size: int = 1000):
+    """
+    Recompute the emotion rollups from scratch from every stored article
+    with a location. Articles stored before `emotion_scores` existed count
+    with their label only.
+    """
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    rollups.delete_many({})
+    cursor = collection.find(
+        {"location": {"$exists": True}},
+        {"location": 1, "location_key": 1, "timestamp": 1, "sentiment": 1, "emotion_scores": 1},
+        batch_size=batch_size,
+    )
+    docs, articles = [], 0
+    for doc in cursor:
+        docs.append(doc)
+        if len(docs) >= batch_size:
+            update_rollups(docs)
+            articles += len(docs)
+            docs = []
+    if docs:
+        update_rollups(docs)
+        articles += len(docs)
+    print(f"[✓] Rebuilt emotion rollups from {articles} articles "
+          f"({rollups.estimated_document_count()} buckets).")
+
+
+def fit_pca(dims: int, sample: int = 20000):
+    """
+    Fit the EMBEDDING_REDUCTION=pca projection on a random sample of stored
+    full-width embeddings and save it to `<COLLECTION>_projections`.
+    Run `benchmarks/embedding_dims.py` first to pick `dims`.
+    """
+    from app.services.embeddings import model_name
+
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    cursor = collection.aggregate([
+        {"$match": {"embedding": {"$exists": True, "$ne": []}}},
+        {"$sample": {"size": sample}},
+        {"$project": {"embedding": 1}},
+    ])
+    vectors = [decode_float32(doc["embedding"]) for doc in cursor]
+    if not vectors:
+        print("[!] No stored embeddings to fit a projection on.")
+        return
+    # Skip anything already reduced
+    full_dims = max(len(v) for v in vectors)
+    vectors = [v for v in vectors if len(v) == full_dims]
+
+    reducer = PCAReducer.fit(np.stack(vectors), dims)
+    key = projection_key(model_name(), dims)
+    save_projection(atlas_client.get_collection(PROJECTIONS_COLLECTION_NAME), key, reducer)
+    print(f"[✓] Stored projection `{key}` ({full_dims} -> {dims} dims, "
+          f"{reducer.explained_variance:.1%} of variance, fitted on {len(vectors)} embeddings).")
+
+
+def reduce_stored_embeddings(batch_size: int = 500):
+    """
+    Apply the configured EMBEDDING_DIMS / EMBEDDING_REDUCTION to stored
+    embeddings wider than the target, re-encoded as EMBEDDING_STORAGE.
+    Rebuild the vector index with `--dims EMBEDDING_DIMS` afterwards.
+    """
+    from app.services.embeddings import get_reducer
+
+    reducer = get_reducer()
+    if reducer is None:
+        print("[!] EMBEDDING_DIMS is 0; nothing to reduce.")
+        return
+    collection = atlas_client.get_collection(COLLECTION_NAME)
+    cursor = collection.find({"embedding": {"$exists": True, "$ne": []}}, {"embedding": 1}, batch_size=batch_size)
+    ids, vectors, reduced = [], [], 0
+
+    def flush():
+        rows = reducer(np.stack(vectors)).tolist()
+        ops = [UpdateOne({"_id": _id}, {"$set": {"embedding": encode_vector(v, EMBEDDING_STORAGE)}})
+               for _id, v in zip(ids, rows)]
+        return collection.bulk_write(ops, ordered=False).modified_count
+
+    for doc in cursor:
+        values = decode_float32(doc["embedding"])
+        if len(values) <= reducer.dims:
+            continue
+        ids.append(doc["_id"])
+        vectors.append(values)
+        if len(ids) >= batch_size:
+            reduced += flush()
+            ids, vectors = [], []
+    if ids:
+        reduced += flush()
+    print(f"[✓] Reduced {reduced} embeddings to {reducer.dims} dims ({reducer.method}).")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create MongoDB indexes and run schema backfills.")
+    parser.add_argument("--vector-index", action="store_true", help="Also create the Atlas vector search index")
+    parser.add_argument("--dims", type=int, default=EMBEDDING_DIMS or 384,
+                        help="Embedding width (384 MiniLM, 3072 Gemini, or EMBEDDING_DIMS when reduced)")
+    parser.add_argument("--backfill", action="store_true", help="Add location_key to existing documents")
+    parser.add_argument("--backfill-geo", action="store_true", help="Geocode locations and set `geo` on existing documents")
+    parser.add_argument("--migrate-embeddings", choices=FORMATS, help="Re-encode stored embeddings to this format")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="Recompute emotion rollups from all articles")
+    parser.add_argument("--fit-pca", type=int, metavar="DIMS", help="Fit and store a PCA projection to DIMS")
+    parser.add_argument("--reduce-embeddings", action="store_true",
+                        help="Reduce stored embeddings to EMBEDDING_DIMS with EMBEDDING_REDUCTION")
+    args = parser.parse_args()
+
     create_indexes()
+    if args.vector_index:
+        create_vector_index(args.dims)
+    if args.backfill:
+        backfill_location_keys()
+    if args.backfill_geo:
+        backfill_geo()
+    if args.migrate_embeddings:
+        migrate_embeddings(args.migrate_embeddings)
+    if args.rebuild_rollups:
+        rebuild_rollups()
+    if args.fit_pca:
+        fit_pca(args.fit_pca)
+    if args.reduce_embeddings:
+        reduce_stored_embeddings()
@@ -1,9 +1,23 @@
 # main.py
 
-from fastapi import FastAPI
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import query
+from app.routes import query, cache, inference, health, timeline, nearby, metrics
+from app.config import VECTOR_BACKEND, WARM_UP_ON_STARTUP
+from app.db.mongo_client import atlas_client
 from app.db.schema_setup import create_indexes
+from app.services import summarizer, sentiment, embeddings
+from app.services.google_search import close_async_client
+from app.services.mongo_vector import get_local_index, save_local_index
+from app.utils.async_utils import run_inference, run_io, shutdown_executors
+from app.utils.log import get_logger
+from app.utils.metrics import HTTP_REQUEST_SECONDS
+from app.utils.readiness import warm_up
+
+logger = get_logger(__name__)
 
 app = FastAPI(
     title="LiveSentient AI Agent",
@@ -22,13 +36,85 @@ app.add_middleware(
 
 # Include all app routes
 app.include_router(query.router, prefix="")
+app.include_router(cache.router, prefix="")
+app.include_router(inference.router, prefix="")
+app.include_router(health.router, prefix="")
+app.include_router(timeline.router, prefix="")
+app.include_router(nearby.router, prefix="")
+app.include_router(metrics.router, prefix="")
+
+
+# Latency per route template (not per raw path, which would explode label cardinality)
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        _observe_latency(request, start, 500)
+        raise
+
+    # call_next returns once the headers are ready; observe when the body is
+    # done, which for POST /query/stream is after the last event
+    body = response.body_iterator
+
+    async def observed_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            _observe_latency(request, start, response.status_code)
+
+    response.body_iterator = observed_body()
+    return response
+
+
+def _observe_latency(request: Request, start: float, status: int) -> None:
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=status,
+    )
 
-# Optional: Set up indexes on startup
+
+def _warm_mongo():
+    atlas_client.ping()
+    logger.info("Connected to Atlas instance.")
+    logger.info("Running MongoDB index setup...")
+    create_indexes()
+
+
+_warm_up_task = None
+
+# Warm-up runs in the background; GET /ready reports progress per component
 @app.on_event("startup")
 async def startup_event():
-    print("[🔧] Running MongoDB index setup...")
-    create_indexes()
-    print("[✅] LiveSentient backend is ready.")
+    global _warm_up_task
+    if query.job_queue is not None:
+        await query.job_queue.start()
+    if not WARM_UP_ON_STARTUP:
+        logger.info("LiveSentient backend is up; models load on first use.")
+        return
+    components = [
+        ("mongo", _warm_mongo, run_io),
+        ("summarizer", summarizer.warm_up, run_inference),
+        ("emotion", sentiment.warm_up, run_inference),
+        ("embeddings", embeddings.warm_up, run_inference),
+    ]
+    if VECTOR_BACKEND == "local":
+        components.append(("vector_index", get_local_index, run_io))
+    _warm_up_task = asyncio.create_task(warm_up(components))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if query.job_queue is not None:
+        await query.job_queue.stop()
+    await close_async_client()
+    save_local_index()
+    shutdown_executors()
 
 
 @app.get("/")
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.utils.cache import cache_stats
+from app.services.google_search import news_cache
+
+router = APIRouter()
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """
+    Hit/miss counters of the enrichment caches (`misses` is the number of
+    texts that actually went through a model) and of the Serper response
+    cache (`misses` is the number of paid upstream lookups).
+    """
+    return {**cache_stats(), "serper": news_cache.stats()}
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.utils.readiness import readiness
+
+router = APIRouter()
+
+@router.get("/ready")
+def get_ready():
+    """
+    Readiness probe: 200 once Mongo and the models have warmed up, 503 (with
+    per-component status, timings and errors) until then.
+    """
+    report = readiness()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
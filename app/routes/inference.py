@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from app.services.sentiment import batching_stats
+from app.services.summarizer import gemini_stats, routing_stats
+
+router = APIRouter()
+
+@router.get("/inference/stats")
+def get_inference_stats():
+    """
+    Dynamic batching scheduler stats for emotion classification (queue
+    depth, batch-size histogram, wait added to each request) and per-route
+    summarization counts and latency, plus the Gemini executor's retries,
+    throttling and achieved requests/second.
+    """
+    return {"emotion": batching_stats(), "summarization": routing_stats(), "gemini": gemini_stats()}
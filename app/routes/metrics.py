@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Response
+from app.routes.query import job_queue
+from app.services.google_search import news_cache
+from app.services.sentiment import batching_stats
+from app.services.summarizer import routing_stats
+from app.utils.cache import cache_stats
+from app.utils.metrics import CONTENT_TYPE, register_collector, render
+
+router = APIRouter()
+
+
+def _cache_metrics():
+    hits, misses = [], []
+    for name, stats in cache_stats().items():
+        hits.append(({"cache": name, "tier": "memory"}, stats["memory_hits"]))
+        hits.append(({"cache": name, "tier": "disk"}, stats["disk_hits"]))
+        misses.append(({"cache": name}, stats["misses"]))
+    serper = news_cache.stats()
+    hits.append(({"cache": "serper", "tier": "fresh"}, serper["hits"]))
+    hits.append(({"cache": "serper", "tier": "stale"}, serper["stale_hits"]))
+    misses.append(({"cache": "serper"}, serper["misses"]))
+    yield "livesentient_cache_hits_total", "counter", "Cache hits by cache and tier.", hits
+    yield "livesentient_cache_misses_total", "counter", "Cache misses (model calls or upstream requests).", misses
+
+
+def _inference_metrics():
+    routes = routing_stats()
+    yield ("livesentient_summary_items_total", "counter", "Texts summarized per route.",
+           [({"route": route}, stats["items"]) for route, stats in routes.items()])
+    yield ("livesentient_emotion_queue_depth", "gauge", "Texts waiting in the emotion batching queue.",
+           [({}, batching_stats()["queue_depth"])])
+
+
+def _job_metrics():
+    if job_queue is None:
+        return
+    stats = job_queue.stats()
+    yield ("livesentient_jobs", "gauge", "Background jobs by status (stored, so pollable).",
+           [({"status": status}, n) for status, n in stats["jobs"].items()])
+    yield ("livesentient_jobs_processed_total", "counter", "Jobs run by this process's workers, by outcome.",
+           [({"outcome": "completed"}, stats["completed"]), ({"outcome": "failed"}, stats["failed"])])
+    yield ("livesentient_jobs_rejected_total", "counter", "POST /query requests rejected with 429.",
+           [({}, stats["rejected"])])
+
+
+register_collector(_cache_metrics)
+register_collector(_inference_metrics)
+register_collector(_job_metrics)
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Prometheus scrape endpoint: stage spans of POST /query, HTTP latency,
+    model batch sizes and latency, Serper status codes, Mongo latency and
+    cache hit/miss counters, for this process.
+    """
+    return Response(render(), media_type=CONTENT_TYPE)
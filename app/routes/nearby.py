@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.config import NEAR_RADIUS_KM
+from app.services.mongo_vector import find_news_near_async
+from app.utils.async_utils import run_geocode
+from app.utils.geo_utils import resolve_location
+
+router = APIRouter()
+
+@router.get("/news/near")
+async def get_news_near(
+    location: Optional[str] = None,
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(NEAR_RADIUS_KM, gt=0, le=5000),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """
+    Latest stored events within `radius_km` of a place, given either as
+    `location` (geocoded through the persistent cache) or as `lat` / `lon`.
+    """
+    if lat is not None and lon is not None:
+        center = {"latitude": lat, "longitude": lon}
+    elif location:
+        center = await run_geocode(resolve_location, location)
+        if "error" in center:
+            raise HTTPException(status_code=404, detail=center["error"])
+    else:
+        raise HTTPException(status_code=422, detail="Pass `location` or both `lat` and `lon`.")
+
+    events = await find_news_near_async(center["longitude"], center["latitude"], radius_km, limit)
+    return {"center": center, "radius_km": radius_km, "total": len(events), "events": events}
@@ -1,71 +1,379 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import nullcontext
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
 from app.models.user_query import UserQuery
-from app.services.google_search import fetch_news
-from app.services.summarizer import summarize
-from app.services.sentiment import classify
-from app.services.embeddings import get_embedding
-from app.services.mongo_vector import insert_news_vector, vector_search_by_location
-from app.template.response_formatter import format_response
+from app.services.google_search import fetch_news_many_async
+from app.services.summarizer import summarize_batch
+from app.services.sentiment import classify_batch_async
+from app.services.embeddings import get_batch_embeddings
+from app.services.mongo_vector import (
+    content_id,
+    insert_news_vectors_async,
+    set_geo_async,
+    vector_search_by_location_async,
+)
+from app.services.emotion_rollups import update_rollups_async
+from app.services.job_queue import JobQueue, QueueFull, make_store
+from app.template.response_formatter import format_article, format_response
+from app.utils.async_utils import run_geocode, run_inference
+from app.utils.dedup import canonical_indices
+from app.utils.geo_utils import geo_point, resolve_location
+from app.utils.log import get_logger
+from app.utils.metrics import server_timing, span, timed
+from app.config import DEDUP_ENABLED, GEOCODE_WAIT, JOB_QUEUE, QUERY_STREAM_CHUNK, SERPER_NUM_RESULTS, SERPER_PAGES
 
 router = APIRouter()
+logger = get_logger(__name__)
+
+
+async def _run_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return await _process(payload["location"], payload["timestamp"], payload["articles"])
+
+
+# Started and stopped with the app (see main.py); None keeps enrichment inline
+job_queue = JobQueue(make_store(JOB_QUEUE), _run_job) if JOB_QUEUE else None
+
+# Late geocodes still being written (see _store); referenced so they are not collected
+_background: Set[asyncio.Task] = set()
+
 
 @router.post("/query")
-async def handle_query(user_query: UserQuery):
+async def handle_query(user_query: UserQuery, response: Response):
+    # Seconds per stage; returned as a Server-Timing header and in the stage histogram
+    timings = {}
     try:
-        timestamp = user_query.timestamp or datetime.utcnow().isoformat()
-
-        # 1. Pull live news using query
-        articles = fetch_news(user_query.location)
-        if not articles:
-            raise HTTPException(status_code=404, detail="No news found for this location.")
-
-        results = []
-        summary_vectors = []
-
-        for article in articles:
-            title = article.get("title", "")
-            description = article.get("snippet", "")
-            combined_text = f"{title}. {description}"
-
-            # 2. Summarize
-            summary = summarize(combined_text)
-
-            # 3. Classify emotion
-            sentiment_result = classify(summary)
-            sentiment = sentiment_result["emotion"]  # Only store the emotion string
-
-            # 4. Generate vector embedding
-            embedding = get_embedding(summary)
-
-            # 5. Construct document and insert into MongoDB
-            doc = {
-                "location": user_query.location,
-                "raw_title": title,
-                "raw_description": description,
-                "summary": summary,
-                "sentiment": sentiment,
-                "embedding": embedding,
-                "source_url": article.get("link", ""),
-                "timestamp": timestamp, 
-            }
-            insert_news_vector(doc)
-
-            # Store result for response + save embedding for similarity search
-            results.append(doc)
-            summary_vectors.append(embedding)
-
-        # 6. Perform similarity search on one of the vectors (e.g., first)
-        similar_past = []
-        if summary_vectors:
-            similar_past = vector_search_by_location(
-                summary_vectors[0],
-                user_query.location,
-                k=5
-            )
-
-        # 7. Format response including similar past events
-        return format_response(results, user_query.location, similar_past)
+        with span("query", timings):
+            if job_queue is not None:
+                return await _enqueue_query(user_query, timings)
+            result = await _run_query(user_query, timings)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("POST /query for %r failed", user_query.location)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        logger.debug("POST /query %r: %s", user_query.location, server_timing(timings))
+    response.headers["Server-Timing"] = server_timing(timings)
+    return result
+
 
+@router.post("/query/stream")
+async def handle_query_stream(user_query: UserQuery, request: Request):
+    """
+    Streaming form of POST /query: NDJSON by default, Server-Sent Events
+    with `Accept: text/event-stream`. Events, in order:
+
+    - `headlines`: the raw Serper articles, sent as soon as they arrive
+    - `article`: one per article (`index` into headlines) once enriched,
+      in completion order
+    - `summary`: everything POST /query returns except `articles`, sent
+      after the articles are stored and the similarity search is done
+    - `error`: replaces the rest of the stream if enrichment fails
+
+    A location without news is still a plain 404. With JOB_QUEUE set, each
+    open stream counts towards JOB_QUEUE_MAX_DEPTH, and a full queue is a
+    429 as for POST /query.
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    timings = {}
+    if job_queue is not None:
+        try:
+            await job_queue.check_capacity()
+        except QueueFull as e:
+            raise _queue_full(e)
+    try:
+        articles = await _fetch_articles(user_query.location, timings)
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("POST /query/stream for %r failed", user_query.location)
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        _stream_query(user_query, articles, timings, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        # Proxies such as nginx would otherwise hold events back until the buffer fills
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of a POST /query job: `queued`, `running`, `done` (with `result`,
+    the POST /query response) or `failed` (with `error`). Finished jobs
+    expire after JOB_RESULT_TTL seconds.
+    """
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="Job queue is disabled (JOB_QUEUE is not set).")
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "location": job["payload"]["location"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+
+async def _enqueue_query(user_query: UserQuery, timings: dict) -> JSONResponse:
+    """
+    Job mode of POST /query: fetch the headlines, queue their enrichment and
+    answer 202 with the job id (429 when the queue is full).
+    """
+    # A full queue is refused before the (paid) Serper request
+    try:
+        await job_queue.check_capacity()
+    except QueueFull as e:
+        raise _queue_full(e)
+    articles = await _fetch_articles(user_query.location, timings)
+    payload = {
+        "location": user_query.location,
+        "timestamp": user_query.timestamp or datetime.utcnow().isoformat(),
+        "articles": articles,
+    }
+    try:
+        job = await job_queue.submit(payload)
+    except QueueFull as e:
+        raise _queue_full(e)
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder({
+            "job_id": job["id"],
+            "status": job["status"],
+            "location": user_query.location.title(),
+            "headlines": _headlines(articles),
+            "poll": f"/jobs/{job['id']}",
+        }),
+        headers={"Location": f"/jobs/{job['id']}", "Server-Timing": server_timing(timings)},
+    )
+
+
+def _queue_full(e: QueueFull) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e),
+                         headers={"Retry-After": str(job_queue.retry_after())})
+
+
+async def _run_query(user_query: UserQuery, timings: dict):
+    """
+    The enrichment pipeline behind POST /query; stage durations go into `timings`.
+    """
+    timestamp = user_query.timestamp or datetime.utcnow().isoformat()
+
+    # 1. Pull live news using query
+    articles = await _fetch_articles(user_query.location, timings)
+    return await _process(user_query.location, timestamp, articles, timings)
+
+
+async def _process(location: str, timestamp: str, articles: List[Dict], timings: Optional[dict] = None):
+    """
+    Steps 2 - 8 of POST /query for already fetched articles; also the job handler.
+    """
+    combined_texts = _combined_texts(articles)
+    geocode = _start_geocode(location, timings)
+
+    # 2. Syndicated copies of one story are enriched once, via their canonical article
+    canonical = _canonical(combined_texts, timings)
+    unique = sorted(set(canonical))
+    slot = {i: n for n, i in enumerate(unique)}
+
+    # 3 - 5. Summarize, then classify and embed all distinct articles in one pass;
+    # geocode (cached) meanwhile
+    summaries, sentiment_results, embeddings = await _enrich([combined_texts[i] for i in unique], timings)
+
+    # 6. Construct documents and insert into MongoDB
+    results = []
+    for i, article in enumerate(articles):
+        n = slot[canonical[i]]
+        results.append(_build_doc(location, article, summaries[n], sentiment_results[n],
+                                  embeddings[n], timestamp))
+    await _store(results, canonical, geocode, timings)
+
+    # 7. Perform similarity search on one of the vectors (e.g., first)
+    similar_past = await _similar_past(embeddings[0] if embeddings else None, location, timings)
+
+    # 8. Format response including similar past events
+    return format_response(results, location, similar_past)
+
+
+async def _stream_query(user_query: UserQuery, articles: List[Dict], timings: dict, sse: bool):
+    location = user_query.location
+    timestamp = user_query.timestamp or datetime.utcnow().isoformat()
+    combined_texts = _combined_texts(articles)
+    geocode = _start_geocode(location, timings)
+    tasks: List[asyncio.Future] = []
+    try:
+        yield _event("headlines", {"location": location.title(), "articles": _headlines(articles)}, sse)
+
+        # Inline enrichment takes a slot of the job queue's depth while it runs
+        async with job_queue.inline() if job_queue is not None else nullcontext():
+            with span("query", timings):
+                canonical = _canonical(combined_texts, timings)
+                copies = defaultdict(list)
+                for i, c in enumerate(canonical):
+                    copies[c].append(i)
+                unique = sorted(copies)
+
+                chunks = [unique[i:i + QUERY_STREAM_CHUNK] for i in range(0, len(unique), QUERY_STREAM_CHUNK)]
+                enrichments = [asyncio.ensure_future(_enrich_chunk(chunk, combined_texts)) for chunk in chunks]
+                tasks.extend(enrichments)
+
+                results: List[Optional[Dict]] = [None] * len(articles)
+                for next_chunk in asyncio.as_completed(enrichments):
+                    chunk, (summaries, sentiment_results, embeddings) = await next_chunk
+                    for n, c in enumerate(chunk):
+                        for i in copies[c]:
+                            results[i] = _build_doc(location, articles[i], summaries[n], sentiment_results[n],
+                                                    embeddings[n], timestamp)
+                            yield _event("article", {"index": i, **format_article(results[i])}, sse)
+
+                # Same search vector as POST /query
+                await _store(results, canonical, geocode, timings)
+                similar_past = await _similar_past(results[0]["embedding"] if results else None,
+                                                   location, timings)
+
+        summary = format_response(results, location, similar_past)
+        summary.pop("articles")
+        yield _event("summary", summary, sse)
+    except Exception as e:
+        logger.exception("POST /query/stream for %r failed", location)
+        yield _event("error", {"detail": str(e)}, sse)
+    finally:
+        # The client may have gone away mid-stream
+        for task in tasks:
+            task.cancel()
+        logger.debug("POST /query/stream %r: %s", location, server_timing(timings))
+
+
+# ------------------------------------------------------------------------ #
+# Stages
+# ------------------------------------------------------------------------ #
+
+async def _fetch_articles(location: str, timings: Optional[dict]) -> List[Dict]:
+    news = await timed("fetch", fetch_news_many_async(
+        [location], num_results=SERPER_NUM_RESULTS, pages=SERPER_PAGES
+    ), timings)
+    articles = news[location]
+    if not articles:
+        raise HTTPException(status_code=404, detail="No news found for this location.")
+    return articles
+
+
+def _headlines(articles: List[Dict]) -> List[Dict]:
+    return [
+        {"index": i, "title": a.get("title", ""), "snippet": a.get("snippet", ""), "source": a.get("link", "")}
+        for i, a in enumerate(articles)
+    ]
+
+
+def _combined_texts(articles: List[Dict]) -> List[str]:
+    return [f"{a.get('title', '')}. {a.get('snippet', '')}" for a in articles]
+
+
+def _canonical(texts: List[str], timings: Optional[dict]) -> List[int]:
+    with span("dedup", timings):
+        return canonical_indices(texts) if DEDUP_ENABLED else list(range(len(texts)))
+
+
+async def _enrich(texts: List[str], timings: Optional[dict] = None, stage_prefix: str = ""):
+    """
+    (summaries, emotion results, embeddings) for `texts`, in order; emotion
+    and embeddings only need the summaries, so they run side by side.
+    """
+    summaries = await timed(f"{stage_prefix}summarize", run_inference(summarize_batch, texts), timings)
+    sentiment_results, embeddings = await asyncio.gather(
+        timed(f"{stage_prefix}classify", classify_batch_async(summaries), timings),
+        timed(f"{stage_prefix}embed", run_inference(get_batch_embeddings, summaries), timings),
+    )
+    return summaries, sentiment_results, embeddings
+
+
+async def _enrich_chunk(chunk: List[int], texts: List[str]):
+    # Timed per chunk, so kept apart from the per-request stages
+    return chunk, await _enrich([texts[i] for i in chunk], stage_prefix="stream_")
+
+
+def _build_doc(location: str, article: Dict, summary: str, sentiment_result: Dict[str, Any],
+               embedding: List[float], timestamp: str) -> Dict[str, Any]:
+    return {
+        "location": location,
+        "raw_title": article.get("title", ""),
+        "raw_description": article.get("snippet", ""),
+        "summary": summary,
+        "sentiment": sentiment_result["emotion"],
+        "emotion_scores": sentiment_result["scores"],  # Summed into the location rollups
+        "embedding": embedding,
+        "source_url": article.get("link", ""),
+        "timestamp": timestamp,
+    }
+
+
+def _start_geocode(location: str, timings: Optional[dict]) -> asyncio.Future:
+    # Runs beside enrichment; _store decides how long to wait for it
+    return asyncio.ensure_future(timed("geocode", run_geocode(resolve_location, location), timings))
+
+
+async def _store(results: List[Dict], canonical: List[int], geocode: asyncio.Future,
+                 timings: Optional[dict]) -> None:
+    """
+    Store the canonical documents and their rollups. The response waits at
+    most GEOCODE_WAIT seconds for `geocode`; documents stored without `geo`
+    get it set once the geocode finishes.
+    """
+    try:
+        place = await asyncio.wait_for(asyncio.shield(geocode), GEOCODE_WAIT)
+    except asyncio.TimeoutError:
+        place = None
+    point = geo_point(place)
+    for i, doc in enumerate(results):
+        if point:
+            doc["geo"] = point  # 2dsphere-indexed, for GET /news/near
+        if canonical[i] != i:
+            results[canonical[i]].setdefault("syndicated_sources", []).append(doc["source_url"])
+
+    # Near-duplicates are folded into their canonical document, not stored again
+    stored = [doc for i, doc in enumerate(results) if canonical[i] == i]
+    with span("insert", timings):
+        written = await insert_news_vectors_async(stored)
+        # Only newly stored articles count towards the rollups
+        new_ids = set(written["inserted_ids"])
+        await update_rollups_async([doc for doc in stored if content_id(doc) in new_ids])
+    if place is None:
+        _set_geo_later(geocode, [content_id(doc) for doc in stored])
+
+
+def _set_geo_later(geocode: asyncio.Future, ids: List[str]) -> None:
+    async def set_geo():
+        try:
+            point = geo_point(await geocode)
+            if point:
+                await set_geo_async(ids, point)
+        except Exception:
+            logger.exception("Setting geo on %d stored documents failed", len(ids))
+
+    task = asyncio.ensure_future(set_geo())
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _similar_past(embedding: Optional[List[float]], location: str, timings: Optional[dict]) -> List[Dict]:
+    if not embedding:
+        return []
+    return await timed("vector_search", vector_search_by_location_async(embedding, location, k=5), timings)
+
+
+def _event(name: str, payload: Dict[str, Any], sse: bool) -> str:
+    payload = jsonable_encoder(payload)
+    if sse:
+        return f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+    return json.dumps({"event": name, **payload}) + "\n"
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from app.services.emotion_rollups import parse_timestamp, timeline_async
+
+router = APIRouter()
+
+@router.get("/timeline")
+async def get_timeline(
+    location: str,
+    granularity: str = Query("day", description="`hour` or `day`"),
+    start: Optional[str] = Query(None, description="ISO-8601; defaults to 30 days (48 hours) before `end`"),
+    end: Optional[str] = Query(None, description="ISO-8601; defaults to now"),
+):
+    """
+    Emotion trend for a location: article count, mean emotion scores and
+    dominant emotion per hour or day bucket, read from the rollups that
+    POST /query maintains.
+    """
+    bounds = {}
+    for name, value in (("start", start), ("end", end)):
+        if value is not None:
+            bounds[name] = parse_timestamp(value)
+            if bounds[name] is None:
+                raise HTTPException(status_code=422, detail=f"`{name}` is not an ISO-8601 timestamp.")
+    try:
+        return await timeline_async(location, granularity, bounds.get("start"), bounds.get("end"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -3,75 +3,477 @@ dataset_ingest.py
 
 Reads local dataset, summarizes, classifies emotion, generates embeddings,
 and stores them in MongoDB with optional metadata.
+
+The dataset is streamed line by line (never loaded whole), enriched in
+micro-batches through the batch model APIs, and written as one unordered
+bulk upsert per batch keyed by a content hash, so re-ingesting a record
+is a no-op. Near-duplicate records (see utils/dedup.py) skip enrichment;
+their links are added to the canonical document's `syndicated_sources`.
+Progress is checkpointed as a byte offset plus record count, so an
+interrupted run resumes where it stopped:
+
+    python -m app.services.data_ingest --limit 200000 --batch-size 64
+
+With `--workers N` the models are loaded once in the parent process and N
+forked workers share them copy-on-write. The file is split into N byte
+ranges aligned to line boundaries; each worker ingests its own range and
+keeps its own checkpoint:
+
+    python -m app.services.data_ingest --limit 200000 --workers 16
 """
 
+import argparse
+import gc
 import json
-from tqdm import tqdm
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from itertools import islice
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tqdm import tqdm
 from dotenv import load_dotenv
-import os
+from pymongo import UpdateOne
 
-from app.services.summarizer import summarize_text
-from app.services.sentiment import classify_emotion
-from app.services.embeddings import get_embedding
-from app.db.mongo_client import get_collection
+from app.services import summarizer, sentiment, embeddings
+from app.services.summarizer import summarize_batch
+from app.services.sentiment import classify_batch
+from app.services.embeddings import get_batch_embeddings
+from app.services.mongo_vector import bulk_upsert, content_id
+from app.db.mongo_client import AtlasClient, atlas_client, ATLAS_URI, DB_NAME, COLLECTION_NAME
+from app.config import DEDUP_ENABLED, DEDUP_MAX_ITEMS, EMBEDDING_STORAGE
+from app.utils.dedup import NearDuplicateIndex
+from app.utils.log import get_logger
+from app.utils.vector_codec import encode_vector
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # Dataset location
 DATA_PATH = Path("public_dataset/news_category.json")
+CHECKPOINT_PATH = Path("public_dataset/.ingest_checkpoint.json")
+DEFAULT_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+# Tries per batch before the worker stops, leaving its checkpoint at that batch
+BATCH_ATTEMPTS = int(os.getenv("INGEST_BATCH_ATTEMPTS", "3"))
 
-# Load collection
-collection = get_collection()
 
-def clean_text(text):
+def _normalize_whitespace(text):
+    # Display cleanup only; dedup keys go through `text_utils.clean_texts`
     return text.strip().replace("\n", " ").replace("  ", " ")
 
-def ingest_dataset(limit=500):
-    print(f"[+] Loading dataset from {DATA_PATH}")
 
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        records = [json.loads(line) for line in f.readlines()]
+# ------------------------------------------------------------------------ #
+# Streaming reader
+# ------------------------------------------------------------------------ #
+
+def iter_records(
+    path: Path, start_offset: int = 0, end_offset: Optional[int] = None
+) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Lazily yield `(end_offset, record)` for each JSON line in `path`.
+
+    The yielded offset is the byte position just past the record, i.e. the
+    offset to resume from once this record has been stored. Only lines that
+    start before `end_offset` are read. Malformed lines are skipped.
+    """
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        offset = start_offset
+        for line in f:
+            if end_offset is not None and offset >= end_offset:
+                return
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                yield offset, json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.warning("Skipping malformed line ending at byte %d: %s", offset, e)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def shard_byte_ranges(path: Path, shards: int) -> List[Tuple[int, int]]:
+    """
+    Split `path` into `shards` contiguous `(start, end)` byte ranges whose
+    boundaries fall on line starts, so no record is split or read twice.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, shards):
+            f.seek(max(size * i // shards, bounds[-1]))
+            if f.tell() > 0:
+                f.readline()  # finish the partial line; the next one starts the shard
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+# ------------------------------------------------------------------------ #
+# Checkpointing
+# ------------------------------------------------------------------------ #
+
+def load_checkpoint(path: Path, start: int = 0, end: Optional[int] = None) -> Dict[str, int]:
+    """
+    Load `{"offset", "count"}` for the byte range `[start, end)`. A missing
+    checkpoint, or one written for a different range, starts from `start`.
+    """
+    fresh = {"offset": start, "count": 0}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("start", 0) != start or data.get("end") != end:
+            logger.warning("Checkpoint %s is for a different byte range; starting fresh.", path)
+            return fresh
+        return {"offset": int(data["offset"]), "count": int(data["count"])}
+    except (FileNotFoundError, KeyError, ValueError, json.JSONDecodeError):
+        return fresh
+
+
+def save_checkpoint(path: Path, offset: int, count: int, start: int = 0, end: Optional[int] = None) -> None:
+    """
+    Atomically persist progress (write to a temp file, then rename).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset, "count": count, "start": start, "end": end}, f)
+    os.replace(tmp, path)
+
+
+def worker_checkpoint_path(path: Path, worker: int) -> Path:
+    return path.with_name(f"{path.stem}.worker{worker}{path.suffix}")
+
+# ------------------------------------------------------------------------ #
+# Enrichment
+# ------------------------------------------------------------------------ #
+
+def enrich_batch(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Summarize, classify and embed a micro-batch with one call per model.
+    """
+    if not records:
+        return []
+    titles = [_normalize_whitespace(r.get("headline", "")) for r in records]
+    descs = [_normalize_whitespace(r.get("short_description", "")) for r in records]
+    texts = [f"{title}. {desc}" for title, desc in zip(titles, descs)]
+
+    summaries = summarize_batch(texts)
+    sentiments = classify_batch(summaries)
+    embeddings = get_batch_embeddings(summaries)
+
+    return [
+        {
+            "raw_title": title,
+            "raw_description": desc,
+            "summary": summary,
+            "sentiment": sentiment["emotion"],
+            "category": record.get("category", ""),
+            "link": record.get("link", ""),
+            "authors": record.get("authors", ""),
+            "date": record.get("date", ""),
+            "embedding": encode_vector(embedding, EMBEDDING_STORAGE),
+            "source": "RMisra Kaggle"
+        }
+        for record, title, desc, summary, sentiment, embedding
+        in zip(records, titles, descs, summaries, sentiments, embeddings)
+    ]
+
+
+_dedup_index: Optional[NearDuplicateIndex] = None
+_dedup_pid: Optional[int] = None
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    # One index per process: forked workers each dedup their own shard
+    global _dedup_index, _dedup_pid
+    if _dedup_index is None or _dedup_pid != os.getpid():
+        _dedup_index = NearDuplicateIndex(max_items=DEDUP_MAX_ITEMS)
+        _dedup_pid = os.getpid()
+    return _dedup_index
+
+
+def split_near_duplicates(
+    records: List[Dict[str, Any]]
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]], List[str]]:
+    """
+    Separate records to enrich from near-duplicates of a record seen
+    earlier in this run, returned as `(canonical _id, link)` pairs. Also
+    returns the keys this batch added to the index; if the batch fails they
+    must be discarded, or later copies would point at a document that was
+    never stored.
+    """
+    index = get_dedup_index()
+    titles = [_normalize_whitespace(r.get("headline", "")) for r in records]
+    descs = [_normalize_whitespace(r.get("short_description", "")) for r in records]
+    keys = [content_id({"raw_title": title, "link": r.get("link", "")}) for r, title in zip(records, titles)]
+    known = {key for key in keys if key in index}
+    matches = index.match_batch(keys, [f"{t}. {d}" for t, d in zip(titles, descs)])
+
+    fresh, duplicates = [], []
+    for record, key, match in zip(records, keys, matches):
+        if match is None:
+            fresh.append(record)
+        elif match != key:  # the same record seen twice needs nothing
+            duplicates.append((match, record.get("link", "")))
+    added = [key for key, match in zip(keys, matches) if match is None and key not in known and key in index]
+    return fresh, duplicates, added
+
+
+def write_syndicated(collection, duplicates: List[Tuple[str, str]]) -> None:
+    """
+    Add near-duplicates' links to their canonical documents.
+    """
+    links = defaultdict(list)
+    for canonical_id, link in duplicates:
+        if link:
+            links[canonical_id].append(link)
+    if links:
+        collection.bulk_write([
+            UpdateOne({"_id": _id}, {"$addToSet": {"syndicated_sources": {"$each": urls}}})
+            for _id, urls in links.items()
+        ], ordered=False)
+
+
+def write_batch(collection, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Unordered bulk upsert keyed by `content_id`; records already stored are
+    counted as duplicates, and per-document errors do not abort the rest of
+    the batch. Returns inserted / duplicate counts.
+    """
+    for doc in docs:
+        doc["_id"] = content_id(doc)
+    return bulk_upsert(collection, docs)
+
+
+def ingest_batch(collection, records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Dedup, enrich and store one micro-batch. Returns inserted / duplicate /
+    near-duplicate / error counts; on error the batch's dedup keys are
+    dropped and the exception propagates, so the batch can be retried.
+    Documents the bulk write rejected also lose their dedup keys, so later
+    copies are stored instead of being folded into a missing document.
+    """
+    syndicated, indexed = [], []
+    fresh = records
+    try:
+        if DEDUP_ENABLED:
+            fresh, syndicated, indexed = split_near_duplicates(records)
+        docs = enrich_batch(fresh)
+        written = write_batch(collection, docs)
+        failed = {docs[i]["_id"] for i in written["failed"]}
+        if failed:
+            get_dedup_index().discard([key for key in indexed if key in failed])
+        write_syndicated(collection, syndicated)
+    except Exception:
+        get_dedup_index().discard(indexed)
+        raise
+    return {"inserted": written["inserted"], "duplicates": written["duplicates"],
+            "near_duplicates": len(records) - len(fresh), "errors": written["errors"]}
+
+
+# ------------------------------------------------------------------------ #
+# Driver
+# ------------------------------------------------------------------------ #
+
+def ingest_range(
+    collection,
+    data_path: Path,
+    limit: int,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start: int = 0,
+    end: Optional[int] = None,
+    checkpoint_path: Optional[Path] = CHECKPOINT_PATH,
+    resume: bool = True,
+    worker: int = 0,
+) -> Dict[str, Any]:
+    """
+    Ingest up to `limit` records whose lines start in `[start, end)`.
+
+    A batch that still fails after BATCH_ATTEMPTS tries stops the worker
+    without advancing the checkpoint, so the next run resumes from it.
+
+    Returns per-run stats: records processed, inserted and throughput.
+    """
+    checkpoint = load_checkpoint(checkpoint_path, start, end) if (resume and checkpoint_path) \
+        else {"offset": start, "count": 0}
+    offset, count = checkpoint["offset"], checkpoint["count"]
+    processed = inserted = duplicates = near_duplicates = 0
+    failed_at = None
+    started = time.perf_counter()
+
+    if count < limit:
+        records = islice(iter_records(data_path, offset, end), limit - count)
+        with tqdm(total=limit, initial=count, position=worker, desc=f"worker {worker}") as progress:
+            for batch in batched(records, batch_size):
+                end_offset = batch[-1][0]
+                for attempt in range(1, BATCH_ATTEMPTS + 1):
+                    try:
+                        written = ingest_batch(collection, [record for _, record in batch])
+                        break
+                    except Exception as e:
+                        logger.error("Error processing batch ending at byte %d (attempt %d/%d): %s",
+                                     end_offset, attempt, BATCH_ATTEMPTS, e)
+                        if attempt < BATCH_ATTEMPTS:
+                            time.sleep(2 ** attempt)
+                else:
+                    failed_at = offset
+                    logger.error("Worker %d stopped at byte %d; the next run resumes there.", worker, offset)
+                    break
+
+                inserted += written["inserted"]
+                duplicates += written["duplicates"]
+                near_duplicates += written["near_duplicates"]
+                processed += len(batch)
+                count += len(batch)
+                offset = end_offset
+                if checkpoint_path:
+                    save_checkpoint(checkpoint_path, offset, count, start, end)
+                progress.update(len(batch))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "worker": worker,
+        "start": start,
+        "end": end,
+        "total": count,
+        "processed": processed,
+        "inserted": inserted,
+        "duplicates": duplicates,
+        "near_duplicates": near_duplicates,
+        "failed_at": failed_at,
+        "elapsed_s": round(elapsed, 2),
+        "records_per_s": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def _worker_main(worker: int, start: int, end: int, limit: int, batch_size: int,
+                 data_path: Path, checkpoint_path: Optional[Path], resume: bool,
+                 threads: int) -> Dict[str, Any]:
+    """
+    Forked worker entry point. Model weights are inherited from the parent;
+    only the Mongo client is recreated, since pymongo is not fork-safe.
+    """
+    import torch
+    torch.set_num_threads(threads)
+
+    collection = AtlasClient(ATLAS_URI, DB_NAME).get_collection(COLLECTION_NAME)
+    return ingest_range(
+        collection,
+        data_path,
+        limit,
+        batch_size,
+        start,
+        end,
+        worker_checkpoint_path(checkpoint_path, worker) if checkpoint_path else None,
+        resume,
+        worker,
+    )
+
+
+def _ingest_parallel(workers, limit, batch_size, data_path, checkpoint_path, resume) -> List[Dict[str, Any]]:
+    print("[+] Loading models in parent process...")
+    summarizer.warm_up()
+    sentiment.warm_up()
+    embeddings.warm_up()
+
+    shards = shard_byte_ranges(data_path, workers)
+    limits = [limit // workers + (1 if i < limit % workers else 0) for i in range(workers)]
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    # Each child inherits its own Gemini token bucket; together they keep to the quota
+    summarizer.split_rate_limit(workers)
+
+    # Keep forked children from touching (and so copying) the parent's heap
+    # pages during GC, and from spawning nested tokenizer threads.
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    gc.collect()
+    gc.freeze()
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes=workers) as pool:
+        return pool.starmap(_worker_main, [
+            (i, start, end, limits[i], batch_size, data_path, checkpoint_path, resume, threads)
+            for i, (start, end) in enumerate(shards)
+        ])
 
-    print(f"[+] Found {len(records)} records. Ingesting up to {limit} entries...")
 
-    for record in tqdm(records[:limit]):
-        try:
-            title = clean_text(record.get("headline", ""))
-            desc = clean_text(record.get("short_description", ""))
-            text = f"{title}. {desc}"
+def ingest_dataset(
+    limit: int = 500,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    data_path: Path = DATA_PATH,
+    checkpoint_path: Optional[Path] = CHECKPOINT_PATH,
+    resume: bool = True,
+    workers: int = 1,
+):
+    """
+    Stream up to `limit` records from `data_path` into MongoDB.
 
-            # 1. Summarize
-            summary = summarize_text(text)
+    With `resume=True` processing continues from the checkpoint stored at
+    `checkpoint_path`; `limit` counts records across runs. With `workers > 1`
+    the file is sharded by byte range and `limit` is split across workers.
+    """
+    print(f"[+] Streaming dataset from {data_path}. Ingesting up to {limit} entries "
+          f"in batches of {batch_size} with {workers} worker(s)...")
 
-            # 2. Sentiment
-            sentiment = classify_emotion(summary)
+    started = time.perf_counter()
+    if workers > 1:
+        stats = _ingest_parallel(workers, limit, batch_size, data_path, checkpoint_path, resume)
+    else:
+        collection = atlas_client.get_collection(COLLECTION_NAME)
+        stats = [ingest_range(collection, data_path, limit, batch_size,
+                              checkpoint_path=checkpoint_path, resume=resume)]
+    elapsed = time.perf_counter() - started
 
-            # 3. Embedding
-            embedding = get_embedding(summary)
+    for s in stats:
+        print(f"    worker {s['worker']}: bytes [{s['start']}, {s['end']}) "
+              f"processed={s['processed']} inserted={s['inserted']} duplicates={s['duplicates']} "
+              f"near_duplicates={s['near_duplicates']} total={s['total']} "
+              f"{s['records_per_s']} rec/s")
+        if s["failed_at"] is not None:
+            print(f"    worker {s['worker']}: stopped on a failing batch at byte {s['failed_at']}; "
+                  f"rerun to resume from there.")
 
-            # 4. Mongo document
-            doc = {
-                "raw_title": title,
-                "raw_description": desc,
-                "summary": summary,
-                "sentiment": sentiment,
-                "category": record.get("category", ""),
-                "link": record.get("link", ""),
-                "authors": record.get("authors", ""),
-                "date": record.get("date", ""),
-                "embedding": embedding,
-                "source": "RMisra Kaggle"
-            }
+    processed = sum(s["processed"] for s in stats)
+    inserted = sum(s["inserted"] for s in stats)
+    duplicates = sum(s["duplicates"] for s in stats)
+    near_duplicates = sum(s["near_duplicates"] for s in stats)
+    rate = round(processed / elapsed, 2) if elapsed > 0 else 0.0
+    print(f"[✓] Dataset ingestion complete. {processed} processed, {inserted} inserted, "
+          f"{duplicates} duplicates, {near_duplicates} near-duplicates "
+          f"this run in {elapsed:.1f}s ({rate} rec/s).")
+    return stats
 
-            collection.insert_one(doc)
 
-        except Exception as e:
-            print(f"[!] Error processing record: {e}")
-            continue
+def main():
+    parser = argparse.ArgumentParser(description="Ingest and enrich the news dataset into MongoDB.")
+    parser.add_argument("--limit", type=int, default=500, help="Total records to ingest (across resumed runs)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="Forked worker processes (byte-range shards)")
+    parser.add_argument("--data-path", type=Path, default=DATA_PATH)
+    parser.add_argument("--checkpoint", type=Path, default=CHECKPOINT_PATH)
+    parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint")
+    args = parser.parse_args()
 
-    print("[✓] Dataset ingestion complete.")
+    ingest_dataset(
+        limit=args.limit,
+        batch_size=args.batch_size,
+        data_path=args.data_path,
+        checkpoint_path=args.checkpoint,
+        resume=not args.restart,
+        workers=args.workers,
+    )
 
 
 if __name__ == "__main__":
-    ingest_dataset(limit=500)  # Adjust the limit based on MongoDB storage
+    main()  # Adjust --limit based on MongoDB storage
@@ -1,21 +1,38 @@
 import os
+from array import array
 from typing import List
 from functools import lru_cache
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from app.config import EMBEDDING_BACKEND, EMBEDDING_DIMS, EMBEDDING_MODEL, EMBEDDING_REDUCTION
+from app.utils.cache import EnrichmentCache
+from app.utils.dim_reduction import TruncateReducer, load_projection, projection_key, reduce_vectors
+from app.utils.log import get_logger
+from app.utils.metrics import model_call
+
+logger = get_logger(__name__)
+
 USE_GEMINI = bool(os.getenv("GCP_PROJECT_ID"))
+LOCAL_MODEL_NAME = EMBEDDING_MODEL
+LOCAL_MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length
+GEMINI_MODEL_NAME = "gemini-embedding-001"
+# Vertex AI / sentence-transformers are imported and initialised on first use
+# (or in warm_up), not at import time.
 # ------------------------------------------------------------------------ #
-if USE_GEMINI:
-    import vertexai
-    from vertexai.preview.language_models import TextEmbeddingModel
-    vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location="us-central1")
-    embedding_model = TextEmbeddingModel.from_pretrained("gemini-embedding-001")
-    
 
-else:
-    from sentence_transformers import SentenceTransformer
+# Vectors are persisted full-width as packed float32 (reduction happens after the
+# cache, so changing EMBEDDING_DIMS keeps it valid); failed (empty) embeddings are not cached.
+_cache = EnrichmentCache(
+    "embedding",
+    version=GEMINI_MODEL_NAME if USE_GEMINI
+    else LOCAL_MODEL_NAME if EMBEDDING_BACKEND == "torch"
+    else f"{LOCAL_MODEL_NAME}+{EMBEDDING_BACKEND}",
+    encode=lambda v: array("f", v).tobytes(),
+    decode=lambda b: array("f", b).tolist(),
+    cacheable=bool,
+)
 
 # ------------------------------------------------------------------------ #
 # Embedding Generator
@@ -29,23 +46,82 @@ def get_embedding(text: str) -> List[float]:
     if not text:
         return []
 
-    if USE_GEMINI:
-        return _gemini_embed(text)
-    else:
-        return _local_model().encode(text).tolist()
+    return _reduce([_cache.get_or_compute_one(text, _embed_one)])[0]
 
 
 def get_batch_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Embed a batch of texts; only cache misses reach the model.
+    """
     cleaned = [t.strip().replace("\n", " ") for t in texts]
+    return _reduce(_cache.get_or_compute(cleaned, _embed_many))
+
+
+def _embed_one(text: str) -> List[float]:
+    with model_call("embedding", 1):
+        if USE_GEMINI:
+            return _gemini_embed(text)
+        else:
+            return _local_model().encode(text).tolist()
+
+
+def _embed_many(cleaned: List[str]) -> List[List[float]]:
+    with model_call("embedding", len(cleaned)):
+        if USE_GEMINI:
+            try:
+                response = _gemini_model().get_embeddings(cleaned)
+                return [r.values for r in response]
+            except Exception as e:
+                logger.warning("Gemini batch embedding failed: %s", e)
+                return [[] for _ in cleaned]
+        else:
+            return _local_model().encode(cleaned).tolist()
+
+
+def warm_up() -> None:
+    """
+    Load the embedding model (or Vertex AI client) now instead of on the first request.
+    """
     if USE_GEMINI:
-        try:
-            response = embedding_model.get_embeddings(cleaned)
-            return [r.values for r in response]
-        except Exception as e:
-            print(f"[Gemini Batch Embedding failed]: {e}")
-            return [[] for _ in cleaned]
+        _gemini_model()
     else:
-        return _local_model().encode(cleaned).tolist()
+        _local_model()
+    get_reducer()
+
+
+# ------------------------------------------------------------------------ #
+# Dimensionality reduction
+# ------------------------------------------------------------------------ #
+
+def model_name() -> str:
+    return GEMINI_MODEL_NAME if USE_GEMINI else LOCAL_MODEL_NAME
+
+
+@lru_cache(maxsize=1)
+def get_reducer():
+    """
+    The configured reducer, or None when EMBEDDING_DIMS is 0 (full width).
+    PCA projections are loaded from `<COLLECTION>_projections`.
+    """
+    if not EMBEDDING_DIMS:
+        return None
+    if EMBEDDING_REDUCTION == "truncate":
+        return TruncateReducer(EMBEDDING_DIMS)
+    if EMBEDDING_REDUCTION == "pca":
+        from app.db.mongo_client import atlas_client, PROJECTIONS_COLLECTION_NAME
+
+        key = projection_key(model_name(), EMBEDDING_DIMS)
+        reducer = load_projection(atlas_client.get_collection(PROJECTIONS_COLLECTION_NAME), key)
+        if reducer is None:
+            raise RuntimeError(f"No PCA projection `{key}` stored; "
+                               f"fit one with `python -m app.db.schema_setup --fit-pca`")
+        return reducer
+    raise ValueError(f"Unknown EMBEDDING_REDUCTION {EMBEDDING_REDUCTION!r}; expected truncate or pca")
+
+
+def _reduce(vectors: List[List[float]]) -> List[List[float]]:
+    reducer = get_reducer()
+    return reduce_vectors(reducer, vectors) if reducer else vectors
 
 
 # ------------------------------------------------------------------------ #
@@ -57,16 +133,25 @@ def _gemini_embed(text: str) -> List[float]:
     Get a single embedding from Gemini's embedding-001 model.
     """
     try:
-        response = embedding_model.get_embeddings(
+        response = _gemini_model().get_embeddings(
             [text]             # Input parameter is 'content'
         )
         # Access the embedding values directly from the response
         return response[0].values
     except Exception as e:
-        print(f"[Gemini Embedding failed]: {e}")
+        logger.warning("Gemini embedding failed: %s", e)
         return []
 
 
+@lru_cache(maxsize=1)
+def _gemini_model():
+    import vertexai
+    from vertexai.preview.language_models import TextEmbeddingModel
+
+    vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location="us-central1")
+    return TextEmbeddingModel.from_pretrained(GEMINI_MODEL_NAME)
+
+
 # ------------------------------------------------------------------------ #
 # Local Sentence Transformer
 # ------------------------------------------------------------------------ #
@@ -74,6 +159,23 @@ def _gemini_embed(text: str) -> List[float]:
 @lru_cache(maxsize=1)
 def _local_model():
     """
-    Loads and caches the Sentence Transformer model.
+    Loads and caches the Sentence Transformer model, or for the int8 / ONNX
+    backends an encoder with the same `.encode()` over the optimized model.
     """
-    return SentenceTransformer("all-MiniLM-L6-v2")
\ No newline at end of file
+    if EMBEDDING_BACKEND == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(LOCAL_MODEL_NAME)
+
+    from transformers import AutoModel, AutoTokenizer
+    from app.utils.inference_backend import TransformerEncoder, optimize
+
+    # Short names resolve like SentenceTransformer does
+    name = LOCAL_MODEL_NAME
+    if "/" not in name and not os.path.isdir(name):
+        name = f"sentence-transformers/{name}"
+    model = AutoModel.from_pretrained(name).eval()
+    return TransformerEncoder(
+        AutoTokenizer.from_pretrained(name),
+        optimize(model, EMBEDDING_BACKEND, name, output="last_hidden_state"),
+        max_length=LOCAL_MAX_SEQ_LENGTH,
+    )
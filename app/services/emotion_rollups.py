@@ -0,0 +1,212 @@
+"""
+emotion_rollups.py
+
+Materialized emotion rollups per location and time bucket.
+
+Every stored article adds its full emotion score vector to one rollup
+document per granularity ("hour" and "day"):
+
+    {
+        "_id": "paris|day|2025-06-11T00:00:00",
+        "location_key": "paris",
+        "location": "Paris",
+        "granularity": "day",
+        "bucket": datetime(2025, 6, 11),
+        "count": 42,
+        "scores": {"anger": 3.1, "joy": 17.4, ...},   # summed, divide by count
+        "labels": {"joy": 20, "fear": 9, ...}          # argmax counts
+    }
+
+Updates are `$inc` upserts, so concurrent writers never read-modify-write,
+and `timeline()` reads one document per bucket from
+`rollup_location_bucket_index` instead of scanning articles.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import ROLLUP_GRANULARITIES, TIMELINE_MAX_BUCKETS
+from app.db.mongo_client import atlas_client, ROLLUPS_COLLECTION_NAME
+from app.utils.async_utils import run_io
+from app.utils.geo_utils import canonical_location
+from app.utils.metrics import MONGO_SECONDS
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# Fail at startup rather than write mislabelled buckets
+_unknown = [g for g in ROLLUP_GRANULARITIES if g not in GRANULARITIES]
+if _unknown:
+    raise ValueError(f"Unknown ROLLUP_GRANULARITIES {_unknown}; expected any of {sorted(GRANULARITIES)}")
+
+rollups = atlas_client.get_collection(ROLLUPS_COLLECTION_NAME)
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """
+    Naive UTC datetime from an ISO-8601 string or datetime; None if unparseable.
+    """
+    if isinstance(value, datetime):
+        ts = value
+    else:
+        try:
+            ts = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity {granularity!r}; expected one of {sorted(GRANULARITIES)}")
+
+
+def _field(label: str) -> str:
+    # Mongo field names cannot contain "." or start with "$"
+    return label.replace(".", "_").lstrip("$")
+
+
+def _doc_scores(doc: Dict[str, Any]) -> Dict[str, float]:
+    scores = doc.get("emotion_scores")
+    if scores:
+        return scores
+    # Articles stored before scores were kept only have their label
+    return {doc["sentiment"]: 1.0} if doc.get("sentiment") else {}
+
+
+def build_rollup_ops(docs: Iterable[Dict[str, Any]],
+                     granularities: Iterable[str] = ROLLUP_GRANULARITIES) -> List[UpdateOne]:
+    """
+    One `$inc` upsert per (location, granularity, bucket) touched by `docs`.
+    Documents without a location, timestamp or emotion are skipped.
+    """
+    totals: Dict[Tuple[str, str, datetime], Dict[str, Any]] = {}
+    for doc in docs:
+        ts = parse_timestamp(doc.get("timestamp"))
+        scores = _doc_scores(doc)
+        if not doc.get("location") or ts is None or not scores:
+            continue
+        key = doc.get("location_key") or canonical_location(doc["location"])
+        label = doc.get("sentiment") or max(scores, key=scores.get)
+        for granularity in granularities:
+            bucket = bucket_start(ts, granularity)
+            entry = totals.setdefault((key, granularity, bucket), {
+                "location": doc["location"], "count": 0,
+                "scores": defaultdict(float), "labels": defaultdict(int),
+            })
+            entry["count"] += 1
+            entry["labels"][_field(label)] += 1
+            for name, score in scores.items():
+                entry["scores"][_field(name)] += float(score)
+
+    ops = []
+    for (key, granularity, bucket), entry in totals.items():
+        inc = {"count": entry["count"]}
+        inc.update({f"scores.{n}": s for n, s in entry["scores"].items()})
+        inc.update({f"labels.{n}": c for n, c in entry["labels"].items()})
+        ops.append(UpdateOne(
+            {"_id": f"{key}|{granularity}|{bucket.isoformat()}"},
+            {
+                "$inc": inc,
+                "$setOnInsert": {"location_key": key, "location": entry["location"],
+                                 "granularity": granularity, "bucket": bucket},
+            },
+            upsert=True,
+        ))
+    return ops
+
+
+def update_rollups(docs: List[Dict[str, Any]]) -> int:
+    """
+    Fold newly stored articles into their rollups in one bulk write. Only pass
+    documents that were actually inserted, or duplicates are counted twice.
+    Returns the number of rollup documents touched.
+    """
+    ops = build_rollup_ops(docs)
+    if not ops:
+        return 0
+    with MONGO_SECONDS.time(operation="rollups"):
+        rollups.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def create_rollup_indexes() -> None:
+    rollups.create_index(
+        [("location_key", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)],
+        name="rollup_location_bucket_index",
+    )
+
+
+def timeline(location: str, granularity: str = "day",
+             start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Emotion trend for `location` between `start` and `end` (default: the last
+    30 days, or 48 hours for hourly buckets), oldest bucket first. Buckets
+    without articles are omitted. Reads at most TIMELINE_MAX_BUCKETS rollups.
+
+    Raises:
+        ValueError: Unknown granularity or an empty range
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}; expected one of {sorted(GRANULARITIES)}")
+    end = end or datetime.utcnow()
+    start = start or end - (timedelta(hours=48) if granularity == "hour" else timedelta(days=30))
+    if start >= end:
+        raise ValueError("`start` must be before `end`")
+
+    location_key = canonical_location(location)
+    cursor = rollups.find(
+        {"location_key": location_key, "granularity": granularity,
+         "bucket": {"$gte": bucket_start(start, granularity), "$lt": end}},
+        {"_id": 0, "bucket": 1, "count": 1, "scores": 1, "labels": 1},
+    ).sort("bucket", ASCENDING).limit(TIMELINE_MAX_BUCKETS)
+    with MONGO_SECONDS.time(operation="timeline"):
+        docs = list(cursor)
+
+    buckets = []
+    total_count, total_scores = 0, defaultdict(float)
+    for doc in docs:
+        count = doc.get("count", 0)
+        if not count:
+            continue
+        scores = doc.get("scores", {})
+        mean = {name: round(s / count, 4) for name, s in scores.items()}
+        buckets.append({
+            "bucket": doc["bucket"].isoformat() + "Z",
+            "count": count,
+            "dominant_emotion": max(mean, key=mean.get) if mean else "neutral",
+            "scores": mean,
+            "labels": doc.get("labels", {}),
+        })
+        total_count += count
+        for name, s in scores.items():
+            total_scores[name] += s
+
+    overall = {name: round(s / total_count, 4) for name, s in total_scores.items()} if total_count else {}
+    return {
+        "location": location.title(),
+        "location_key": location_key,
+        "granularity": granularity,
+        "start": start.isoformat() + "Z",
+        "end": end.isoformat() + "Z",
+        "total_articles": total_count,
+        "dominant_emotion": max(overall, key=overall.get) if overall else "neutral",
+        "scores": overall,
+        "buckets": buckets,
+    }
+
+
+async def update_rollups_async(docs: List[Dict[str, Any]]) -> int:
+    return await run_io(update_rollups, docs)
+
+
+async def timeline_async(location: str, granularity: str = "day",
+                         start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    return await run_io(timeline, location, granularity, start, end)
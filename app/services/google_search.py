@@ -2,60 +2,473 @@
 Google Search Service (via Serper.dev)
 
 Fetches latest news headlines and links for a given location-based query.
+
+All calls go through one `SerperClient`, which keeps pooled keep-alive
+connections (a `requests.Session` for sync callers, an `httpx.AsyncClient`
+for async ones), applies explicit timeouts and retries 429/5xx/transport
+errors with bounded exponential backoff and jitter.
+
+Responses are cached per (query, num_results, page) with a TTL and served
+stale-while-revalidate; concurrent identical lookups share a single
+upstream request (one per path: sync callers wait on a thread-level future,
+async callers on a task). Point `SERPER_API_URL` at a local stand-in server
+to test.
 """
 
+import asyncio
 import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
+from typing import List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.config import (
+    HTTP_TIMEOUT,
+    SERPER_CACHE_TTL,
+    SERPER_STALE_TTL,
+    SERPER_CACHE_MAX_ITEMS,
+    SERPER_MAX_RETRIES,
+    SERPER_BACKOFF_BASE,
+    SERPER_BACKOFF_MAX,
+    SERPER_MAX_CONNECTIONS,
+)
+from app.utils.log import get_logger
+from app.utils.metrics import SERPER_RESPONSES
+
 load_dotenv()
 
+logger = get_logger(__name__)
+
 SERPER_API_KEY = os.getenv("SERPER_API_KEY")
-SERPER_API_URL = "https://google.serper.dev/search/news"
+SERPER_API_URL = os.getenv("SERPER_API_URL", "https://google.serper.dev/search/news")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
 if not SERPER_API_KEY:
-    print("[Warning] SERPER_API_KEY is not set!")
+    logger.warning("SERPER_API_KEY is not set!")
+
+
+# ------------------------------------------------------------------------ #
+# Client
+# ------------------------------------------------------------------------ #
+
+class SerperError(Exception):
+    """Raised when Serper still fails after all retries or returns an unreadable body."""
+
+
+class SerperClient:
+    """
+    Pooled, retrying Serper client.
+
+    Args:
+        api_key (str): Serper API key
+        api_url (str): News search endpoint
+        timeout (float): Per-request timeout in seconds
+        max_retries (int): Retries after the first attempt on 429/5xx/transport errors
+        backoff_base (float): First backoff ceiling in seconds; doubles per attempt
+        backoff_max (float): Upper bound for any single backoff
+        max_connections (int): Size of the keep-alive connection pool
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = SERPER_API_KEY,
+        api_url: str = SERPER_API_URL,
+        timeout: float = HTTP_TIMEOUT,
+        max_retries: int = SERPER_MAX_RETRIES,
+        backoff_base: float = SERPER_BACKOFF_BASE,
+        backoff_max: float = SERPER_BACKOFF_MAX,
+        max_connections: int = SERPER_MAX_CONNECTIONS,
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_connections = max_connections
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update(self._headers())
+
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+    # -- sync ------------------------------------------------------------- #
+
+    def search(self, query: str, num_results: int = 5, page: int = 1) -> List[Dict]:
+        """
+        Blocking search; raises `SerperError` once retries are exhausted.
+        """
+        payload = self._payload(query, num_results, page)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._session.post(self.api_url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                SERPER_RESPONSES.inc(status="error")
+                error, retry_after = e, None
+            else:
+                SERPER_RESPONSES.inc(status=response.status_code)
+                if response.status_code < 400:
+                    return _decode_news(response)
+                error = SerperError(f"HTTP {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise SerperError(f"{error} after {attempt + 1} attempts") from error
+            time.sleep(self._backoff(attempt, retry_after))
+
+    # -- async ------------------------------------------------------------ #
+
+    async def asearch(self, query: str, num_results: int = 5, page: int = 1) -> List[Dict]:
+        """
+        Non-blocking search; raises `SerperError` once retries are exhausted.
+        """
+        payload = self._payload(query, num_results, page)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._get_async_client().post(self.api_url, json=payload)
+            except httpx.TransportError as e:
+                SERPER_RESPONSES.inc(status="error")
+                error, retry_after = e, None
+            else:
+                SERPER_RESPONSES.inc(status=response.status_code)
+                if response.status_code < 400:
+                    return _decode_news(response)
+                error = SerperError(f"HTTP {response.status_code}")
+                if response.status_code not in RETRY_STATUSES:
+                    raise error
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise SerperError(f"{error} after {attempt + 1} attempts") from error
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
 
-def fetch_news(query: str, num_results: int = 5) -> List[Dict]:
+    def close(self) -> None:
+        self._session.close()
+
+    # -- helpers ---------------------------------------------------------- #
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers(),
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._async_client
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Full-jitter exponential backoff, honouring a numeric Retry-After
+        header; always capped at `backoff_max`.
+        """
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "X-API-KEY": self.api_key or "",
+            "Content-Type": "application/json"
+        }
+
+    @staticmethod
+    def _payload(query: str, num_results: int, page: int) -> Dict:
+        payload = {
+            "q": query,
+            "num": num_results
+        }
+        if page > 1:
+            payload["page"] = page
+        return payload
+
+
+_client: Optional[SerperClient] = None
+
+
+def get_client() -> SerperClient:
+    global _client
+    if _client is None:
+        _client = SerperClient()
+    return _client
+
+
+# ------------------------------------------------------------------------ #
+# Public API
+# ------------------------------------------------------------------------ #
+
+def fetch_news(query: str, num_results: int = 5, page: int = 1) -> List[Dict]:
     """
     Fetch latest news articles related to the user's query using Serper.dev.
-    
+
     Args:
         query (str): Location or topic (e.g., "news in New York")
         num_results (int): Number of results to return (max 10 for free tier)
+        page (int): Result page (1-based)
 
     Returns:
-        List[Dict]: Articles with title, link, snippet, published date
+        List[Dict]: Articles with title, link, snippet, published date;
+        empty if Serper could not be reached.
+
+    Caching matches `fetch_news_async`: stale hits return immediately and
+    trigger one background refresh; misses wait on the shared request.
+    """
+    key = _cache_key(query, num_results, page)
+    hit = news_cache.get(key)
+    if hit is not None:
+        articles, fresh = hit
+        if not fresh and key not in _sync_inflight:
+            threading.Thread(target=_single_flight_sync, args=(key,), daemon=True).start()
+        return articles
+
+    return _single_flight_sync(key)
+
+
+def fetch_news_many(queries: List[str], num_results: int = 5, pages: int = 1) -> Dict[str, List[Dict]]:
+    """
+    Blocking fan-out: fetch `pages` result pages for every query in parallel
+    over the pooled session. Returns articles per query, de-duplicated by link.
+    """
+    jobs = [(q, p) for q in queries for p in range(1, pages + 1)]
+    if not jobs:
+        return {}
+    workers = min(len(jobs), get_client().max_connections)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="serper") as pool:
+        results = list(pool.map(lambda job: fetch_news(job[0], num_results, job[1]), jobs))
+    return _merge_pages(queries, jobs, results)
+
+
+async def fetch_news_async(query: str, num_results: int = 5, page: int = 1) -> List[Dict]:
+    """
+    Non-blocking variant of `fetch_news` for use inside async route handlers.
+
+    Fresh cache hits return immediately; stale hits return immediately and
+    trigger a background refresh; misses wait on the (possibly shared)
+    in-flight request.
     """
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
+    key = _cache_key(query, num_results, page)
+    hit = news_cache.get(key)
+    if hit is not None:
+        articles, fresh = hit
+        if not fresh:
+            _single_flight(key)
+        return articles
 
-    payload = {
-        "q": query,
-        "num": num_results
-    }
+    # shield: a cancelled caller must not cancel the request other callers share
+    return await asyncio.shield(_single_flight(key))
 
+
+async def fetch_news_many_async(queries: List[str], num_results: int = 5, pages: int = 1) -> Dict[str, List[Dict]]:
+    """
+    Concurrent fan-out over queries and result pages. Returns articles per
+    query, de-duplicated by link.
+    """
+    jobs = [(q, p) for q in queries for p in range(1, pages + 1)]
+    results = await asyncio.gather(*(fetch_news_async(q, num_results, p) for q, p in jobs))
+    return _merge_pages(queries, jobs, results)
+
+
+async def close_async_client() -> None:
+    if _client is not None:
+        await _client.aclose()
+
+
+def _fetch_upstream_sync(key: Tuple[str, int, int]) -> List[Dict]:
+    query, num_results, page = key
+    try:
+        articles = get_client().search(query, num_results, page)
+    except (SerperError, requests.RequestException) as e:
+        logger.warning("Serper request for %r failed: %s", query, e)
+        return []
+
+    if articles:
+        news_cache.put(key, articles)
+    return articles
+
+
+async def _fetch_upstream(key: Tuple[str, int, int]) -> List[Dict]:
+    query, num_results, page = key
+    try:
+        articles = await get_client().asearch(query, num_results, page)
+    except (SerperError, httpx.HTTPError) as e:
+        logger.warning("Serper request for %r failed: %s", query, e)
+        return []
+
+    if articles:
+        news_cache.put(key, articles)
+    return articles
+
+
+# ------------------------------------------------------------------------ #
+# Response cache + single-flight
+# ------------------------------------------------------------------------ #
+
+class TTLCache:
+    """
+    Bounded TTL cache with a stale window.
+
+    `get` returns `(value, fresh)` while an entry is younger than
+    `ttl + stale_ttl`, with `fresh=False` once it is past `ttl`.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, max_items: int):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_items = max_items
+        self._items: "OrderedDict[Tuple[str, int, int], Tuple[float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, key) -> Optional[Tuple[List[Dict], bool]]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                if age < self.ttl:
+                    self.hits += 1
+                    return entry[1], True
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    return entry[1], False
+                del self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value: List[Dict]) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+            "items": len(self._items),
+        }
+
+
+news_cache = TTLCache(SERPER_CACHE_TTL, SERPER_STALE_TTL, SERPER_CACHE_MAX_ITEMS)
+_inflight: Dict[Tuple[str, int, int], "asyncio.Task[List[Dict]]"] = {}
+_sync_inflight: Dict[Tuple[str, int, int], "Future[List[Dict]]"] = {}
+_sync_lock = threading.Lock()
+
+
+def _cache_key(query: str, num_results: int, page: int = 1) -> Tuple[str, int, int]:
+    return " ".join(query.lower().split()), num_results, page
+
+
+def _single_flight(key: Tuple[str, int, int]) -> "asyncio.Task[List[Dict]]":
+    """
+    Return the in-flight upstream request for `key`, starting one if needed.
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_upstream(key))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return task
+
+
+def _single_flight_sync(key: Tuple[str, int, int]) -> List[Dict]:
+    """
+    Blocking counterpart of `_single_flight`: the first caller for `key`
+    makes the upstream request, concurrent callers wait for its result.
+    """
+    with _sync_lock:
+        pending = _sync_inflight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _sync_inflight[key] = Future()
+    if not leader:
+        return pending.result()
+
+    try:
+        articles = _fetch_upstream_sync(key)
+        pending.set_result(articles)
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _sync_lock:
+            del _sync_inflight[key]
+    return articles
+
+
+# ------------------------------------------------------------------------ #
+# Helpers
+# ------------------------------------------------------------------------ #
+
+def _merge_pages(queries: List[str], jobs: List[Tuple[str, int]], results: List[List[Dict]]) -> Dict[str, List[Dict]]:
+    merged: Dict[str, List[Dict]] = {q: [] for q in queries}
+    seen: Dict[str, set] = {q: set() for q in queries}
+    for (query, _), articles in zip(jobs, results):
+        for article in articles:
+            link = article.get("link")
+            if link and link in seen[query]:
+                continue
+            seen[query].add(link)
+            merged[query].append(article)
+    return merged
+
+
+def _decode_news(response) -> List[Dict]:
+    """
+    Articles from a successful requests / httpx response. A body that is not
+    a JSON object (e.g. a proxy's HTML page) raises `SerperError`.
+    """
     try:
-        response = requests.post(SERPER_API_URL, headers=headers, json=payload)
-        print(f"Status: {response.status_code}, Response: {response.text}")  # Add this line
-        response.raise_for_status()
         data = response.json()
-        news_items = data.get("news") or data.get("topStories", [])
-
-        return [
-            {
-                "title": item.get("title"),
-                "link": item.get("link"),
-                "snippet": item.get("snippet") or "",
-                "published_date": item.get("date"),
-                "source": item.get("source")
-            }
-            for item in news_items
-        ]
-
-    except requests.RequestException as e:
-        print(f"[Serper API Error] {e}")
-        return [0]
+    except ValueError as e:
+        raise SerperError(f"Invalid JSON in HTTP {response.status_code} response") from e
+    if not isinstance(data, dict):
+        raise SerperError(f"Unexpected {type(data).__name__} in HTTP {response.status_code} response")
+    return _parse_news(data)
+
+
+def _parse_news(data: Dict) -> List[Dict]:
+    news_items = data.get("news") or data.get("topStories", [])
+
+    return [
+        {
+            "title": item.get("title"),
+            "link": item.get("link"),
+            "snippet": item.get("snippet") or "",
+            "published_date": item.get("date"),
+            "source": item.get("source")
+        }
+        for item in news_items
+    ]
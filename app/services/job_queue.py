@@ -0,0 +1,462 @@
+"""
+job_queue.py
+
+Background jobs for the enrichment pipeline, so POST /query does not wait
+on the models.
+
+With JOB_QUEUE set, POST /query only fetches the headlines, submits a job
+and answers 202 with its id. JOB_WORKERS asyncio workers run the job
+handler (summarize / classify / embed / insert, still on the usual
+inference and I/O pools). GET /jobs/{id} reports the status and, once the
+job is done, the result. No external broker is needed:
+
+- "memory": jobs live in this process and are lost on restart
+- "sqlite": jobs live in JOB_DB_PATH. Queued jobs survive a restart, and
+  the API processes on one host share the queue
+
+The queue is bounded. `submit` raises `QueueFull` (answered with 429) once
+JOB_QUEUE_MAX_DEPTH jobs are waiting. POST /query/stream still enriches
+inline, but each open stream takes one slot of that depth (`inline`), so
+it is turned away with 429 as well when the queue is full. Finished jobs
+can be polled for JOB_RESULT_TTL seconds.
+
+Workers refresh the heartbeat of their running jobs every
+HEARTBEAT_INTERVAL seconds. In the sqlite store, a running job without a
+heartbeat for STALE_AFTER seconds (its process died) is queued again.
+Memory jobs cannot outlive their worker, and `stop` requeues them, so they
+never go stale. Inserts are content-hash upserts, so running a job twice
+stores nothing twice.
+"""
+
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.config import JOB_DB_PATH, JOB_QUEUE_MAX_DEPTH, JOB_RESULT_TTL, JOB_WORKERS
+from app.utils.async_utils import run_io
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+HEARTBEAT_INTERVAL = 15.0
+STALE_AFTER = 6 * HEARTBEAT_INTERVAL
+POLL_INTERVAL = 1.0   # idle workers re-check the store this often (other processes may submit)
+PURGE_INTERVAL = 60.0
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class QueueFull(Exception):
+    """Raised by `submit` when JOB_QUEUE_MAX_DEPTH jobs are already waiting."""
+
+
+def _new_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+    }
+
+
+# ------------------------------------------------------------------------ #
+# Stores
+# ------------------------------------------------------------------------ #
+
+class MemoryJobStore:
+    """
+    Jobs in a dict, queued ids in a FIFO; for a single API process.
+    """
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queued: Deque[str] = deque()
+        self._lock = threading.Lock()
+
+    def add(self, job: Dict[str, Any], max_depth: int) -> bool:
+        with self._lock:
+            if max_depth and len(self._queued) >= max_depth:
+                return False
+            self._jobs[job["id"]] = job
+            self._queued.append(job["id"])
+            return True
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._queued:
+                return None
+            job = self._jobs[self._queued.popleft()]
+            job.update(status=RUNNING, started_at=time.time())
+            return dict(job)
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+
+    def release(self, job_id: str) -> None:
+        """
+        Put a running job back at the head of the queue (its worker stopped).
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] == RUNNING:
+                job.update(status=QUEUED, started_at=None)
+                self._queued.appendleft(job_id)
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        # Running jobs live and die with this process's workers
+        pass
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict.fromkeys(STATUSES, 0)
+            for job in self._jobs.values():
+                counts[job["status"]] += 1
+            return counts
+
+    def purge(self, ttl: float) -> None:
+        """
+        Drop jobs finished more than `ttl` seconds ago. Running jobs are left
+        alone: their worker is alive in this process.
+        """
+        now = time.time()
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job["status"] in (DONE, FAILED) and now - job["finished_at"] > ttl:
+                    del self._jobs[job_id]
+
+
+class SqliteJobStore:
+    """
+    Jobs in one SQLite table. Claims run in an IMMEDIATE transaction, so
+    workers in several processes never take the same job. Connections are
+    opened lazily per process, like the enrichment cache's.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit; multi-statement updates open their own transaction
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+                "payload TEXT NOT NULL, result TEXT, error TEXT, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, heartbeat_at REAL)"
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:  # tables created before heartbeats
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def add(self, job: Dict[str, Any], max_depth: int) -> bool:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if max_depth:
+                    (depth,) = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+                    if depth >= max_depth:
+                        conn.execute("ROLLBACK")
+                        return False
+                conn.execute(
+                    "INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)",
+                    (job["id"], QUEUED, json.dumps(job["payload"], default=str), job["created_at"]),
+                )
+                conn.execute("COMMIT")
+                return True
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    started = time.time()
+                    conn.execute("UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                                 (RUNNING, started, started, row["id"]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {**self._decode(row), "status": RUNNING, "started_at": started}
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error,
+                 time.time(), job_id),
+            )
+
+    def release(self, job_id: str) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL WHERE id = ? AND status = ?",
+                (QUEUED, job_id, RUNNING),
+            )
+
+    def heartbeat(self, job_ids: List[str]) -> None:
+        if not job_ids:
+            return
+        with self._lock:
+            self._connection().execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {**dict.fromkeys(STATUSES, 0), **{status: n for status, n in rows}}
+
+    def purge(self, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?", (DONE, FAILED, now - ttl))
+            # Running jobs whose process stopped sending heartbeats
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, heartbeat_at = NULL "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (QUEUED, RUNNING, now - STALE_AFTER),
+            )
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+
+def make_store(kind: str):
+    if kind == "memory":
+        return MemoryJobStore()
+    if kind == "sqlite":
+        return SqliteJobStore()
+    raise ValueError(f"Unknown JOB_QUEUE {kind!r}; expected memory or sqlite")
+
+
+# ------------------------------------------------------------------------ #
+# Queue + workers
+# ------------------------------------------------------------------------ #
+
+class JobQueue:
+    """
+    Args:
+        store: MemoryJobStore or SqliteJobStore
+        handler: Coroutine function run on each job's payload; its return
+            value (JSON-serializable) becomes the job's result
+        workers (int): Jobs run concurrently in this process
+        max_depth (int): Waiting jobs beyond which `submit` raises QueueFull; 0 for unbounded
+        result_ttl (float): Seconds finished jobs stay pollable
+    """
+
+    def __init__(self, store, handler: Handler, workers: int = JOB_WORKERS,
+                 max_depth: int = JOB_QUEUE_MAX_DEPTH, result_ttl: float = JOB_RESULT_TTL):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_depth = max_depth
+        self.result_ttl = result_ttl
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, Dict[str, Any]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = 0.0
+        self._inline = 0
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.run_seconds = 0.0
+
+    async def submit(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue `payload` and return the new job; raises `QueueFull`.
+        """
+        await self._maybe_purge()
+        job = _new_job(payload)
+        # Open inline runs use up part of the depth (0 stays unbounded)
+        depth = self.max_depth - self._inline if self.max_depth else 0
+        if self.max_depth and depth <= 0:
+            raise self._full()
+        if not await run_io(self.store.add, job, depth):
+            raise self._full()
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def check_capacity(self) -> None:
+        """
+        Raise `QueueFull` if waiting jobs and inline runs already fill the depth.
+        """
+        if self.max_depth:
+            counts = await run_io(self.store.counts)
+            if counts[QUEUED] + self._inline >= self.max_depth:
+                raise self._full()
+
+    @asynccontextmanager
+    async def inline(self) -> AsyncIterator[None]:
+        """
+        Count work run inline instead of queued (POST /query/stream) against
+        the depth while the block runs. Pair with `check_capacity`.
+        """
+        self._inline += 1
+        try:
+            yield
+        finally:
+            self._inline -= 1
+
+    def _full(self) -> QueueFull:
+        with self._stats_lock:
+            self.rejected += 1
+        return QueueFull(f"{self.max_depth} jobs are already waiting; retry later.")
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await run_io(self.store.get, job_id)
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a full queue has likely drained a slot, from the mean job time.
+        """
+        mean = self.run_seconds / self.completed if self.completed else 1.0
+        return max(1, math.ceil(mean / max(1, self.workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "inline": self._inline,
+            "jobs": self.store.counts(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "mean_run_s": round(self.run_seconds / self.completed, 3) if self.completed else 0.0,
+        }
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info("Started %d job workers (%s store)", self.workers, type(self.store).__name__)
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers; jobs they were running go back to the queue.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job_id in list(self._running):
+            self.store.release(job_id)
+        self._running.clear()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                self._wakeup.clear()
+                job = await run_io(self.store.claim)
+                if job is None:
+                    await self._maybe_purge()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._run(job)
+            except Exception:
+                # e.g. "database is locked"; the worker must outlive it
+                logger.exception("Job worker %d failed; retrying", n)
+                await asyncio.sleep(POLL_INTERVAL)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await run_io(self.store.heartbeat, list(self._running))
+            except Exception:
+                logger.exception("Job heartbeat failed")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        start = time.perf_counter()
+        self._running[job["id"]] = job
+        try:
+            result = await self.handler(job["payload"])
+        except asyncio.CancelledError:
+            raise  # still in _running; stop() requeues it
+        except Exception as e:
+            del self._running[job["id"]]
+            logger.exception("Job %s failed", job["id"])
+            await run_io(self.store.finish, job["id"], FAILED, error=f"{type(e).__name__}: {e}")
+            with self._stats_lock:
+                self.failed += 1
+            return
+        del self._running[job["id"]]
+        try:
+            await run_io(self.store.finish, job["id"], DONE, result=result)
+        except Exception as e:
+            # e.g. a result the store cannot encode; the job must not stay running
+            logger.exception("Storing the result of job %s failed", job["id"])
+            await run_io(self.store.finish, job["id"], FAILED,
+                         error=f"Storing the result failed: {type(e).__name__}: {e}")
+            with self._stats_lock:
+                self.failed += 1
+            return
+        with self._stats_lock:
+            self.completed += 1
+            self.run_seconds += time.perf_counter() - start
+
+    async def _maybe_purge(self) -> None:
+        now = time.monotonic()
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            await run_io(self.store.purge, self.result_ttl)
@@ -2,42 +2,190 @@
 mongo_vector.py
 
 Handles storing and querying vectorized news data in MongoDB Atlas using Vector Search.
+
+Documents carry a canonical `location_key` (see geo_utils.canonical_location)
+that is pushed into `$vectorSearch` as a pre-filter, so every returned hit
+belongs to the requested location. `numCandidates` grows with k and with
+how selective the location is; small locations are searched exactly.
+
+With VECTOR_BACKEND=local, similarity search is served from an in-process
+IVF index (see vector_index.py) built from the collection and kept up to
+date by `insert_news_vectors`, so self-hosted Mongo works too.
+
+Writes are batched: `insert_news_vectors` sends one unordered bulk upsert
+per request, keyed by a content hash (`content_id`), so re-fetched
+articles are recognised as duplicates instead of stored again.
 """
 
-from pymongo import MongoClient, ASCENDING
-from pymongo.errors import DuplicateKeyError
-from typing import List, Dict, Any
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import hashlib
+import math
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from app.config import (
+    VECTOR_BACKEND,
+    VECTOR_INDEX_PATH,
+    VECTOR_INDEX_NLIST,
+    VECTOR_INDEX_NPROBE,
+    VECTOR_INDEX_SAVE_EVERY,
+    VECTOR_CANDIDATES_PER_RESULT,
+    VECTOR_MAX_CANDIDATES,
+    VECTOR_EXACT_THRESHOLD,
+    VECTOR_CARDINALITY_TTL,
+    EMBEDDING_STORAGE,
+)
 from app.db.mongo_client import atlas_client, COLLECTION_NAME
+from app.utils.async_utils import run_io
+from app.utils.geo_utils import canonical_location, within_radius
+from app.utils.log import get_logger
+from app.utils.metrics import MONGO_SECONDS
+from app.utils.vector_codec import encode_vector, decode_float32
 
 
 load_dotenv()
 
+logger = get_logger(__name__)
+
 collection = atlas_client.get_collection(COLLECTION_NAME)
 
-def insert_news_vector(doc: Dict[str, Any]) -> bool:
+def content_id(doc: Dict[str, Any]) -> str:
+    """
+    Stable `_id` from the article's content: canonical location, normalized
+    URL and normalized title. The same story fetched again for the same
+    location maps to the same document; distinct stories never collide
+    just because they share a location and request timestamp.
+    """
+    url = normalize_url(doc.get("source_url") or doc.get("link") or "")
+    title = " ".join((doc.get("raw_title") or "").lower().split())
+    location_key = doc.get("location_key") or canonical_location(doc.get("location") or "")
+    raw = f"{location_key}\0{url}\0{title}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+_TRACKING_PREFIXES = ("utm_", "fbclid", "gclid", "ocid")
+
+
+def normalize_url(url: str) -> str:
+    """
+    Lowercase scheme and host, drop the fragment, tracking parameters and a
+    trailing slash, so trivially different links to one article match.
+    """
+    url = url.strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                       if not k.lower().startswith(_TRACKING_PREFIXES)])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), query, ""))
+
+
+def bulk_upsert(target, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
-    Inserts a single vectorized news summary with emotion label into MongoDB.
-    
+    Write `docs` (each with an `_id`) in one unordered `bulk_write` of
+    `$setOnInsert` upserts: new IDs are inserted, existing ones are left
+    untouched. Repeats within `docs` are sent once. `syndicated_sources` is
+    the exception: it is merged with `$addToSet`, so links to a story that
+    was stored earlier are still recorded.
+
+    Returns:
+        Dict: {"inserted": int, "duplicates": int, "errors": int, "inserted_ids": List[str],
+               "failed": List[int]}, where `failed` holds the indices into `docs`
+               of documents that were not written
+    """
+    unique: Dict[Any, Dict[str, Any]] = {}
+    for doc in docs:
+        unique.setdefault(doc["_id"], doc)
+    if not unique:
+        return {"inserted": 0, "duplicates": 0, "errors": 0, "inserted_ids": [], "failed": []}
+
+    ops = []
+    for _id, doc in unique.items():
+        update = {"$setOnInsert": {k: v for k, v in doc.items() if k != "syndicated_sources"}}
+        if doc.get("syndicated_sources"):
+            update["$addToSet"] = {"syndicated_sources": {"$each": doc["syndicated_sources"]}}
+        ops.append(UpdateOne({"_id": _id}, update, upsert=True))
+    failed_ids = set()
+    try:
+        with MONGO_SECONDS.time(operation="bulk_upsert"):
+            upserted = target.bulk_write(ops, ordered=False).upserted_ids
+    except BulkWriteError as e:
+        ids = list(unique)
+        failed_ids = {ids[err["index"]] for err in e.details.get("writeErrors", [])}
+        logger.warning("%d write errors in bulk upsert", len(failed_ids))
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+    inserted_ids = list(upserted.values())
+    failed = [i for i, doc in enumerate(docs) if doc["_id"] in failed_ids]
+    return {"inserted": len(inserted_ids), "duplicates": len(docs) - len(inserted_ids) - len(failed),
+            "errors": len(failed_ids), "inserted_ids": inserted_ids, "failed": failed}
+
+
+def insert_news_vectors(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store a batch of vectorized news summaries in one round trip.
+
+    Each doc is written with a content-hash `_id` (see `content_id`), its
+    `location_key` and an encoded embedding. The caller's dicts are not
+    modified, so their embeddings stay plain lists.
+
     Expected doc:
     {
         "location": "Delhi",
+        "raw_title": "Flood hits Delhi",
         "summary": "Floods disrupt transportation in several districts.",
-        "emotion": "fear",
+        "sentiment": "fear",
         "embedding": [...],  # 384/768 dim vector
-        "timestamp": "2025-06-11T14:22:00Z",
-        "sources": [
-            {"title": "Flood hits Delhi", "link": "https://...", "source": "BBC"}
-        ]
+        "source_url": "https://...",
+        "timestamp": "2025-06-11T14:22:00Z"
     }
+
+    Returns:
+        Dict: see `bulk_upsert`
     """
-    try:
-        doc["_id"] = f"{doc['location']}_{doc['timestamp']}"  # deduplication ID
-        collection.insert_one(doc)
-        return True
-    except DuplicateKeyError:
-        return False
+    rows = []
+    for doc in docs:
+        row = {**doc, "location_key": canonical_location(doc["location"])}
+        row["_id"] = content_id(row)
+        row["embedding"] = encode_vector(doc["embedding"], EMBEDDING_STORAGE)
+        rows.append(row)
+    result = bulk_upsert(collection, rows)
+
+    new_ids = set(result["inserted_ids"])
+    for doc in rows:
+        if doc["_id"] not in new_ids:
+            continue
+        new_ids.discard(doc["_id"])  # once per id, even if repeated in the batch
+        cached = _cardinality.get(doc["location_key"])
+        if cached:
+            _cardinality[doc["location_key"]] = (cached[0], cached[1] + 1)
+        if VECTOR_BACKEND == "local":
+            _index_doc(doc)
+    return result
+
+
+def insert_news_vector(doc: Dict[str, Any]) -> bool:
+    """
+    Single-document form of `insert_news_vectors`; False for a duplicate.
+    """
+    return insert_news_vectors([doc])["inserted"] == 1
+
+
+def set_geo(ids: List[str], point: Dict[str, Any]) -> int:
+    """
+    Set `geo` on the stored documents `ids` that have none yet, for a
+    geocode that arrived after they were written. Returns the number updated.
+    """
+    if not ids:
+        return 0
+    with MONGO_SECONDS.time(operation="set_geo"):
+        return collection.update_many(
+            {"_id": {"$in": ids}, "geo": {"$exists": False}}, {"$set": {"geo": point}}
+        ).modified_count
 
 
 def vector_search_by_location(embedding, location, k=5):
@@ -46,26 +194,58 @@ def vector_search_by_location(embedding, location, k=5):
 
     Args:
         embedding (List[float]): Query vector
-        location (str): Location string (e.g., "Paris")
+        location (str): Location string (e.g., "Paris"); matched on its canonical key
         k (int): Number of results
 
     Returns:
         List[Dict]: Similar events from same place
     """
-    pipeline = [
-        {
-            "$vectorSearch": {
-                "queryVector": embedding,
-                "path": "embedding",
-                "numCandidates": 100,
-                "limit": k,
-                "index": "vector_index"
-            }
-        },
+    if VECTOR_BACKEND == "local":
+        return _local_search(embedding, location, k)
+
+    location_key = canonical_location(location)
+    num_candidates, exact = num_candidates_for(k, location_cardinality(location_key))
+    with MONGO_SECONDS.time(operation="vector_search"):
+        return list(collection.aggregate(
+            build_vector_search_pipeline(embedding, location_key, k, num_candidates, exact)
+        ))
+
+
+def find_news_near(longitude: float, latitude: float, radius_km: float, limit: int = 20) -> List[Dict]:
+    """
+    Latest stored events within `radius_km` of a point, newest first.
+    Served by the `geo` 2dsphere index (see schema_setup.create_indexes).
+    """
+    cursor = collection.find(
+        within_radius(longitude, latitude, radius_km),
+        {"_id": 0, **{f: 1 for f in _RESULT_FIELDS}, "location": 1, "geo": 1},
+    ).sort("timestamp", -1).limit(limit)
+    with MONGO_SECONDS.time(operation="find_near"):
+        return list(cursor)
+
+
+def build_vector_search_pipeline(embedding, location_key: str, k: int,
+                                 num_candidates: int, exact: bool = False) -> List[Dict]:
+    """
+    `$vectorSearch` with the location pushed in as a pre-filter. Requires
+    `location_key` to be declared as a filter field on `vector_index`
+    (see schema_setup.create_vector_index).
+    """
+    search = {
+        "queryVector": embedding,
+        "path": "embedding",
+        "filter": {"location_key": location_key},
+        "limit": k,
+        "index": "vector_index"
+    }
+    if exact:
+        search["exact"] = True
+    else:
+        search["numCandidates"] = num_candidates
+
+    return [
         {
-            "$match": {
-                "location": {"$regex": location, "$options": "i"}
-            }
+            "$vectorSearch": search
         },
         {
             "$sort": {"timestamp": -1}
@@ -81,4 +261,163 @@ def vector_search_by_location(embedding, location, k=5):
             }
         }
     ]
-    return list(collection.aggregate(pipeline))
+
+
+def num_candidates_for(k: int, location_count: int, total_count: Optional[int] = None) -> Tuple[int, bool]:
+    """
+    Size `numCandidates` from k and location cardinality.
+
+    Returns `(num_candidates, exact)`. Locations small enough to scan are
+    searched exactly. Otherwise the baseline of
+    VECTOR_CANDIDATES_PER_RESULT * k is scaled by 1/sqrt(selectivity):
+    a filtered HNSW walk visits many non-matching nodes when the location
+    is a small share of the corpus. The result is capped at
+    VECTOR_MAX_CANDIDATES.
+    """
+    if location_count <= max(k, VECTOR_EXACT_THRESHOLD):
+        return location_count, True
+
+    total = total_count if total_count is not None else _total_count()
+    selectivity = min(1.0, location_count / total) if total else 1.0
+    candidates = VECTOR_CANDIDATES_PER_RESULT * k / math.sqrt(max(selectivity, 1e-4))
+    return int(min(VECTOR_MAX_CANDIDATES, location_count, max(candidates, k))), False
+
+
+_cardinality: Dict[str, Tuple[float, int]] = {}
+_total: Tuple[float, int] = (0.0, 0)
+
+
+def location_cardinality(location_key: str) -> int:
+    """
+    Documents stored for `location_key`; counted on `location_key_index`
+    and cached for VECTOR_CARDINALITY_TTL seconds.
+    """
+    now = time.monotonic()
+    cached = _cardinality.get(location_key)
+    if cached and now - cached[0] < VECTOR_CARDINALITY_TTL:
+        return cached[1]
+    with MONGO_SECONDS.time(operation="count"):
+        count = collection.count_documents({"location_key": location_key})
+    _cardinality[location_key] = (now, count)
+    return count
+
+
+def _total_count() -> int:
+    global _total
+    now = time.monotonic()
+    if now - _total[0] >= VECTOR_CARDINALITY_TTL:
+        _total = (now, collection.estimated_document_count())
+    return _total[1]
+
+
+# ------------------------------------------------------------------------ #
+# Local vector index backend
+# ------------------------------------------------------------------------ #
+
+_RESULT_FIELDS = ("summary", "sentiment", "timestamp", "raw_title", "source_url")
+
+_local_index = None
+_local_lock = threading.Lock()
+_unsaved = 0
+
+
+def _location_key(location: Optional[str]) -> str:
+    return canonical_location(location or "")
+
+
+def build_local_index(dims: Optional[int] = None):
+    """
+    Build the local index from every stored document that has an embedding
+    and persist it to VECTOR_INDEX_PATH.
+    """
+    from app.services.vector_index import LocalVectorIndex
+
+    index = None
+    projection = {"embedding": 1, "location": 1, **{f: 1 for f in _RESULT_FIELDS}}
+    for doc in collection.find({"embedding": {"$exists": True, "$ne": []}}, projection):
+        vector = decode_float32(doc["embedding"])
+        if index is None:
+            index = LocalVectorIndex(dims or len(vector), VECTOR_INDEX_NLIST, VECTOR_INDEX_NPROBE)
+        index.add(doc["_id"], vector, _location_key(doc.get("location")),
+                  {f: doc.get(f) for f in _RESULT_FIELDS})
+
+    if index is None:
+        if dims is None:
+            return None
+        index = LocalVectorIndex(dims, VECTOR_INDEX_NLIST, VECTOR_INDEX_NPROBE)
+    index.train()
+    index.save(Path(VECTOR_INDEX_PATH))
+    return index
+
+
+def get_local_index(dims: Optional[int] = None):
+    """
+    Load the persisted index (memory-mapped) or build it from the collection.
+    Returns None while there is nothing to index and `dims` is unknown.
+    """
+    global _local_index
+    with _local_lock:
+        if _local_index is None:
+            from app.services.vector_index import LocalVectorIndex
+
+            path = Path(VECTOR_INDEX_PATH)
+            if (path / "meta.json").exists():
+                _local_index = LocalVectorIndex.load(path)
+            else:
+                _local_index = build_local_index(dims)
+        return _local_index
+
+
+def save_local_index() -> None:
+    global _unsaved
+    if _local_index is not None:
+        _local_index.save(Path(VECTOR_INDEX_PATH))
+        _unsaved = 0
+
+
+def _index_doc(doc: Dict[str, Any]) -> None:
+    global _unsaved
+    embedding = decode_float32(doc.get("embedding"))
+    if not len(embedding):
+        return
+    index = get_local_index(dims=len(embedding))
+    if index is None:
+        return
+    index.add(doc["_id"], embedding, _location_key(doc.get("location")),
+              {f: doc.get(f) for f in _RESULT_FIELDS})
+    _unsaved += 1
+    if _unsaved >= VECTOR_INDEX_SAVE_EVERY:
+        save_local_index()
+
+
+def _local_search(embedding, location, k=5) -> List[Dict]:
+    index = get_local_index()
+    if index is None or not embedding or len(embedding) != index.dims:
+        return []
+    hits = index.search(embedding, k=k, location=_location_key(location))
+    results = [{f: hit.get(f) for f in _RESULT_FIELDS} for hit in hits]
+    return sorted(results, key=lambda r: r.get("timestamp") or "", reverse=True)
+
+
+# ------------------------------------------------------------------------ #
+# Async wrappers (pymongo is blocking; run it on the Mongo I/O pool)
+# ------------------------------------------------------------------------ #
+
+async def insert_news_vector_async(doc: Dict[str, Any]) -> bool:
+    return await run_io(insert_news_vector, doc)
+
+
+async def insert_news_vectors_async(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return await run_io(insert_news_vectors, docs)
+
+
+async def set_geo_async(ids: List[str], point: Dict[str, Any]) -> int:
+    return await run_io(set_geo, ids, point)
+
+
+async def vector_search_by_location_async(embedding, location, k=5):
+    return await run_io(vector_search_by_location, embedding, location, k)
+
+
+async def find_news_near_async(longitude: float, latitude: float, radius_km: float, limit: int = 20) -> List[Dict]:
+    return await run_io(find_news_near, longitude, latitude, radius_km, limit)
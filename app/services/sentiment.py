@@ -2,22 +2,43 @@
 """
 Emotion classifier service using Hugging Face model:
 https://huggingface.co/boltuix/bert-emotion
+
+With CLASSIFY_BATCHING on, every model call goes through one micro-batching
+scheduler, so concurrent requests share forward passes. The API awaits the
+scheduler from the event loop (`classify_batch_async`), so queued requests do
+not hold inference threads while they wait. EMOTION_BACKEND picks
+fp32 PyTorch, int8 or ONNX Runtime (see utils/inference_backend.py).
 """
 
 from __future__ import annotations
-from typing import List, Dict, Any
+import asyncio
+from typing import TYPE_CHECKING, List, Dict, Any, Iterator
 from functools import lru_cache
 
-import torch
-import torch.nn.functional as F
-from transformers import (
-    AutoTokenizer,
-    AutoModelForSequenceClassification,
-    PreTrainedTokenizerBase,
-    PreTrainedModel,
+# torch / transformers are imported on first use so importing the app stays cheap
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerBase, PreTrainedModel
+
+from app.config import (
+    CLASSIFY_BATCHING,
+    CLASSIFY_MAX_BATCH,
+    CLASSIFY_MAX_WAIT_MS,
+    CLASSIFY_TOKEN_BUDGET,
+    EMOTION_BACKEND,
+    EMOTION_MODEL,
 )
+from app.utils.async_utils import run_inference
+from app.utils.batching import MicroBatcher
+from app.utils.cache import EnrichmentCache
+from app.utils.metrics import model_call
+
+MODEL_NAME = EMOTION_MODEL
 
-MODEL_NAME = "boltuix/bert-emotion"
+# Quantized backends can round differently, so their results are cached apart
+_cache = EnrichmentCache(
+    "emotion",
+    version=MODEL_NAME if EMOTION_BACKEND == "torch" else f"{MODEL_NAME}+{EMOTION_BACKEND}",
+)
 
 
 # --------------------------------------------------------------------------- #
@@ -25,14 +46,26 @@ MODEL_NAME = "boltuix/bert-emotion"
 # --------------------------------------------------------------------------- #
 @lru_cache(maxsize=1)
 def _get_tokenizer() -> PreTrainedTokenizerBase:
+    from transformers import AutoTokenizer
     return AutoTokenizer.from_pretrained(MODEL_NAME)
 
 
 @lru_cache(maxsize=1)
 def _get_model() -> PreTrainedModel:
+    from transformers import AutoModelForSequenceClassification
+    from app.utils.inference_backend import optimize
+
     model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
     model.eval()  # inference mode
-    return model
+    return optimize(model, EMOTION_BACKEND, MODEL_NAME, output="logits")
+
+
+def warm_up() -> None:
+    """
+    Load tokenizer and model now instead of on the first request.
+    """
+    _get_tokenizer()
+    _get_model()
 
 
 # --------------------------------------------------------------------------- #
@@ -55,15 +88,7 @@ def classify(text: str) -> Dict[str, Any]:
     if not text.strip():
         return _empty_response()
 
-    tokenizer = _get_tokenizer()
-    model = _get_model()
-
-    with torch.no_grad():
-        inputs = tokenizer(text, truncation=True, return_tensors="pt")
-        logits = model(**inputs).logits
-        probs = F.softmax(logits, dim=-1)[0]
-
-    return _probs_to_response(probs)
+    return _cache.get_or_compute_one(text, _classify_one)
 
 
 def classify_batch(texts: List[str]) -> List[Dict[str, Any]]:
@@ -71,37 +96,120 @@ def classify_batch(texts: List[str]) -> List[Dict[str, Any]]:
     Classify a batch of texts (better GPU/CPU utilisation).
 
     `texts` length can be anything; empty / blank strings will return neutral.
+    Only texts missing from the enrichment cache reach the model.
+    """
+    return _cache.get_or_compute(texts, _classify_many)
+
+
+async def classify_batch_async(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    `classify_batch` for async callers. With CLASSIFY_BATCHING the cache
+    misses are queued on the scheduler and awaited on the event loop, so any
+    number of concurrent requests can share one forward pass; otherwise the
+    batch runs on the inference pool.
+    """
+    if not CLASSIFY_BATCHING:
+        return await run_inference(classify_batch, texts)
+    return await _cache.get_or_compute_async(texts, _classify_many_async)
+
+
+def batching_stats() -> Dict[str, Any]:
+    """
+    Queue depth, batch-size histogram and added wait of the scheduler.
     """
+    return {"enabled": CLASSIFY_BATCHING, **_batcher.stats()}
+
+
+# --------------------------------------------------------------------------- #
+# Inference                                                                   #
+# --------------------------------------------------------------------------- #
+def _classify_one(text: str) -> Dict[str, Any]:
+    if CLASSIFY_BATCHING:
+        return _batcher.submit(text).result()
+    return _run_model_single(text)
+
+
+def _classify_many(texts: List[str]) -> List[Dict[str, Any]]:
+    if CLASSIFY_BATCHING:
+        return _batcher.map(texts)
+    return _run_model(texts)
+
+
+async def _classify_many_async(texts: List[str]) -> List[Dict[str, Any]]:
+    return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in _batcher.submit_many(texts))))
+
+
+def _run_model_single(text: str) -> Dict[str, Any]:
+    return _run_model([text])[0]
+
+
+def _run_model(texts: List[str], token_budget: int = CLASSIFY_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    """
+    Tokenize once without padding, then run length-sorted chunks of at most
+    `token_budget` padded tokens each, restoring the input order at the end.
+    """
+    import torch
+    import torch.nn.functional as F
+
     tokenizer = _get_tokenizer()
     model = _get_model()
 
     cleaned = [t if t.strip() else " " for t in texts]  # keep positional order
-    with torch.no_grad():
-        inputs = tokenizer(
-            cleaned,
-            truncation=True,
-            padding=True,
-            return_tensors="pt",
-        )
-        logits = model(**inputs).logits
-        probs = F.softmax(logits, dim=-1)
+    encoded = tokenizer(cleaned, truncation=True)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    order = sorted(range(len(cleaned)), key=lengths.__getitem__)
+
+    rows: List[List[float]] = [[] for _ in cleaned]
+    tops: List[int] = [0] * len(cleaned)
+    with torch.no_grad(), model_call("emotion", len(cleaned)):
+        for chunk in _length_buckets(order, lengths, token_budget):
+            batch = tokenizer.pad(
+                [{key: encoded[key][i] for key in encoded.keys()} for i in chunk],
+                return_tensors="pt",
+            )
+            probs = F.softmax(model(**batch).logits, dim=-1).double()
+            rounded = (probs * 10_000).round() / 10_000
+            for i, row, top in zip(chunk, rounded.tolist(), probs.argmax(dim=-1).tolist()):
+                rows[i], tops[i] = row, top
+
+    return [_row_to_response(row, top) for row, top in zip(rows, tops)]
+
+
+def _length_buckets(order: List[int], lengths: List[int], token_budget: int) -> Iterator[List[int]]:
+    """
+    Split length-sorted row indices into chunks whose padded size
+    (rows x longest length) stays within `token_budget`.
+    """
+    chunk: List[int] = []
+    for i in order:
+        # ascending order: the newest row is always the chunk's longest
+        if chunk and (len(chunk) + 1) * lengths[i] > token_budget:
+            yield chunk
+            chunk = []
+        chunk.append(i)
+    if chunk:
+        yield chunk
 
-    return [_probs_to_response(p) for p in probs]
+
+_batcher = MicroBatcher("emotion", _run_model, CLASSIFY_MAX_BATCH, CLASSIFY_MAX_WAIT_MS)
 
 
 # --------------------------------------------------------------------------- #
 # Helpers                                                                     #
 # --------------------------------------------------------------------------- #
-_id2label = _get_model().config.id2label  # cache once
+@lru_cache(maxsize=1)
+def _get_labels() -> List[str]:
+    id2label = _get_model().config.id2label  # cache once
+    return [id2label[i] for i in range(len(id2label))]
 
 
-def _probs_to_response(probs: torch.Tensor) -> Dict[str, Any]:
-    top_idx = int(torch.argmax(probs))
-    scores = { _id2label[i]: float(round(probs[i].item(), 4)) for i in range(len(probs)) }
+def _row_to_response(row: List[float], top_idx: int) -> Dict[str, Any]:
+    labels = _get_labels()
+    scores = dict(zip(labels, row))
 
     return {
-        "emotion": _id2label[top_idx],
-        "confidence": scores[_id2label[top_idx]],
+        "emotion": labels[top_idx],
+        "confidence": scores[labels[top_idx]],
         "scores": scores,
     }
 
@@ -110,5 +218,5 @@ def _empty_response() -> Dict[str, Any]:
     return {
         "emotion": "neutral",
         "confidence": 1.0,
-        "scores": {lbl: (1.0 if lbl == "neutral" else 0.0) for lbl in _id2label.values()},
+        "scores": {lbl: (1.0 if lbl == "neutral" else 0.0) for lbl in _get_labels()},
     }
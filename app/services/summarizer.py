@@ -1,37 +1,73 @@
 """
 Summarizer Service
 
-Summarizes text using either:
-1. OpenAI GPT (if OPENAI_API_KEY is present)
-2. HuggingFace transformers pipeline as fallback
+Summarizes text along one of three routes, chosen by approximate length:
+1. passthrough: short texts (most Serper snippets) are returned unchanged
+2. extractive: medium texts get a TextRank-style summary of their most
+   central sentences, kept in their original order
+3. abstractive: long texts go to Gemini (if GCP_PROJECT_ID is set) or to
+   the local HuggingFace model (SUMMARY_MODEL, distilbart by default)
+
+`routing_stats()` reports per-route counts and latency.
 """
 
 from __future__ import annotations
+import math
 import os
-from typing import List, Union
+import re
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Union
 from functools import lru_cache
 
-from transformers import pipeline, Pipeline
-import vertexai
-from rouge import Rouge
-from vertexai.generative_models import GenerationConfig, GenerativeModel
+import numpy as np
+
 from dotenv import load_dotenv
 
+# transformers and Vertex AI are imported on first use, not at import time
+if TYPE_CHECKING:
+    from transformers import Pipeline
+
+from app.config import (
+    GEMINI_API_ENDPOINT,
+    GEMINI_BACKOFF_BASE,
+    GEMINI_BACKOFF_MAX,
+    GEMINI_BURST,
+    GEMINI_MAX_IN_FLIGHT,
+    GEMINI_MAX_RETRIES,
+    GEMINI_RPS,
+    SUMMARY_ABSTRACTIVE_TOKENS,
+    SUMMARY_EXTRACTIVE_SENTENCES,
+    SUMMARY_LOCAL_FALLBACK,
+    SUMMARY_MODEL,
+    SUMMARY_PASSTHROUGH_TOKENS,
+)
+from app.utils.cache import EnrichmentCache
+from app.utils.log import get_logger
+from app.utils.metrics import model_call
+from app.utils.rate_limit import RateLimitedExecutor
+
 load_dotenv()
 
+logger = get_logger(__name__)
+
 # ------------------------------------------------------------------------ #
 # Config
 # ------------------------------------------------------------------------ #
 
 USE_GEMINI = bool(os.getenv("GCP_PROJECT_ID"))
 
-vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location="us-central1")
-
-generation_model = GenerativeModel("gemini-2.0-flash")
+logger.info("Abstractive summaries via %s", "Gemini" if USE_GEMINI else "the local model")
 
-generation_config = GenerationConfig(temperature=0.1, max_output_tokens=256)
+GEMINI_MODEL_NAME = "gemini-2.0-flash"
+LOCAL_MODEL_NAME = SUMMARY_MODEL
 
-print("USE_GEMINI:", bool(os.getenv("GCP_PROJECT_ID")))
+# Failed Gemini calls return bracketed error strings; never cache those.
+_cache = EnrichmentCache(
+    "summary",
+    version=GEMINI_MODEL_NAME if USE_GEMINI else LOCAL_MODEL_NAME,
+    cacheable=lambda s: bool(s) and not s.startswith("["),
+)
 
 # ------------------------------------------------------------------------ #
 # Core API
@@ -41,79 +77,339 @@ def summarize(text: str) -> str:
     """
     Summarize a single news article or paragraph.
 
-    Uses Gemini if enabled, otherwise falls back to local model.
+    Long texts use Gemini if enabled, otherwise the local model.
     """
     text = text.strip()
     if not text:
-        print("Empty text received for summarization.")
+        logger.debug("Empty text received for summarization.")
         return ""
 
-    if USE_GEMINI:
-        print("Using Gemini summarizer")
-        try:
-            return _gemini_summary(text)
-        except Exception as e:
-            print(f"Gemini summarization failed: {e}")
-            # Optional: fallback to local summarizer if Gemini fails
-            print("Falling back to local Hugging Face summarizer")
-            return _local_summarizer().__call__(text, truncation=True, max_length=128)[0]["summary_text"]
+    route = route_for(text)
+    start = time.perf_counter()
+    if route == "passthrough":
+        summary = text
+    elif route == "extractive":
+        summary = extractive_summary(text)
     else:
-        print("Using local Hugging Face summarizer")
-        return _local_summarizer().__call__(text, truncation=True, max_length=128)[0]["summary_text"]
+        summary = _cache.get_or_compute_one(text, _summarize_one)
+    _route_stats.record(route, 1, time.perf_counter() - start)
+    return summary
 
 def summarize_batch(texts: List[str]) -> List[str]:
     """
     Summarize a batch of texts (used for dataset ingestion).
+
+    Texts are grouped by route; of the long ones, only those missing from
+    the enrichment cache reach the model. Output order matches input order.
     """
     if not texts:
-        print("Empty batch received for summarization.")
+        logger.debug("Empty batch received for summarization.")
         return []
 
-    if USE_GEMINI:
-        print("Using Gemini summarizer for batch")
-        summaries = []
-        for t in texts:
-            try:
-                summaries.append(_gemini_summary(t))
-            except Exception as e:
-                print(f"Gemini summarization failed for batch item: {e}")
-                # Optional: fallback to local summarizer for this item
-                summaries.append(_local_summarizer().__call__(t, truncation=True, max_length=128)[0]["summary_text"])
-        return summaries
-    else:
-        print("Using local Hugging Face summarizer for batch")
+    groups: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        groups.setdefault(route_for(text), []).append(i)
+
+    summaries: List[str] = [""] * len(texts)
+    for route, idx in groups.items():
+        start = time.perf_counter()
+        if route == "passthrough":
+            results = [texts[i] for i in idx]
+        elif route == "extractive":
+            results = [extractive_summary(texts[i]) for i in idx]
+        else:
+            results = _cache.get_or_compute([texts[i] for i in idx], _summarize_many)
+        for i, summary in zip(idx, results):
+            summaries[i] = summary
+        _route_stats.record(route, len(idx), time.perf_counter() - start)
+    return summaries
+
+def routing_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Items, calls and latency per summarization route since startup.
+    """
+    return _route_stats.snapshot()
+
+def _summarize_one(text: str) -> str:
+    return _summarize_many([text])[0]
+
+def _summarize_many(texts: List[str]) -> List[str]:
+    with model_call("summary", len(texts)):
+        if USE_GEMINI:
+            return _gemini_or_fallback(texts)
         summarizer = _local_summarizer()
         return [r["summary_text"] for r in summarizer(texts, truncation=True, max_length=128)]
 
+def warm_up() -> None:
+    """
+    Load the summarization pipeline (or Vertex AI client) now instead of on the first request.
+    """
+    if USE_GEMINI:
+        _gemini_model()
+    else:
+        _local_summarizer()
+
+# ------------------------------------------------------------------------ #
+# Routing
+# ------------------------------------------------------------------------ #
+
+ROUTES = ("passthrough", "extractive", "abstractive")
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[\"'(\[]?[A-Z0-9])")
+_ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "jr.", "sr.", "gov.", "sen.", "rep.", "gen.", "lt.",
+                  "col.", "sgt.", "no.", "vs.", "inc.", "co.", "corp."}
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+
+def approx_tokens(text: str) -> int:
+    """
+    Words plus punctuation marks: close to a subword tokenizer's count for
+    news English, without loading one.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def route_for(text: str) -> str:
+    tokens = approx_tokens(text)
+    if tokens <= SUMMARY_PASSTHROUGH_TOKENS:
+        return "passthrough"
+    if tokens <= SUMMARY_ABSTRACTIVE_TOKENS:
+        return "extractive"
+    return "abstractive"
+
+
+class _RouteStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {r: {"items": 0, "calls": 0, "seconds": 0.0, "max_call_s": 0.0} for r in ROUTES}
+
+    def record(self, route: str, items: int, seconds: float) -> None:
+        with self._lock:
+            s = self._stats[route]
+            s["items"] += items
+            s["calls"] += 1
+            s["seconds"] += seconds
+            s["max_call_s"] = max(s["max_call_s"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            total = sum(s["items"] for s in self._stats.values())
+            return {
+                route: {
+                    "items": s["items"],
+                    "share": round(s["items"] / total, 4) if total else 0.0,
+                    "calls": s["calls"],
+                    "total_ms": round(s["seconds"] * 1000, 3),
+                    "mean_ms_per_item": round(s["seconds"] / s["items"] * 1000, 3) if s["items"] else 0.0,
+                    "max_call_ms": round(s["max_call_s"] * 1000, 3),
+                }
+                for route, s in self._stats.items()
+            }
+
+
+_route_stats = _RouteStats()
+
+# ------------------------------------------------------------------------ #
+# Extractive (TextRank-style)
+# ------------------------------------------------------------------------ #
+
+def split_sentences(text: str) -> List[str]:
+    sentences: List[str] = []
+    for part in _SENTENCE_RE.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        # "Dr. Smith" is one sentence: glue fragments ending in a title back on
+        if sentences and sentences[-1].rsplit(" ", 1)[-1].lower() in _ABBREVIATIONS:
+            sentences[-1] = f"{sentences[-1]} {part}"
+        else:
+            sentences.append(part)
+    return sentences
+
+
+def extractive_summary(text: str, max_sentences: int = SUMMARY_EXTRACTIVE_SENTENCES) -> str:
+    """
+    Pick the `max_sentences` most central sentences and return them in their
+    original order.
+
+    Sentences are ranked with TextRank: PageRank over a graph whose edge
+    weights are word overlap normalised by log sentence lengths. A small lead
+    bias keeps the news-style opening when scores are close.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return " ".join(sentences)
+
+    words = [set(_WORD_RE.findall(s.lower())) for s in sentences]
+    n = len(sentences)
+    sim = np.zeros((n, n))
+    for i in range(n):
+        for j in range(i + 1, n):
+            overlap = len(words[i] & words[j])
+            if overlap:
+                norm = math.log(len(words[i]) + 1) + math.log(len(words[j]) + 1)
+                sim[i, j] = sim[j, i] = overlap / norm
+
+    out_weight = sim.sum(axis=1, keepdims=True)
+    transition = np.divide(sim, out_weight, out=np.full_like(sim, 1.0 / n), where=out_weight > 0)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(30):
+        scores = 0.15 / n + 0.85 * transition.T @ scores
+
+    scores *= 1.0 + 0.1 / np.arange(1, n + 1)  # lead bias
+    keep = sorted(np.argsort(-scores, kind="stable")[:max_sentences])
+    return " ".join(sentences[i] for i in keep)
+
 # ------------------------------------------------------------------------ #
 # Local Model (HuggingFace)
 # ------------------------------------------------------------------------ #
 
+class _Seq2SeqSummarizer:
+    """
+    Stand-in for the "summarization" pipeline, which transformers 5 removed:
+    same call signature and `[{"summary_text": ...}]` results, on `generate`.
+    """
+
+    def __init__(self, model_name: str):
+        from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+
+    def __call__(self, texts: Union[str, List[str]], truncation: bool = True,
+                 max_length: int = 128) -> List[Dict[str, str]]:
+        import torch
+
+        batch = [texts] if isinstance(texts, str) else list(texts)
+        inputs = self.tokenizer(batch, truncation=truncation, padding=True, return_tensors="pt")
+        with torch.inference_mode():
+            output = self.model.generate(input_ids=inputs["input_ids"],
+                                         attention_mask=inputs["attention_mask"], max_length=max_length)
+        return [{"summary_text": t.strip()}
+                for t in self.tokenizer.batch_decode(output, skip_special_tokens=True)]
+
+
 @lru_cache(maxsize=1)
-def _local_summarizer() -> Pipeline:
-    return pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+def _local_summarizer() -> Union[Pipeline, _Seq2SeqSummarizer]:
+    from transformers import pipeline
+    from transformers.pipelines import SUPPORTED_TASKS
+
+    if "summarization" not in SUPPORTED_TASKS:
+        return _Seq2SeqSummarizer(LOCAL_MODEL_NAME)
+    return pipeline("summarization", model=LOCAL_MODEL_NAME)
 
 
 # ------------------------------------------------------------------------ #
-# OpenAI Summarizer
+# Gemini Summarizer (Vertex AI)
 # ------------------------------------------------------------------------ #
 
+@lru_cache(maxsize=1)
+def _gemini_model():
+    """
+    Initialise Vertex AI and return (model, generation config).
+    """
+    import vertexai
+    from vertexai.generative_models import GenerationConfig, GenerativeModel
+
+    if GEMINI_API_ENDPOINT:
+        # REST transport so a plain HTTP stand-in works; plain-http endpoints are
+        # local fakes and get anonymous credentials
+        from google.auth.credentials import AnonymousCredentials
+        vertexai.init(
+            project=os.getenv("GCP_PROJECT_ID"),
+            location="us-central1",
+            api_endpoint=GEMINI_API_ENDPOINT,
+            api_transport="rest",
+            credentials=AnonymousCredentials() if GEMINI_API_ENDPOINT.startswith("http://") else None,
+        )
+    else:
+        vertexai.init(project=os.getenv("GCP_PROJECT_ID"), location="us-central1")
+    return GenerativeModel(GEMINI_MODEL_NAME), GenerationConfig(temperature=0.1, max_output_tokens=256)
+
+
 def _gemini_summary(text: str) -> str:
+    """
+    One Gemini call; raises on API / transport errors so the executor can retry.
+    """
     prompt = (
         "Summarize the following news story in one short paragraph. "
         "Preserve all key facts and emotional tone.\n\n"
         f"Article:\n{text}\n\nSummary:"
     )
 
+    generation_model, generation_config = _gemini_model()
+    response = generation_model.generate_content(
+        contents=prompt,
+        generation_config=generation_config
+    )
+    # For Vertex AI, response.text is usually the summary
     try:
-        response = generation_model.generate_content(
-            contents=prompt,
-            generation_config=generation_config
-        )
-        # For Vertex AI, response.text is usually the summary
-        summary = getattr(response, "text", None)
-        if not summary or not summary.strip():
-            return "[No summary generated]"
-        return summary.strip()
-    except Exception as e:
-        return f"[Summarization failed: {e}]"
\ No newline at end of file
+        summary = response.text
+    except ValueError:  # blocked or empty candidate
+        summary = None
+    if not summary or not summary.strip():
+        return "[No summary generated]"
+    return summary.strip()
+
+
+def _is_retryable(error: BaseException) -> bool:
+    # 429 / 5xx / deadline from google-api-core, or a dropped connection
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in (
+        "ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "DeadlineExceeded", "ServiceUnavailable",
+    )
+
+
+# One shared executor per process: GEMINI_MAX_IN_FLIGHT concurrent calls,
+# GEMINI_RPS sustained across single and batch summaries alike
+_gemini_executor = RateLimitedExecutor(
+    "gemini",
+    _gemini_summary,
+    max_in_flight=GEMINI_MAX_IN_FLIGHT,
+    rate=GEMINI_RPS,
+    burst=GEMINI_BURST,
+    max_retries=GEMINI_MAX_RETRIES,
+    backoff_base=GEMINI_BACKOFF_BASE,
+    backoff_max=GEMINI_BACKOFF_MAX,
+    is_retryable=_is_retryable,
+)
+
+
+def _gemini_or_fallback(texts: List[str]) -> List[str]:
+    """
+    Summarize concurrently with Gemini, in input order. Items that still fail
+    after retries go to the local model together in one batch (or come back
+    as bracketed error strings, which are never cached).
+    """
+    outcomes = _gemini_executor.map(texts) if len(texts) > 1 else [_gemini_executor.call(texts[0])]
+    summaries = [result if ok else f"[Summarization failed: {result}]" for ok, result in outcomes]
+    failed = [i for i, (ok, _) in enumerate(outcomes) if not ok]
+    if failed:
+        logger.warning("Gemini summarization failed for %d/%d items%s", len(failed), len(texts),
+                       "; falling back to the local model" if SUMMARY_LOCAL_FALLBACK else "")
+        if SUMMARY_LOCAL_FALLBACK:
+            local = _local_summarizer()([texts[i] for i in failed], truncation=True, max_length=128)
+            for i, r in zip(failed, local):
+                summaries[i] = r["summary_text"]
+    return summaries
+
+
+def split_rate_limit(parts: int) -> None:
+    """
+    Keep 1/parts of the Gemini rate limit in this process. Called before
+    forking ingest workers, which each inherit their own token bucket.
+    """
+    bucket = _gemini_executor.bucket
+    bucket.rate /= parts
+    bucket.capacity = max(1.0, bucket.capacity / parts)
+
+
+def gemini_stats() -> Dict[str, float]:
+    """
+    Requests, retries, failures, latency and achieved requests/second of the
+    Gemini executor.
+    """
+    return _gemini_executor.stats()
@@ -0,0 +1,264 @@
+"""
+vector_index.py
+
+In-process approximate nearest-neighbour index used as an alternative to
+Atlas `$vectorSearch` (self-hosted Mongo, local development, tests).
+
+Vectors are L2-normalised float32 rows of one NumPy matrix, so cosine
+similarity is a dot product. An IVF (inverted file) layer clusters rows
+around k-means centroids; a query only scans the `nprobe` closest clusters.
+Locations with few rows skip IVF and are scanned exactly.
+
+The index persists to a directory (`vectors.npy`, `centroids.npy`,
+`meta.json`) and `vectors.npy` is memory-mapped on load.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def _normalize(v: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(v, axis=-1, keepdims=True)
+    return v / np.maximum(norms, 1e-12)
+
+
+class LocalVectorIndex:
+    """
+    IVF index over a growable float32 matrix with per-location filtering.
+
+    Args:
+        dims (int): Vector width
+        nlist (int): Number of IVF clusters (trained once `train_min` rows exist)
+        nprobe (int): Clusters scanned per query
+        exact_threshold (int): Locations with at most this many rows are scanned exactly
+    """
+
+    def __init__(self, dims: int, nlist: int = 64, nprobe: int = 8,
+                 exact_threshold: int = 2048, train_min: int = 4096):
+        self.dims = dims
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.train_min = train_min
+
+        self._vectors = np.zeros((0, dims), dtype=np.float32)
+        self._location_codes = np.zeros(0, dtype=np.int32)
+        self._codes: Dict[str, int] = {}
+        self._size = 0
+        self.ids: List[Any] = []
+        self.locations: List[str] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self._by_location: Dict[str, List[int]] = defaultdict(list)
+
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._assignment: List[int] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[:self._size]
+
+    # ------------------------------------------------------------------ #
+    # Writes
+    # ------------------------------------------------------------------ #
+
+    def add(self, doc_id: Any, vector: Iterable[float], location: str,
+            payload: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Add one vector. Returns False if its width does not match the index.
+        """
+        v = np.asarray(vector, dtype=np.float32)
+        if v.shape != (self.dims,):
+            return False
+        v = _normalize(v)
+
+        with self._lock:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._vectors[row] = v
+            self._location_codes[row] = self._code(location)
+            self._size += 1
+            self.ids.append(doc_id)
+            self.locations.append(location)
+            self.payloads.append(payload or {})
+            self._by_location[location].append(row)
+
+            if self.centroids is not None:
+                cluster = int(np.argmax(self.centroids @ v))
+                self._lists[cluster].append(row)
+                self._assignment.append(cluster)
+            elif self._size >= self.train_min:
+                self.train()
+        return True
+
+    def train(self, iterations: int = 10, sample: int = 50_000, seed: int = 0) -> None:
+        """
+        (Re)build IVF centroids with spherical k-means on a sample of rows.
+        """
+        with self._lock:
+            data = self.vectors
+            if len(data) < self.nlist:
+                return
+            rng = np.random.default_rng(seed)
+            sample_rows = data[rng.choice(len(data), size=min(sample, len(data)), replace=False)]
+            centroids = sample_rows[rng.choice(len(sample_rows), size=self.nlist, replace=False)].copy()
+
+            for _ in range(iterations):
+                assign = np.argmax(sample_rows @ centroids.T, axis=1)
+                for c in range(self.nlist):
+                    members = sample_rows[assign == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+
+            self.centroids = centroids.astype(np.float32)
+            self._assignment = self._assign_all(data).tolist()
+            self._lists = [[] for _ in range(self.nlist)]
+            for row, cluster in enumerate(self._assignment):
+                self._lists[cluster].append(row)
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+
+    def search(self, query: Iterable[float], k: int = 5, location: Optional[str] = None,
+               nprobe: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k by cosine similarity, optionally restricted to one location.
+
+        If the probed clusters hold fewer than k rows for `location`, more
+        clusters are probed until k are found or all have been scanned.
+        """
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            if location is not None:
+                rows = self._by_location.get(location, [])
+                if len(rows) <= self.exact_threshold or self.centroids is None:
+                    return self._rank(q, np.asarray(rows, dtype=np.int64), k)
+            elif self.centroids is None:
+                return self._rank(q, np.arange(self._size), k)
+
+            order = np.argsort(-(self.centroids @ q))
+            probe = nprobe or self.nprobe
+            while True:
+                candidates = np.concatenate(
+                    [np.asarray(self._lists[c], dtype=np.int64) for c in order[:probe]]
+                ) if probe else np.zeros(0, dtype=np.int64)
+                if location is not None:
+                    candidates = candidates[self._location_codes[candidates] == self._codes[location]]
+                if len(candidates) >= k or probe >= self.nlist:
+                    return self._rank(q, candidates, k)
+                probe = min(self.nlist, probe * 2)
+
+    def search_exact(self, query: Iterable[float], k: int = 5,
+                     location: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Brute-force reference search (used for recall measurement).
+        """
+        q = _normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            rows = np.asarray(self._by_location.get(location, []), dtype=np.int64) \
+                if location is not None else np.arange(self._size)
+            return self._rank(q, rows, k)
+
+    # ------------------------------------------------------------------ #
+    # Persistence
+    # ------------------------------------------------------------------ #
+
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            np.save(directory / "vectors.tmp.npy", self.vectors)
+            os.replace(directory / "vectors.tmp.npy", directory / "vectors.npy")
+            if self.centroids is not None:
+                np.save(directory / "centroids.npy", self.centroids)
+            meta = {
+                "dims": self.dims,
+                "nlist": self.nlist,
+                "nprobe": self.nprobe,
+                "exact_threshold": self.exact_threshold,
+                "train_min": self.train_min,
+                "trained": self.centroids is not None,
+                "ids": self.ids,
+                "locations": self.locations,
+                "payloads": self.payloads,
+            }
+            tmp = directory / "meta.json.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, default=str)
+            os.replace(tmp, directory / "meta.json")
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "LocalVectorIndex":
+        directory = Path(directory)
+        with open(directory / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls(meta["dims"], meta["nlist"], meta["nprobe"],
+                    meta["exact_threshold"], meta["train_min"])
+        vectors = np.load(directory / "vectors.npy", mmap_mode="r" if mmap else None)
+        index._vectors = vectors
+        index._size = len(vectors)
+        index.ids = meta["ids"]
+        index.locations = meta["locations"]
+        index.payloads = meta["payloads"]
+        index._location_codes = np.asarray([index._code(loc) for loc in index.locations], dtype=np.int32)
+        for row, location in enumerate(index.locations):
+            index._by_location[location].append(row)
+        if meta["trained"]:
+            index.centroids = np.load(directory / "centroids.npy")
+            index._assignment = index._assign_all(index.vectors).tolist()
+            index._lists = [[] for _ in range(index.nlist)]
+            for row, cluster in enumerate(index._assignment):
+                index._lists[cluster].append(row)
+        return index
+
+    # ------------------------------------------------------------------ #
+    # Helpers
+    # ------------------------------------------------------------------ #
+
+    def _code(self, location: str) -> int:
+        return self._codes.setdefault(location, len(self._codes))
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = len(self._vectors)
+        if needed <= capacity and not isinstance(self._vectors, np.memmap):
+            return
+        # grow geometrically; also copies a read-only memmap into RAM on first write
+        new_capacity = max(needed, capacity * 2, 1024)
+        grown = np.zeros((new_capacity, self.dims), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+        codes = np.zeros(new_capacity, dtype=np.int32)
+        codes[:self._size] = self._location_codes[:self._size]
+        self._location_codes = codes
+
+    def _assign_all(self, data: np.ndarray, chunk: int = 65_536) -> np.ndarray:
+        out = np.empty(len(data), dtype=np.int64)
+        for start in range(0, len(data), chunk):
+            out[start:start + chunk] = np.argmax(data[start:start + chunk] @ self.centroids.T, axis=1)
+        return out
+
+    def _rank(self, q: np.ndarray, rows: np.ndarray, k: int) -> List[Dict[str, Any]]:
+        if len(rows) == 0 or k <= 0:
+            return []
+        scores = self._vectors[rows] @ q
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"_id": self.ids[rows[i]], "score": float(scores[i]), **self.payloads[rows[i]]}
+            for i in top
+        ]
@@ -27,14 +27,7 @@ def format_response(articles: List[Dict], location: str, similar_past=None) -> D
         top_sentiment = "neutral"
         mood_summary = f"No strong emotional signals detected in recent news for {location}."
 
-    formatted_articles = []
-    for a in articles:
-        formatted_articles.append({
-            "title": a.get("raw_title", "No title"),
-            "summary": a.get("summary", "No summary available."),
-            "sentiment": a.get("sentiment", "neutral"),
-            "source": a.get("source_url", "#")
-        })
+    formatted_articles = [format_article(a) for a in articles]
 
     return {
         "location": location.title(),
@@ -45,3 +38,15 @@ def format_response(articles: List[Dict], location: str, similar_past=None) -> D
         "articles": formatted_articles,
         "similar_past": similar_past or []
     }
+
+
+def format_article(article: Dict) -> Dict:
+    """
+    Public fields of one enriched article, as listed in `articles` above.
+    """
+    return {
+        "title": article.get("raw_title", "No title"),
+        "summary": article.get("summary", "No summary available."),
+        "sentiment": article.get("sentiment", "neutral"),
+        "source": article.get("source_url", "#")
+    }
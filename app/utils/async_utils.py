@@ -0,0 +1,59 @@
+# async_utils.py
+"""
+Helpers for keeping blocking work off the asyncio event loop.
+
+Three bounded thread pools are kept:
+- inference: CPU-bound model calls (summarize / classify / embed)
+- mongo-io:  blocking pymongo round trips
+- geocode:   geocoder lookups, which wait on a rate limit and retry on
+             timeouts, so they never hold up Mongo calls
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from app.config import GEOCODE_WORKERS, INFERENCE_WORKERS, MONGO_IO_WORKERS
+
+T = TypeVar("T")
+
+_inference_executor = ThreadPoolExecutor(
+    max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"
+)
+_io_executor = ThreadPoolExecutor(
+    max_workers=MONGO_IO_WORKERS, thread_name_prefix="mongo-io"
+)
+_geocode_executor = ThreadPoolExecutor(
+    max_workers=GEOCODE_WORKERS, thread_name_prefix="geocode"
+)
+
+
+async def run_inference(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a CPU-bound model call on the bounded inference pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_inference_executor, partial(fn, *args, **kwargs))
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking I/O call (e.g. pymongo) on the bounded I/O pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, partial(fn, *args, **kwargs))
+
+
+async def run_geocode(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a (possibly rate-limited) geocoding call on the geocode pool.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_geocode_executor, partial(fn, *args, **kwargs))
+
+
+def shutdown_executors() -> None:
+    _inference_executor.shutdown(wait=False)
+    _io_executor.shutdown(wait=False)
+    _geocode_executor.shutdown(wait=False)
@@ -0,0 +1,140 @@
+# batching.py
+"""
+Dynamic (cross-request) micro-batching.
+
+Callers from any thread submit single items and get a
+`concurrent.futures.Future` back. A background thread drains the queue and
+flushes through one batch function call as soon as either `max_batch` items
+are waiting or the oldest waiting item has waited `max_wait_ms`.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Args:
+        name (str): Label used for the worker thread and in stats
+        batch_fn: Function mapping a list of inputs to a list of outputs (same order)
+        max_batch (int): Flush as soon as this many items are queued
+        max_wait_ms (float): Flush once the oldest queued item has waited this long
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch: int = 32, max_wait_ms: float = 5.0):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[float, Any, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    # ------------------------------------------------------------------ #
+    # Submission
+    # ------------------------------------------------------------------ #
+
+    def submit(self, item: Any) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((time.perf_counter(), item, future))
+        return future
+
+    def submit_many(self, items: List[Any]) -> List[Future]:
+        return [self.submit(item) for item in items]
+
+    def map(self, items: List[Any]) -> List[Any]:
+        """
+        Submit `items` and block until all results are ready.
+        """
+        return [f.result() for f in self.submit_many(items)]
+
+    # ------------------------------------------------------------------ #
+    # Worker
+    # ------------------------------------------------------------------ #
+
+    def _ensure_worker(self) -> None:
+        # (Re)start lazily, including after a fork, where threads are not inherited
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name=f"batcher-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = batch[0][0] + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    # Always take what is already queued; only block while within the wait budget
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[float, Any, Future]]) -> None:
+        started = time.perf_counter()
+        live = [(t, item, f) for t, item, f in batch if f.set_running_or_notify_cancel()]
+        if not live:
+            return
+        try:
+            outputs = self.batch_fn([item for _, item, _ in live])
+            for (_, _, future), output in zip(live, outputs):
+                future.set_result(output)
+        except Exception as e:
+            for _, _, future in live:
+                future.set_exception(e)
+        finally:
+            self._record(live, started, time.perf_counter())
+
+    # ------------------------------------------------------------------ #
+    # Stats
+    # ------------------------------------------------------------------ #
+
+    def _reset_stats(self) -> None:
+        self.batches = 0
+        self.items = 0
+        self.size_histogram: Dict[int, int] = {}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    def _record(self, batch, started: float, finished: float) -> None:
+        waits = [started - t for t, _, _ in batch]
+        bucket = 1 << (len(batch) - 1).bit_length()  # next power of two
+        with self._stats_lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.size_histogram[bucket] = self.size_histogram.get(bucket, 0) + 1
+            self.wait_total += sum(waits)
+            self.wait_max = max(self.wait_max, max(waits))
+            self.run_total += finished - started
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": {f"<={k}": v for k, v in sorted(self.size_histogram.items())},
+                "mean_added_wait_ms": round(self.wait_total / self.items * 1000, 3) if self.items else 0.0,
+                "max_added_wait_ms": round(self.wait_max * 1000, 3),
+                "mean_batch_run_ms": round(self.run_total / self.batches * 1000, 3) if self.batches else 0.0,
+            }
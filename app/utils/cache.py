@@ -0,0 +1,271 @@
+# cache.py
+"""
+Content-addressed cache for model outputs (summaries, emotions, embeddings).
+
+Entries are keyed by sha256(namespace + model/version tag + normalized text),
+so changing the model invalidates old results automatically. Two tiers:
+
+1. In-process LRU bounded by `CACHE_MAX_ITEMS`
+2. SQLite file at `CACHE_DB_PATH` that survives restarts
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.config import CACHE_ENABLED, CACHE_MAX_ITEMS, CACHE_DB_PATH
+from app.utils.async_utils import run_io
+
+_registry: Dict[str, "EnrichmentCache"] = {}
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+
+class _SqliteStore:
+    """
+    Shared key/value table. Connections are opened lazily per process so
+    forked ingest workers never reuse the parent's handle.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        if not keys:
+            return {}
+        found: Dict[str, bytes] = {}
+        with self._lock:
+            conn = self._connection()
+            for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        if not items:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.executemany("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", items.items())
+            conn.commit()
+
+
+_store: Optional[_SqliteStore] = None
+
+
+def _get_store() -> Optional[_SqliteStore]:
+    global _store
+    if _store is None and CACHE_DB_PATH:
+        _store = _SqliteStore(CACHE_DB_PATH)
+    return _store
+
+
+class EnrichmentCache:
+    """
+    Two-tier cache for one kind of model output.
+
+    Args:
+        namespace (str): e.g. "summary", "emotion", "embedding"
+        version (str): model name / version tag, part of every key
+        encode, decode: value <-> bytes for the persistent tier (JSON by default)
+        cacheable: predicate; results failing it (e.g. error strings) are not stored
+        enabled (bool): Defaults to CACHE_ENABLED
+        db_path (str): SQLite file of its own ("" keeps the cache in memory);
+            by default the shared CACHE_DB_PATH
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        version: str,
+        encode: Callable[[Any], bytes] = lambda v: json.dumps(v).encode(),
+        decode: Callable[[bytes], Any] = lambda b: json.loads(b),
+        cacheable: Callable[[Any], bool] = lambda v: True,
+        max_items: int = CACHE_MAX_ITEMS,
+        enabled: bool = CACHE_ENABLED,
+        db_path: Optional[str] = None,
+    ):
+        self.namespace = namespace
+        self.version = version
+        self.encode = encode
+        self.decode = decode
+        self.cacheable = cacheable
+        self.max_items = max_items
+        self.enabled = enabled
+        self._own_store = _SqliteStore(db_path) if db_path else None
+        self._shared_store = db_path is None
+        self._lru: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        _registry[namespace] = self
+
+    def _disk(self) -> Optional[_SqliteStore]:
+        return _get_store() if self._shared_store else self._own_store
+
+    def key(self, text: str) -> str:
+        raw = f"{self.namespace}\0{self.version}\0{_normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, texts: List[str], compute: Callable[[List[str]], List[Any]]) -> List[Any]:
+        """
+        Return results for `texts` in order, calling `compute` once with only
+        the distinct texts that missed both tiers.
+        """
+        if not self.enabled or not texts:
+            return compute(texts) if texts else []
+
+        keys = [self.key(t) for t in texts]
+        results = self._lookup_many(keys)
+        missing, missing_texts = self._missing(keys, texts, results)
+        if missing:
+            self._save_many(missing, compute(missing_texts), results)
+        return [results[k] for k in keys]
+
+    async def get_or_compute_async(
+        self, texts: List[str], compute: Callable[[List[str]], Awaitable[List[Any]]]
+    ) -> List[Any]:
+        """
+        `get_or_compute` for an async `compute`; the SQLite tier is read and
+        written on the I/O pool, never on the event loop.
+        """
+        if not self.enabled or not texts:
+            return await compute(texts) if texts else []
+
+        keys = [self.key(t) for t in texts]
+        results = await run_io(self._lookup_many, keys)
+        missing, missing_texts = self._missing(keys, texts, results)
+        if missing:
+            computed = await compute(missing_texts)
+            await run_io(self._save_many, missing, computed, results)
+        return [results[k] for k in keys]
+
+    def _lookup_many(self, keys: List[str]) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+
+        # Tier 1: memory
+        with self._lock:
+            for k in keys:
+                if k in self._lru and k not in results:
+                    self._lru.move_to_end(k)
+                    results[k] = self._lru[k]
+                    self.memory_hits += 1
+
+        # Tier 2: disk
+        pending = list(dict.fromkeys(k for k in keys if k not in results))
+        store = self._disk()
+        if pending and store is not None:
+            for k, blob in store.get_many(pending).items():
+                results[k] = self.decode(blob)
+                self.disk_hits += 1
+            self._remember({k: results[k] for k in pending if k in results})
+        return results
+
+    @staticmethod
+    def _missing(keys: List[str], texts: List[str], results: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        # Misses: compute each distinct text once
+        missing = list(dict.fromkeys(k for k in keys if k not in results))
+        first_text: Dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            first_text.setdefault(k, t)
+        return missing, [first_text[k] for k in missing]
+
+    def _save_many(self, missing: List[str], computed: List[Any], results: Dict[str, Any]) -> None:
+        self.misses += len(missing)
+        fresh = {k: v for k, v in zip(missing, computed) if self.cacheable(v)}
+        results.update(zip(missing, computed))
+        self._remember(fresh)
+        store = self._disk()
+        if store is not None:
+            store.put_many({k: self.encode(v) for k, v in fresh.items()})
+
+    def get_or_compute_one(self, text: str, compute: Callable[[str], Any]) -> Any:
+        return self.get_or_compute([text], lambda ts: [compute(ts[0])])[0]
+
+    def lookup(self, text: str) -> Optional[Any]:
+        """
+        Single-text read through both tiers; None on a miss (counted, since
+        the caller is expected to compute and `store` the value).
+        """
+        if not self.enabled:
+            return None
+        k = self.key(text)
+        with self._lock:
+            if k in self._lru:
+                self._lru.move_to_end(k)
+                self.memory_hits += 1
+                return self._lru[k]
+        store = self._disk()
+        blob = store.get_many([k]).get(k) if store is not None else None
+        if blob is not None:
+            value = self.decode(blob)
+            self.disk_hits += 1
+            self._remember({k: value})
+            return value
+        self.misses += 1
+        return None
+
+    def store(self, text: str, value: Any) -> None:
+        if not self.enabled or not self.cacheable(value):
+            return
+        k = self.key(text)
+        self._remember({k: value})
+        store = self._disk()
+        if store is not None:
+            store.put_many({k: self.encode(value)})
+
+    def _remember(self, items: Dict[str, Any]) -> None:
+        with self._lock:
+            for k, v in items.items():
+                self._lru[k] = v
+                self._lru.move_to_end(k)
+            while len(self._lru) > self.max_items:
+                self._lru.popitem(last=False)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "version": self.version,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._lru),
+        }
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Hit/miss counters for every registered cache; misses == model calls made.
+    """
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,188 @@
+# dedup.py
+"""
+Near-duplicate detection with MinHash signatures and an LSH index.
+
+Texts are normalized with `text_utils.clean_texts` and shingled into
+character 5-grams. A MinHash signature of `num_perm` values estimates the
+Jaccard similarity of two shingle sets. The signature is split into
+`bands` x `rows` (chosen for `threshold`), so only texts sharing a whole
+band are compared. Each lookup therefore costs a few dict probes rather
+than a scan.
+
+Syndicated wire stories (same text, different outlet) and near-identical
+dataset headlines map to the first copy seen, their canonical article.
+"""
+
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import DEDUP_NUM_PERM, DEDUP_THRESHOLD
+from app.utils.text_utils import clean_texts
+
+_SHIFT = np.uint64(32)
+SHINGLE_SIZE = 5
+
+
+class MinHasher:
+    """
+    Args:
+        num_perm (int): Signature length; estimate error is ~1/sqrt(num_perm)
+        seed (int): Fixes the hash permutations, so signatures are comparable
+            across processes
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self._powers = np.array([257 ** i for i in range(SHINGLE_SIZE - 1, -1, -1)], dtype=np.uint64)
+
+    def shingles(self, cleaned: str) -> np.ndarray:
+        data = np.frombuffer(cleaned.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        if len(data) < SHINGLE_SIZE:
+            return np.array([int(data @ self._powers[-len(data):])], dtype=np.uint64) if len(data) else data
+        windows = np.lib.stride_tricks.sliding_window_view(data, SHINGLE_SIZE)
+        return np.unique(windows @ self._powers)
+
+    def signature(self, cleaned: str) -> Optional[np.ndarray]:
+        """
+        MinHash of an already cleaned text; None for empty text.
+        """
+        shingles = self.shingles(cleaned)
+        if not len(shingles):
+            return None
+        # Multiply-add-shift hashing: (a*x + b) mod 2^64, top 32 bits; no modulo needed
+        hashed = (np.outer(self._a, shingles) + self._b[:, None]) >> _SHIFT
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+@lru_cache(maxsize=None)
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    (bands, rows) with bands * rows <= num_perm minimizing the sum of the
+    false positive and false negative areas of the S-curve 1 - (1 - s^r)^b
+    around `threshold`.
+    """
+    def area(b: int, r: int, lo: float, hi: float, above: bool) -> float:
+        s = np.linspace(lo, hi, 101)
+        p = 1 - (1 - s ** r) ** b
+        y = (1 - p) if above else p
+        return float(np.sum((y[:-1] + y[1:]) / 2) * (s[1] - s[0]))
+
+    best, best_err = (1, num_perm), float("inf")
+    for b in range(1, num_perm + 1):
+        for r in range(1, num_perm // b + 1):
+            err = area(b, r, 0.0, threshold, above=False) + area(b, r, threshold, 1.0, above=True)
+            if err < best_err:
+                best, best_err = (b, r), err
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Args:
+        threshold (float): Estimated Jaccard similarity above which two texts
+            are duplicates
+        num_perm (int): MinHash signature length
+        max_items (int): Oldest entries are evicted beyond this; 0 for unbounded
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM,
+                 max_items: int = 0):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._items: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self.lookups = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def match_batch(self, keys: List[Hashable], texts: List[str]) -> List[Optional[Hashable]]:
+        """
+        For each text, the key of the indexed text it duplicates, or None.
+        Texts that are not duplicates are indexed under their key, so later
+        texts in the same batch can match them.
+        """
+        return [self._match(key, sig) for key, sig in
+                zip(keys, (self.hasher.signature(t) for t in clean_texts(texts)))]
+
+    def match(self, key: Hashable, text: str) -> Optional[Hashable]:
+        return self.match_batch([key], [text])[0]
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def _match(self, key: Hashable, sig: Optional[np.ndarray]) -> Optional[Hashable]:
+        self.lookups += 1
+        if sig is None:
+            return None
+        band_keys = self._band_keys(sig)
+        candidates = {c for bucket, bk in zip(self._buckets, band_keys) for c in bucket.get(bk, ())}
+        best, best_sim = None, self.threshold
+        for candidate in candidates:
+            sim = float(np.mean(self._items[candidate] == sig))
+            if sim >= best_sim:
+                best, best_sim = candidate, sim
+        if best is not None:
+            self.duplicates += 1
+            return best
+
+        if key not in self._items:
+            self._items[key] = sig
+            for bucket, bk in zip(self._buckets, band_keys):
+                bucket[bk].append(key)
+            if self.max_items and len(self._items) > self.max_items:
+                self._evict()
+        return None
+
+    def discard(self, keys: List[Hashable]) -> None:
+        """
+        Remove `keys` from the index, e.g. records whose batch was never stored.
+        """
+        for key in keys:
+            sig = self._items.pop(key, None)
+            if sig is not None:
+                self._unlink(key, sig)
+
+    def _evict(self) -> None:
+        self._unlink(*self._items.popitem(last=False))
+
+    def _unlink(self, key: Hashable, sig: np.ndarray) -> None:
+        for bucket, bk in zip(self._buckets, self._band_keys(sig)):
+            members = bucket.get(bk)
+            if members:
+                members.remove(key)
+                if not members:
+                    del bucket[bk]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+            "items": len(self._items),
+            "lookups": self.lookups,
+            "duplicates": self.duplicates,
+        }
+
+
+def canonical_indices(texts: List[str], threshold: float = DEDUP_THRESHOLD) -> List[int]:
+    """
+    For each text, the position of its canonical (first) near-duplicate in
+    `texts`; its own position when it is unique.
+    """
+    index = NearDuplicateIndex(threshold)
+    matches = index.match_batch(list(range(len(texts))), texts)
+    return [i if m is None else m for i, m in enumerate(matches)]
@@ -0,0 +1,115 @@
+# dim_reduction.py
+"""
+Embedding dimensionality reduction.
+
+- "truncate": keep the first `dims` components and L2-renormalise. Only
+              meaningful for Matryoshka-trained models (e.g.
+              gemini-embedding-001), whose leading components carry most
+              of the signal.
+- "pca":      project onto the top `dims` principal components of our own
+              corpus, then L2-renormalise. The projection is fitted once
+              and stored in MongoDB next to the news collection.
+
+Both produce unit vectors, so cosine similarity is still a dot product.
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from bson.binary import Binary
+
+METHODS = ("truncate", "pca")
+
+
+def _renormalize(m: np.ndarray) -> np.ndarray:
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+class TruncateReducer:
+    method = "truncate"
+
+    def __init__(self, dims: int):
+        self.dims = dims
+
+    def __call__(self, vectors: np.ndarray) -> np.ndarray:
+        return _renormalize(np.asarray(vectors, dtype=np.float32)[:, :self.dims])
+
+
+class PCAReducer:
+    """
+    Args:
+        mean (np.ndarray): Corpus mean, shape (full_dims,)
+        components (np.ndarray): Principal axes, shape (dims, full_dims)
+        explained_variance (float): Share of variance the kept axes explain
+    """
+
+    method = "pca"
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, explained_variance: float = 0.0):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+        self.explained_variance = explained_variance
+        self.dims = components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dims: int) -> "PCAReducer":
+        x = _renormalize(np.asarray(vectors, dtype=np.float32))
+        if dims > min(x.shape):
+            raise ValueError(f"Cannot fit {dims} components on a {x.shape[0]} x {x.shape[1]} sample")
+        mean = x.mean(axis=0)
+        _, s, vt = np.linalg.svd(x - mean, full_matrices=False)
+        variance = s ** 2
+        return cls(mean, vt[:dims], float(variance[:dims].sum() / variance.sum()))
+
+    def __call__(self, vectors: np.ndarray) -> np.ndarray:
+        x = _renormalize(np.asarray(vectors, dtype=np.float32))
+        return _renormalize((x - self.mean) @ self.components.T)
+
+    # -- persistence ------------------------------------------------------ #
+
+    def to_document(self, key: str) -> Dict[str, Any]:
+        return {
+            "_id": key,
+            "method": self.method,
+            "dims": self.dims,
+            "full_dims": int(self.mean.shape[0]),
+            "explained_variance": self.explained_variance,
+            "mean": Binary(self.mean.astype("<f4").tobytes()),
+            "components": Binary(self.components.astype("<f4").tobytes()),
+            "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "PCAReducer":
+        mean = np.frombuffer(doc["mean"], dtype="<f4")
+        components = np.frombuffer(doc["components"], dtype="<f4").reshape(doc["dims"], doc["full_dims"])
+        return cls(mean, components, doc.get("explained_variance", 0.0))
+
+
+def projection_key(model_name: str, dims: int) -> str:
+    return f"{model_name}:pca:{dims}"
+
+
+def save_projection(collection, key: str, reducer: PCAReducer) -> None:
+    collection.replace_one({"_id": key}, reducer.to_document(key), upsert=True)
+
+
+def load_projection(collection, key: str) -> Optional[PCAReducer]:
+    doc = collection.find_one({"_id": key})
+    return PCAReducer.from_document(doc) if doc else None
+
+
+def reduce_vectors(reducer, vectors: List[List[float]]) -> List[List[float]]:
+    """
+    Apply `reducer` to a list of vectors, leaving empty (failed) ones empty
+    and vectors already at the target width untouched.
+    """
+    rows = [i for i, v in enumerate(vectors) if len(v) > reducer.dims]
+    if not rows:
+        return vectors
+    reduced = reducer(np.asarray([vectors[i] for i in rows], dtype=np.float32)).tolist()
+    out = list(vectors)
+    for i, v in zip(rows, reduced):
+        out[i] = v
+    return out
@@ -1,12 +1,172 @@
 # geo_utils.py
+"""
+Location normalization and geocoding.
 
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
+`resolve_location` goes through a persistent cache of its own (see
+utils/cache.py and GEOCODE_CACHE_PATH) keyed by the canonical location, so
+each place is geocoded once. "Not found" answers are cached for
+GEOCODE_NEGATIVE_TTL seconds, timeouts and service errors for
+GEOCODE_ERROR_TTL seconds. Concurrent cold lookups of one place share a
+single geocoder call. The geocoder is pluggable:
+
+- NominatimGeocoder: OpenStreetMap Nominatim, limited to 1 request/second
+  as its usage policy requires
+- StaticGeocoder: a fixed table of places (GEOCODER_PLACES_PATH), a local
+  stand-in for tests and benchmarks
+
+Swap it at runtime with `set_geocoder`.
+"""
+
+import json
+import random
+import re
+import threading
 import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from app.config import (
+    GEOCODER,
+    GEOCODER_PLACES_PATH,
+    GEOCODER_USER_AGENT,
+    GEOCODE_CACHE_MAX_ITEMS,
+    GEOCODE_CACHE_PATH,
+    GEOCODE_ERROR_TTL,
+    GEOCODE_NEGATIVE_TTL,
+)
+from app.utils.cache import EnrichmentCache
+from app.utils.log import get_logger
+from app.utils.rate_limit import TokenBucket
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+NOT_FOUND = "Location not found."
+TIMEOUT = "Geocoding service timeout."
+UNAVAILABLE = "Geocoding service unavailable."
+
+EARTH_RADIUS_KM = 6378.1
+
+logger = get_logger(__name__)
+
+
+def canonical_location(location: str) -> str:
+    """
+    Canonical key for exact, indexable location matching.
+
+    Folds accents and case and collapses punctuation/whitespace, e.g.
+    "  São Paulo,  Brazil " -> "sao paulo brazil".
+    """
+    text = unicodedata.normalize("NFKD", location or "").encode("ascii", "ignore").decode()
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+# ------------------------------------------------------------------------ #
+# Geocoders
+# ------------------------------------------------------------------------ #
+
+class GeocoderTimeout(Exception):
+    pass
+
+
+class NominatimGeocoder:
+    """
+    Args:
+        user_agent (str): Required by the Nominatim usage policy
+        rate (float): Requests per second
+        timeout (float): Seconds per request
+    """
+
+    name = "nominatim"
+
+    def __init__(self, user_agent: str = GEOCODER_USER_AGENT, rate: float = 1.0, timeout: float = 5.0):
+        from geopy.geocoders import Nominatim
+
+        self._client = Nominatim(user_agent=user_agent, timeout=timeout)
+        self._bucket = TokenBucket(rate, burst=1)
+
+    def geocode(self, location: str) -> Optional[Dict[str, Any]]:
+        from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+
+        self._bucket.acquire()
+        try:
+            geo = self._client.geocode(location)
+        except (GeocoderTimedOut, GeocoderUnavailable) as e:
+            raise GeocoderTimeout(str(e)) from e
+        if not geo:
+            return None
+        return {"latitude": geo.latitude, "longitude": geo.longitude, "display_name": geo.address}
+
+
+class StaticGeocoder:
+    """
+    Args:
+        places (dict): Location -> {"latitude", "longitude", "display_name"};
+            matched on the canonical location
+    """
 
+    name = "static"
 
-geolocator = Nominatim(user_agent="live_sentient_app")
+    def __init__(self, places: Dict[str, Dict[str, Any]]):
+        self.places = {canonical_location(k): v for k, v in places.items()}
 
+    @classmethod
+    def from_file(cls, path: str) -> "StaticGeocoder":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def geocode(self, location: str) -> Optional[Dict[str, Any]]:
+        place = self.places.get(canonical_location(location))
+        if place is None:
+            return None
+        return {"latitude": place["latitude"], "longitude": place["longitude"],
+                "display_name": place.get("display_name", location)}
+
+
+_geocoder = None
+_geocoder_lock = threading.Lock()
+_geocode_cache: Optional[EnrichmentCache] = None
+# Canonical location -> result of the lookup in progress
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            if GEOCODER == "static":
+                _geocoder = StaticGeocoder.from_file(GEOCODER_PLACES_PATH) if GEOCODER_PLACES_PATH \
+                    else StaticGeocoder({})
+            elif GEOCODER == "nominatim":
+                _geocoder = NominatimGeocoder()
+            else:
+                raise ValueError(f"Unknown GEOCODER {GEOCODER!r}; expected nominatim or static")
+        return _geocoder
+
+
+def set_geocoder(geocoder) -> None:
+    """
+    Replace the geocoder; anything with `name` and `geocode(location)`
+    returning a place dict or None. Cached answers are kept per geocoder name.
+    """
+    global _geocoder, _geocode_cache
+    with _geocoder_lock:
+        _geocoder = geocoder
+        _geocode_cache = None
+
+
+def _get_cache() -> EnrichmentCache:
+    global _geocode_cache
+    if _geocode_cache is None:
+        _geocode_cache = EnrichmentCache("geocode", get_geocoder().name, max_items=GEOCODE_CACHE_MAX_ITEMS,
+                                         enabled=True, db_path=GEOCODE_CACHE_PATH)
+    return _geocode_cache
+
+
+# ------------------------------------------------------------------------ #
+# Resolution
+# ------------------------------------------------------------------------ #
 
 def resolve_location(location: str, retries: int = 3) -> dict:
     """
@@ -19,17 +179,77 @@ def resolve_location(location: str, retries: int = 3) -> dict:
     Returns:
         dict: {latitude, longitude, display_name} or error message
     """
+    key = canonical_location(location)
+    if not key:
+        return {"error": NOT_FOUND}
+
+    cache = _get_cache()
+    cached = cache.lookup(key)
+    if cached is not None and not _expired(cached):
+        return _public(cached)
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _inflight[key] = Future()
+    if not leader:
+        return _public(pending.result())
+
+    try:
+        result = _geocode(location, retries)
+        cache.store(key, result)
+        pending.set_result(result)
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+    return _public(result)
+
+
+def _geocode(location: str, retries: int) -> Dict[str, Any]:
+    geocoder = get_geocoder()
     for attempt in range(retries):
         try:
-            geo = geolocator.geocode(location)
-            if geo:
-                return {
-                    "latitude": geo.latitude,
-                    "longitude": geo.longitude,
-                    "display_name": geo.address
-                }
-            else:
-                return {"error": "Location not found."}
-        except GeocoderTimedOut:
-            time.sleep(1)
-    return {"error": "Geocoding service timeout."}
+            place = geocoder.geocode(location)
+        except GeocoderTimeout:
+            if attempt < retries - 1:
+                time.sleep(random.uniform(0, 2 ** attempt))
+            continue
+        except Exception as e:
+            logger.warning("Geocoding %r failed: %s", location, e)
+            return {"error": UNAVAILABLE, "resolved_at": time.time()}
+        if place is None:
+            return {"error": NOT_FOUND, "resolved_at": time.time()}
+        return place
+    return {"error": TIMEOUT, "resolved_at": time.time()}
+
+
+def _expired(entry: Dict[str, Any]) -> bool:
+    if "error" not in entry:
+        return False
+    ttl = GEOCODE_NEGATIVE_TTL if entry["error"] == NOT_FOUND else GEOCODE_ERROR_TTL
+    return time.time() - entry.get("resolved_at", 0) > ttl
+
+
+def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {"error": entry["error"]} if "error" in entry else dict(entry)
+
+
+def geo_point(place: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    GeoJSON point (for the `geo` 2dsphere index) from a resolved place.
+    """
+    if not place or "error" in place:
+        return None
+    return {"type": "Point", "coordinates": [place["longitude"], place["latitude"]]}
+
+
+def within_radius(longitude: float, latitude: float, radius_km: float) -> Dict[str, Any]:
+    """
+    `geo` filter for documents within `radius_km` of a point; served by the
+    2dsphere index.
+    """
+    return {"geo": {"$geoWithin": {"$centerSphere": [[longitude, latitude], radius_km / EARTH_RADIUS_KM]}}}
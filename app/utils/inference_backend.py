@@ -0,0 +1,184 @@
+# inference_backend.py
+"""
+CPU inference backends for the local transformer models (emotion classifier
+and sentence embedder).
+
+- "torch":     stock fp32 PyTorch, the reference
+- "int8":      PyTorch dynamic quantization (int8 weights for every nn.Linear)
+- "onnx":      the model exported once to ONNX and run with ONNX Runtime
+- "onnx-int8": the same ONNX graph with dynamically quantized int8 weights
+
+`optimize(model, backend, name, output)` returns something that is called
+exactly like the Hugging Face model it replaces (`model(**inputs).<output>`)
+and keeps its `.config`, so callers do not change. Exported graphs are cached
+under `ONNX_CACHE_DIR/<model name>/`.
+
+`TransformerEncoder` is a minimal SentenceTransformer-compatible `.encode()`
+(mean pooling + L2 normalisation, as in all-MiniLM-L6-v2) over any backend.
+"""
+
+import inspect
+import os
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, List, Union
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from app.config import ONNX_CACHE_DIR
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+# Forward-signature order of BERT-style models; exported inputs follow it
+_INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def optimize(model: torch.nn.Module, backend: str, name: str, output: str = "logits",
+             cache_dir: str = ONNX_CACHE_DIR) -> Any:
+    """
+    Wrap an fp32 Hugging Face model (already in eval mode) in the given backend.
+    `output` is the attribute callers read from the result ("logits" or
+    "last_hidden_state").
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend!r} (expected one of {BACKENDS})")
+    if backend == "torch":
+        return model
+    if backend == "int8":
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    path = export_onnx(model, name, output, quantized=backend == "onnx-int8", cache_dir=cache_dir)
+    return OnnxModel(path, output, model.config)
+
+
+# --------------------------------------------------------------------------- #
+# ONNX Runtime                                                                #
+# --------------------------------------------------------------------------- #
+class _Exportable(torch.nn.Module):
+    """
+    Fixed positional signature and a single tensor output for torch.onnx.export.
+    """
+
+    def __init__(self, model: torch.nn.Module, output: str):
+        super().__init__()
+        self.model = model
+        self.output = output
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        out = self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)
+        return getattr(out, self.output)
+
+
+def onnx_path(name: str, quantized: bool = False, cache_dir: str = ONNX_CACHE_DIR) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "__", name.strip("/"))
+    return os.path.join(cache_dir, safe, "model.int8.onnx" if quantized else "model.onnx")
+
+
+def export_onnx(model: torch.nn.Module, name: str, output: str, quantized: bool = False,
+                cache_dir: str = ONNX_CACHE_DIR) -> str:
+    """
+    Export `model` to ONNX (dynamic batch and sequence axes) unless a cached
+    graph exists, optionally quantize it, and return the file path.
+    """
+    path = onnx_path(name, quantized, cache_dir)
+    if os.path.exists(path):
+        return path
+
+    fp32_path = onnx_path(name, cache_dir=cache_dir)
+    if not os.path.exists(fp32_path):
+        os.makedirs(os.path.dirname(fp32_path), exist_ok=True)
+        takes_token_types = getattr(model.config, "type_vocab_size", 0) > 0
+        names = [n for n in _INPUT_NAMES if n != "token_type_ids" or takes_token_types]
+        sample = tuple(torch.ones((2, 8), dtype=torch.long) for _ in names)
+        dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+        dynamic[output] = {0: "batch"} if output == "logits" else {0: "batch", 1: "sequence"}
+        tmp = f"{fp32_path}.{os.getpid()}.tmp"
+        # The TorchScript exporter's graphs go through ORT's quantizer cleanly; newer
+        # torch defaults to the dynamo exporter, so ask for it explicitly there
+        legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(_Exportable(model, output).eval(), sample, tmp, input_names=names,
+                              output_names=[output], dynamic_axes=dynamic, opset_version=17, **legacy)
+        os.replace(tmp, fp32_path)
+        logger.info("Exported %s to %s", name, fp32_path)
+
+    if quantized:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        tmp = f"{path}.{os.getpid()}.tmp"
+        quantize_dynamic(fp32_path, tmp, weight_type=QuantType.QInt8)
+        os.replace(tmp, path)
+        logger.info("Quantized %s to int8", fp32_path)
+    return path
+
+
+class OnnxModel:
+    """
+    ONNX Runtime session behind a Hugging Face–style call: accepts the
+    tokenizer's torch tensors and returns an object with `.<output>` as a
+    torch tensor. `session.run` is thread-safe, so one instance is shared.
+    """
+
+    def __init__(self, path: str, output: str, config: Any = None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Follow torch's setting so per-worker thread caps (data_ingest) apply here too
+        options.intra_op_num_threads = torch.get_num_threads()
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.output = output
+        self.config = config
+
+    def __call__(self, **inputs) -> SimpleNamespace:
+        feed = {}
+        for n in self.input_names:
+            value = inputs.get(n)
+            if value is None:  # e.g. token_type_ids not returned by the tokenizer
+                value = torch.zeros_like(inputs["input_ids"])
+            feed[n] = value.numpy() if isinstance(value, torch.Tensor) else np.asarray(value)
+        result = self.session.run(None, feed)[0]
+        return SimpleNamespace(**{self.output: torch.from_numpy(result)})
+
+
+# --------------------------------------------------------------------------- #
+# Sentence embeddings                                                         #
+# --------------------------------------------------------------------------- #
+class TransformerEncoder:
+    """
+    `.encode()` compatible with SentenceTransformer for mean-pooled,
+    normalised models: a str gives a 1-D array, a list gives a 2-D array.
+    """
+
+    def __init__(self, tokenizer: Any, model: Any, max_length: int = 256, batch_size: int = 32):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_length = max_length
+        self.batch_size = batch_size
+
+    def encode(self, sentences: Union[str, List[str]]) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Length-sorted batches keep padding low; results are put back in order
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        out: Dict[int, np.ndarray] = {}
+        with torch.no_grad():
+            for start in range(0, len(order), self.batch_size):
+                idx = order[start:start + self.batch_size]
+                inputs = self.tokenizer([texts[i] for i in idx], truncation=True, max_length=self.max_length,
+                                        padding=True, return_tensors="pt")
+                hidden = self.model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+                for i, row in zip(idx, F.normalize(pooled, p=2, dim=1).numpy()):
+                    out[i] = row
+        embeddings = np.stack([out[i] for i in range(len(texts))])
+        return embeddings[0] if single else embeddings
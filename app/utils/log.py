@@ -0,0 +1,84 @@
+# log.py
+"""
+Leveled, rate-limited logging.
+
+Modules log through `get_logger(__name__)`, i.e. under the "app" logger,
+which writes to stderr at LOG_LEVEL. Each message (keyed by logger and
+format string, so pass values as arguments rather than in an f-string)
+gets through at most LOG_RATE_LIMIT times per LOG_RATE_WINDOW seconds. The
+first one after the window notes how many were dropped, so a failing
+upstream cannot flood the log.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from app.config import LOG_LEVEL, LOG_RATE_LIMIT, LOG_RATE_WINDOW
+
+_MAX_KEYS = 4096
+_configured = False
+_configure_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Args:
+        limit (int): Records per message and window; 0 disables the limit
+        window (float): Window length in seconds
+    """
+
+    def __init__(self, limit: int = LOG_RATE_LIMIT, window: float = LOG_RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        # (logger, format string) -> [window start, records let through, records dropped]
+        self._seen: Dict[Tuple[str, str], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self._seen) >= _MAX_KEYS:
+                    self._seen.clear()
+                self._seen[key] = [now, 1, 0]
+                if state is not None and state[2]:
+                    record.msg = f"{record.msg} [{int(state[2])} similar messages suppressed]"
+                return True
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger for `name` (a module's `__name__`), configuring the "app" handler
+    on first use.
+    """
+    _configure()
+    if name != "app" and not name.startswith("app."):
+        name = f"app.{name}"  # e.g. "__main__" under `python -m`
+    return logging.getLogger(name)
+
+
+def _configure() -> None:
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        root = logging.getLogger("app")
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        handler.addFilter(RateLimitFilter())
+        root.addHandler(handler)
+        root.setLevel(LOG_LEVEL)
+        root.propagate = False
+        _configured = True
@@ -0,0 +1,229 @@
+# metrics.py
+"""
+In-process metrics, rendered in the Prometheus text format for GET /metrics.
+
+`Counter` and `Histogram` take label values as keyword arguments and are
+thread-safe; one observation costs a lock and a bisect, so they are fine
+on the hot path. `span(stage)` times a block into `STAGE_SECONDS` and can
+also record the duration in a per-request dict (see routes/query.py, which
+returns it as a Server-Timing header).
+
+Counters the services already keep (enrichment and Serper cache hits,
+summarization routes, the batching queue) are exported at scrape time by
+collectors (`register_collector`) instead of being counted twice.
+
+Metrics are per process: each Uvicorn or ingest worker keeps its own.
+"""
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+# A collector returns (name, type, help, [(labels, value), ...]) tuples
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+_metrics: Dict[str, "_Metric"] = {}
+_collectors: List[Collector] = []
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        _metrics[name] = self
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    @abstractmethod
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        """
+        `(sample name, labels, value)` for every exported series.
+        """
+
+
+class Counter(_Metric):
+    """
+    Monotonic count; by convention the name ends in `_total`.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Histogram(_Metric):
+    """
+    Args:
+        buckets: Upper bounds, ascending; +Inf is implied
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][bisect_left(self.buckets, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(key, (list(counts), total, n)) for key, (counts, total, n) in self._values.items()]
+        for key, (counts, total, n) in items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, n
+
+
+# ------------------------------------------------------------------------ #
+# Pipeline metrics
+# ------------------------------------------------------------------------ #
+
+STAGE_SECONDS = Histogram(
+    "livesentient_stage_seconds", "Time spent in each stage of POST /query; "
+    "stream_* stages are per /query/stream chunk.", ("stage",))
+HTTP_REQUEST_SECONDS = Histogram(
+    "livesentient_http_request_seconds", "HTTP request latency by route and status.",
+    ("method", "route", "status"))
+MODEL_BATCH_SIZE = Histogram(
+    "livesentient_model_batch_size", "Texts per model call (cache misses only).", ("model",),
+    buckets=SIZE_BUCKETS)
+MODEL_SECONDS = Histogram(
+    "livesentient_model_seconds", "Latency of one model call.", ("model",))
+SERPER_RESPONSES = Counter(
+    "livesentient_serper_responses_total", "Serper HTTP responses by status code; "
+    "'error' for transport errors.", ("status",))
+MONGO_SECONDS = Histogram(
+    "livesentient_mongo_seconds", "MongoDB operation latency.", ("operation",))
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """
+    Time a block as `stage`; the seconds are also stored in `timings[stage]`
+    when a dict is passed.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = elapsed
+
+
+async def timed(stage: str, awaitable, timings: Optional[Dict[str, float]] = None):
+    """
+    Await `awaitable` inside `span(stage)`, e.g. for branches of one gather.
+    """
+    with span(stage, timings):
+        return await awaitable
+
+
+@contextmanager
+def model_call(model: str, batch_size: int) -> Iterator[None]:
+    """
+    Record the batch size and latency of one call into a model.
+    """
+    MODEL_BATCH_SIZE.observe(batch_size, model=model)
+    with MODEL_SECONDS.time(model=model):
+        yield
+
+
+def server_timing(timings: Dict[str, float]) -> str:
+    """
+    `Server-Timing` header value (milliseconds) for the recorded spans.
+    """
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+# ------------------------------------------------------------------------ #
+# Exposition
+# ------------------------------------------------------------------------ #
+
+def register_collector(collector: Collector) -> None:
+    _collectors.append(collector)
+
+
+def render() -> str:
+    """
+    All metrics and collector output in the Prometheus text format (0.0.4).
+    """
+    lines: List[str] = []
+    for metric in list(_metrics.values()):
+        _family(lines, metric.name, metric.kind, metric.help, metric.samples())
+    for collector in _collectors:
+        for name, kind, help, values in collector():
+            _family(lines, name, kind, help, ((name, labels, value) for labels, value in values))
+    return "\n".join(lines) + "\n"
+
+
+def _family(lines: List[str], name: str, kind: str, help: str,
+            samples: Iterable[Tuple[str, Dict[str, Any], float]]) -> None:
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} {kind}")
+    for sample, labels, value in samples:
+        if labels:
+            rendered = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+            lines.append(f"{sample}{{{rendered}}} {_format_value(value)}")
+        else:
+            lines.append(f"{sample} {_format_value(value)}")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
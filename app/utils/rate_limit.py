@@ -0,0 +1,188 @@
+# rate_limit.py
+"""
+Client-side quota control for remote model calls.
+
+`TokenBucket` spaces requests to a sustained rate with a bounded burst.
+`RateLimitedExecutor` fans a batch out over a fixed number of in-flight
+calls, takes one bucket token per attempt (retries included, since the
+provider counts them against quota), retries transient failures with
+full-jitter exponential backoff and returns results in input order.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class TokenBucket:
+    """
+    Args:
+        rate (float): Tokens added per second; <= 0 disables limiting
+        burst (float): Bucket capacity, i.e. requests allowed back to back
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Block until a token is available; returns the seconds spent waiting.
+        """
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimitedExecutor:
+    """
+    Args:
+        name (str): Label used for worker threads and in stats
+        fn: Blocking call applied to each item; raises on failure
+        max_in_flight (int): Concurrent calls
+        rate (float): Sustained calls per second (token bucket); <= 0 for unlimited
+        burst (float): Token bucket capacity
+        max_retries (int): Retries after the first attempt for retryable errors
+        backoff_base (float): First backoff ceiling in seconds; doubles per attempt
+        backoff_max (float): Upper bound for any single backoff
+        is_retryable: Predicate on the raised exception
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Any], Any],
+        max_in_flight: int = 8,
+        rate: float = 0.0,
+        burst: float = 1.0,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        is_retryable: Callable[[BaseException], bool] = lambda e: True,
+    ):
+        self.name = name
+        self.fn = fn
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.is_retryable = is_retryable
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def map(self, items: List[Any]) -> List[Tuple[bool, Any]]:
+        """
+        Run `fn` over `items`; returns `(ok, result_or_exception)` per item,
+        in input order. Never raises for individual failures.
+        """
+        if not items:
+            return []
+        started = time.perf_counter()
+        results = list(self._get_pool().map(self._call, items))
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.batches += 1
+            self.batch_items += len(items)
+            self.batch_seconds += elapsed
+            self.last_batch_rps = len(items) / elapsed if elapsed else 0.0
+        return results
+
+    def call(self, item: Any) -> Tuple[bool, Any]:
+        return self._call(item)
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, so forked ingest workers build their own pool
+        with self._pool_lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix=self.name)
+                self._pid = os.getpid()
+            return self._pool
+
+    def shutdown(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def _call(self, item: Any) -> Tuple[bool, Any]:
+        for attempt in range(self.max_retries + 1):
+            throttled = self.bucket.acquire()
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                self._record(time.perf_counter() - start, throttled, ok=False)
+                if attempt == self.max_retries or not self.is_retryable(e):
+                    with self._stats_lock:
+                        self.failures += 1
+                    return False, e
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt))
+            else:
+                self._record(time.perf_counter() - start, throttled, ok=True)
+                return True, result
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # ------------------------------------------------------------------ #
+    # Stats
+    # ------------------------------------------------------------------ #
+
+    def _reset_stats(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.throttle_total = 0.0
+        self.batches = 0
+        self.batch_items = 0
+        self.batch_seconds = 0.0
+        self.last_batch_rps = 0.0
+
+    def _record(self, latency: float, throttled: float, ok: bool) -> None:
+        with self._stats_lock:
+            self.requests += 1
+            self.errors += 0 if ok else 1
+            self.latency_total += latency
+            self.throttle_total += throttled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "rate_limit_rps": self.bucket.rate,
+                "requests": self.requests,
+                "errors": self.errors,
+                "retries": self.retries,
+                "failed_items": self.failures,
+                "mean_latency_ms": round(self.latency_total / self.requests * 1000, 3) if self.requests else 0.0,
+                "mean_throttle_ms": round(self.throttle_total / self.requests * 1000, 3) if self.requests else 0.0,
+                "batches": self.batches,
+                "achieved_rps": round(self.batch_items / self.batch_seconds, 2) if self.batch_seconds else 0.0,
+                "last_batch_rps": round(self.last_batch_rps, 2),
+            }
@@ -0,0 +1,65 @@
+# readiness.py
+"""
+Startup warm-up and readiness tracking.
+
+Nothing heavy happens at import time; instead the FastAPI startup hook hands
+`warm_up` a list of named components (Mongo, each model, ...). They run in
+the background off the event loop, so the server accepts connections at
+once, while `readiness()` reports each component's status, elapsed time and
+any error for `GET /ready`.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from app.utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# name -> {"status": "pending" | "running" | "ready" | "failed", "seconds": float, "error": str}
+_components: Dict[str, Dict[str, Any]] = {}
+
+Runner = Callable[..., Awaitable[Any]]
+
+
+async def warm_up(components: List[Tuple[str, Callable[[], Any], Runner]]) -> None:
+    """
+    Run each `(name, fn, runner)` concurrently, where `runner` is e.g.
+    `run_io` or `run_inference`, and record per-component timings.
+    """
+    for name, _, _ in components:
+        _components[name] = {"status": "pending", "seconds": None, "error": None}
+    started = time.perf_counter()
+    await asyncio.gather(*(_warm_one(name, fn, runner) for name, fn, runner in components))
+    failed = [n for n, c in _components.items() if c["status"] == "failed"]
+    if failed:
+        logger.warning("Warm-up finished in %.2fs; failed: %s", time.perf_counter() - started, ", ".join(failed))
+    else:
+        logger.info("Warm-up finished in %.2fs. LiveSentient backend is ready.", time.perf_counter() - started)
+
+
+async def _warm_one(name: str, fn: Callable[[], Any], runner: Runner) -> None:
+    entry = _components[name]
+    entry["status"] = "running"
+    start = time.perf_counter()
+    try:
+        await runner(fn)
+    except Exception as e:
+        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+        logger.error("Warm-up of %s failed: %s", name, e)
+    else:
+        entry["status"] = "ready"
+        logger.info("Warm-up of %s: %.2fs", name, time.perf_counter() - start)
+    finally:
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    `ready` is true once every registered component warmed up successfully.
+    """
+    return {
+        "ready": all(c["status"] == "ready" for c in _components.values()),
+        "components": {name: dict(c) for name, c in _components.items()},
+    }
@@ -0,0 +1,74 @@
+# vector_codec.py
+"""
+Compact storage formats for embeddings.
+
+- "array":   BSON array of doubles (legacy; 8 bytes + a type tag per element)
+- "float32": BSON binary vector (subtype 9), 4 bytes per element
+- "int8":    BSON binary vector (subtype 9), 1 byte per element, scalar
+             quantized by the vector's max |x|. Cosine similarity is
+             scale-invariant, so no per-vector scale needs to be stored.
+
+Both binary formats use the BSON vector layout that Atlas Vector Search
+indexes natively: one dtype byte, one padding byte, then the raw values.
+"""
+
+from typing import Any, Iterable, List, Union
+
+import numpy as np
+from bson.binary import Binary
+
+VECTOR_SUBTYPE = 9
+DTYPE_INT8 = 0x03
+DTYPE_FLOAT32 = 0x27
+
+FORMATS = ("array", "float32", "int8")
+
+
+def encode_vector(values: Iterable[float], fmt: str = "array") -> Union[List[float], Binary]:
+    """
+    Encode an embedding for storage in the given format.
+    """
+    if fmt == "array":
+        return values if isinstance(values, list) else list(values)
+
+    v = np.asarray(values, dtype=np.float32)
+    if fmt == "float32":
+        header = bytes((DTYPE_FLOAT32, 0))
+        return Binary(header + v.astype("<f4", copy=False).tobytes(), VECTOR_SUBTYPE)
+    if fmt == "int8":
+        scale = float(np.max(np.abs(v))) if v.size else 0.0
+        q = np.round(v * (127.0 / scale)) if scale > 0 else np.zeros_like(v)
+        header = bytes((DTYPE_INT8, 0))
+        return Binary(header + q.astype(np.int8).tobytes(), VECTOR_SUBTYPE)
+    raise ValueError(f"Unknown embedding format: {fmt!r} (expected one of {FORMATS})")
+
+
+def decode_vector(value: Any) -> np.ndarray:
+    """
+    Decode a stored embedding to a NumPy vector.
+
+    Binaries are returned as zero-copy, read-only views over the BSON bytes
+    (float32 or int8 dtype); arrays as float32. Use `decode_float32` to get
+    float32 values whatever the stored format.
+    """
+    if isinstance(value, bytes):  # bson.Binary is a bytes subclass
+        if isinstance(value, Binary) and value.subtype != VECTOR_SUBTYPE:
+            raise ValueError(f"Unsupported binary subtype {value.subtype}")
+        dtype_code = value[0]
+        if dtype_code == DTYPE_FLOAT32:
+            return np.frombuffer(value, dtype="<f4", offset=2)
+        if dtype_code == DTYPE_INT8:
+            return np.frombuffer(value, dtype=np.int8, offset=2)
+        raise ValueError(f"Unsupported BSON vector dtype 0x{dtype_code:02x}")
+    return np.asarray(value if value is not None else [], dtype=np.float32)
+
+
+def decode_float32(value: Any) -> np.ndarray:
+    v = decode_vector(value)
+    return v if v.dtype == np.float32 else v.astype(np.float32)
+
+
+def vector_format(value: Any) -> str:
+    if isinstance(value, Binary) and value.subtype == VECTOR_SUBTYPE and len(value):
+        return "float32" if value[0] == DTYPE_FLOAT32 else "int8" if value[0] == DTYPE_INT8 else "unknown"
+    return "array"
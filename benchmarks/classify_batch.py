@@ -0,0 +1,103 @@
+"""
+classify_batch.py
+
+Mixed-length benchmark for emotion classification: one padded batch (the
+old behaviour) against length-sorted chunks under a token budget.
+
+Most inputs are headline-length; a few are long articles, which is what makes
+a single `padding=True` batch pad every row to the longest one.
+
+    python benchmarks/classify_batch.py --items 2000 --long-fraction 0.02 --budget 8192
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import torch
+import torch.nn.functional as F
+
+# `python benchmarks/classify_batch.py` puts benchmarks/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services import sentiment
+
+WORDS = ("city council protest flood market storm fire rescue election festival "
+         "strike hospital school police court bridge river team victory loss").split()
+
+
+def mixed_texts(n: int, long_fraction: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = rng.randint(300, 600) if rng.random() < long_fraction else rng.randint(6, 30)
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(words)))
+    return texts
+
+
+def single_padded_batch(texts: List[str], chunk: int) -> Dict:
+    """
+    Old behaviour: each chunk is padded to its own longest row, in input order.
+    """
+    tokenizer, model = sentiment._get_tokenizer(), sentiment._get_model()
+    padded = 0
+    with torch.no_grad():
+        for i in range(0, len(texts), chunk):
+            inputs = tokenizer(texts[i:i + chunk], truncation=True, padding=True, return_tensors="pt")
+            padded += inputs["input_ids"].numel()
+            F.softmax(model(**inputs).logits, dim=-1)
+    return {"padded_tokens": padded}
+
+
+def bucketed(texts: List[str], budget: int) -> Dict:
+    sentiment._run_model(texts, token_budget=budget)
+    return {}
+
+
+def bucketed_padded_tokens(texts: List[str], budget: int) -> int:
+    lengths = [len(ids) for ids in sentiment._get_tokenizer()(texts, truncation=True)["input_ids"]]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+    return sum(len(c) * lengths[c[-1]] for c in sentiment._length_buckets(order, lengths, budget))
+
+
+def timed(fn, *args) -> Dict:
+    start = time.perf_counter()
+    result = fn(*args)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--long-fraction", type=float, default=0.02)
+    parser.add_argument("--budget", type=int, default=8192, help="token budget per forward pass")
+    parser.add_argument("--old-chunk", type=int, default=256, help="rows per padded batch for the old path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = mixed_texts(args.items, args.long_fraction, args.seed)
+    sentiment.warm_up()
+    sentiment._run_model(texts[:8])  # warm kernels
+
+    old = timed(single_padded_batch, texts, args.old_chunk)
+    new = timed(bucketed, texts, args.budget)
+    new["padded_tokens"] = bucketed_padded_tokens(texts, args.budget)
+    for r in (old, new):
+        r["items_per_s"] = round(args.items / r["seconds"], 1) if r["seconds"] else 0.0
+
+    print(json.dumps({
+        "items": args.items,
+        "long_fraction": args.long_fraction,
+        "single_padded_batch": old,
+        f"bucketed_budget_{args.budget}": new,
+        "speedup": round(old["seconds"] / new["seconds"], 2) if new["seconds"] else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
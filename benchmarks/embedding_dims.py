@@ -0,0 +1,148 @@
+"""
+embedding_dims.py
+
+Retrieval quality vs. embedding width. For each candidate width and method
+("truncate" for Matryoshka models, "pca" fitted on the corpus) it measures
+recall@k of nearest-neighbour search on the reduced vectors against exact
+full-width search, globally and within the query's own location (as the
+`location_key` pre-filter does), plus bytes per stored vector.
+
+Queries are corpus documents (leave-one-out); PCA is fitted on the other
+rows. By default the corpus is a sample of stored embeddings, so run it on
+ours before picking EMBEDDING_DIMS:
+
+    python benchmarks/embedding_dims.py --sample 20000 --dims 64 128 256 512 768
+    python benchmarks/embedding_dims.py --npy vectors.npy
+    python benchmarks/embedding_dims.py --synthetic --full-dims 3072
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# `python benchmarks/embedding_dims.py` puts benchmarks/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.utils.dim_reduction import METHODS, PCAReducer, TruncateReducer, _renormalize
+
+
+def stored_corpus(sample: int):
+    from app.db.mongo_client import atlas_client, COLLECTION_NAME
+    from app.utils.vector_codec import decode_float32
+
+    cursor = atlas_client.get_collection(COLLECTION_NAME).aggregate([
+        {"$match": {"embedding": {"$exists": True, "$ne": []}}},
+        {"$sample": {"size": sample}},
+        {"$project": {"embedding": 1, "location_key": 1}},
+    ])
+    docs = [(decode_float32(d["embedding"]), d.get("location_key")) for d in cursor]
+    full_dims = max(len(v) for v, _ in docs)
+    docs = [(v, loc) for v, loc in docs if len(v) == full_dims]
+    return np.stack([v for v, _ in docs]), [loc for _, loc in docs]
+
+
+def synthetic_corpus(rows: int, full_dims: int, cities: int, topics: int, seed: int):
+    # Topic clusters whose spread decays over the dimensions, roughly like a
+    # Matryoshka-trained model where leading components carry most signal
+    rng = np.random.default_rng(seed)
+    scale = (1.0 / np.sqrt(1.0 + np.arange(full_dims) / 32.0)).astype(np.float32)
+    centers = rng.normal(size=(topics, full_dims)).astype(np.float32) * scale
+    topic = rng.integers(0, topics, size=rows)
+    vectors = centers[topic] + 0.5 * rng.normal(size=(rows, full_dims)).astype(np.float32) * scale
+    city = rng.integers(0, cities, size=rows)
+    return vectors, [f"city-{c}" for c in city]
+
+
+def top_k(matrix: np.ndarray, row: int, k: int, candidates: Optional[np.ndarray] = None) -> set:
+    ids = np.arange(len(matrix)) if candidates is None else candidates
+    ids = ids[ids != row]
+    scores = matrix[ids] @ matrix[row]
+    take = min(k, len(ids))
+    return set(ids[np.argpartition(-scores, take - 1)[:take]].tolist()) if take else set()
+
+
+def recall(full: np.ndarray, reduced: np.ndarray, queries: np.ndarray, k: int,
+           locations: List[Optional[str]]) -> Dict[str, float]:
+    by_location: Dict[Optional[str], np.ndarray] = {}
+    for loc in set(locations):
+        by_location[loc] = np.flatnonzero(np.array([l == loc for l in locations]))
+
+    global_r, local_r = [], []
+    for q in queries:
+        truth = top_k(full, q, k)
+        global_r.append(len(truth & top_k(reduced, q, k)) / len(truth))
+        if locations[q] is not None:
+            same = by_location[locations[q]]
+            truth = top_k(full, q, k, same)
+            if truth:
+                local_r.append(len(truth & top_k(reduced, q, k, same)) / len(truth))
+    return {
+        f"recall@{k}": round(float(np.mean(global_r)), 4),
+        f"same_location_recall@{k}": round(float(np.mean(local_r)), 4) if local_r else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=20000, help="stored embeddings to sample from Mongo")
+    parser.add_argument("--npy", help="load an (N, D) float array instead of sampling Mongo")
+    parser.add_argument("--synthetic", action="store_true", help="use a synthetic clustered corpus")
+    parser.add_argument("--rows", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--full-dims", type=int, default=768, help="synthetic vector width")
+    parser.add_argument("--cities", type=int, default=50, help="synthetic locations")
+    parser.add_argument("--dims", type=int, nargs="*", default=[64, 128, 256, 512])
+    parser.add_argument("--methods", nargs="*", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="recommend the smallest width reaching this recall@k")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vectors, locations = synthetic_corpus(args.rows, args.full_dims, args.cities, topics=64, seed=args.seed)
+        source = "synthetic"
+    elif args.npy:
+        vectors = np.load(args.npy).astype(np.float32)
+        locations, source = [None] * len(vectors), args.npy
+    else:
+        vectors, locations = stored_corpus(args.sample)
+        source = "mongo"
+
+    full = _renormalize(vectors)
+    rng = np.random.default_rng(args.seed)
+    queries = rng.choice(len(full), size=min(args.queries, len(full)), replace=False)
+    fit_rows = np.setdiff1d(np.arange(len(full)), queries)
+
+    report = {"source": source, "rows": len(full), "full_dims": full.shape[1], "k": args.k,
+              "queries": len(queries), "full_bytes_per_vector": {"float32": full.shape[1] * 4, "int8": full.shape[1]},
+              "results": []}
+    for method in args.methods:
+        for dims in sorted(d for d in args.dims if d < full.shape[1]):
+            if method == "pca":
+                reducer = PCAReducer.fit(full[fit_rows], dims)
+            else:
+                reducer = TruncateReducer(dims)
+            row = {"method": method, "dims": dims,
+                   **recall(full, reducer(full), queries, args.k, locations),
+                   "bytes_per_vector": {"float32": dims * 4, "int8": dims}}
+            if method == "pca":
+                row["explained_variance"] = round(reducer.explained_variance, 4)
+            report["results"].append(row)
+
+    key = f"recall@{args.k}"
+    passing = [r for r in report["results"] if r[key] >= args.target_recall]
+    best = min(passing, key=lambda r: (r["dims"], -r[key])) if passing else None
+    report["recommendation"] = (
+        {"method": best["method"], "dims": best["dims"], key: best[key]} if best
+        else f"no width reaches {key} >= {args.target_recall}; keep full width"
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
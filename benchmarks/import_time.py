@@ -0,0 +1,110 @@
+"""
+import_time.py
+
+Import cost of each app module, each measured in a fresh interpreter with
+`python -X importtime`: cumulative import time of the module itself, wall
+time of the whole process, and the heaviest third-party packages it pulls in.
+Importing must not load models or touch the network, so these numbers should
+stay small; track them across changes:
+
+    python benchmarks/import_time.py --out after.json
+    python benchmarks/import_time.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+MODULES = [
+    "app.config",
+    "app.db.mongo_client",
+    "app.utils.cache",
+    "app.services.google_search",
+    "app.services.mongo_vector",
+    "app.services.summarizer",
+    "app.services.sentiment",
+    "app.services.embeddings",
+    "app.routes.query",
+    "app.main",
+]
+
+
+def measure(module: str, repeat: int, top: int) -> Dict:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    # Names only; nothing connects during import
+    env.setdefault("DB", "import_time")
+    env.setdefault("COLLECTION", "import_time")
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, env=env, cwd=root)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            errors = [l for l in proc.stderr.splitlines() if l.strip() and not l.startswith("import time:")]
+            return {"module": module, "error": errors[-1] if errors else f"exit code {proc.returncode}"}
+
+        # Lines look like "import time:  self [us] | cumulative | imported package"
+        rows = []
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        own = next((cum for name, _, cum in rows if name == module), 0)
+        if best is None or own < best["import_ms"] * 1000:
+            top_level = [(name, cum) for name, _, cum in rows
+                         if "." not in name and name != "site" and not name.startswith("app")]
+            best = {
+                "module": module,
+                "import_ms": round(own / 1000, 1),
+                "process_wall_ms": round(wall * 1000, 1),
+                "modules_imported": len(rows),
+                "heaviest_packages": [{"package": n, "ms": round(c / 1000, 1)}
+                                      for n, c in sorted(top_level, key=lambda r: -r[1])[:top]],
+            }
+    return best
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = {r["module"]: r for r in json.load(f)["modules"]}
+    with open(after_path) as f:
+        after = {r["module"]: r for r in json.load(f)["modules"]}
+    for module in after:
+        b, a = before.get(module, {}).get("import_ms"), after[module].get("import_ms")
+        if b is None or a is None:
+            print(f"{module:>28}: {b} -> {a}")
+            continue
+        change = ((a - b) / b * 100) if b else 0.0
+        print(f"{module:>28}: {b:>9} ms -> {a:>9} ms  ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module; the fastest is kept")
+    parser.add_argument("--top", type=int, default=5, help="heaviest packages to list per module")
+    parser.add_argument("--out", help="write results as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results: List[Dict] = [measure(m, args.repeat, args.top) for m in args.modules]
+    report = {"python": sys.version.split()[0], "modules": results}
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
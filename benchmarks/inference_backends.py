@@ -0,0 +1,150 @@
+"""
+inference_backends.py
+
+Parity and CPU throughput of the local emotion and embedding models on each
+inference backend (fp32 torch, torch int8, ONNX Runtime, ONNX Runtime int8).
+
+Parity is measured against fp32 PyTorch: top-label agreement for emotions,
+cosine similarity for embeddings. The script exits non-zero when a backend
+falls below --min-agreement / --min-cosine, so it doubles as a check before
+switching INFERENCE_BACKEND.
+
+    python benchmarks/inference_backends.py --items 500
+
+Any local model directory works in place of the hub ids, including a tiny
+randomly initialised one (no download needed):
+
+    python benchmarks/inference_backends.py --emotion-model ./tiny/emotion --embedding-model ./tiny/embed
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+# `python benchmarks/inference_backends.py` puts benchmarks/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.config import EMBEDDING_MODEL, EMOTION_MODEL
+from app.utils.inference_backend import BACKENDS, TransformerEncoder, optimize
+
+WORDS = ("city council protest flood market storm fire rescue election festival "
+         "strike hospital school police court bridge river team victory loss happy sad").split()
+
+
+def sample_texts(n: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 60))) for _ in range(n)]
+
+
+def classify_labels(tokenizer, model, texts: List[str], batch_size: int) -> np.ndarray:
+    labels = []
+    with torch.no_grad():
+        for i in range(0, len(texts), batch_size):
+            inputs = tokenizer(texts[i:i + batch_size], truncation=True, padding=True, return_tensors="pt")
+            labels.append(model(**inputs).logits.argmax(dim=-1).numpy())
+    return np.concatenate(labels)
+
+
+def embedding_reference(name: str, texts: List[str]) -> np.ndarray:
+    # What the torch backend actually serves: SentenceTransformer in fp32
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(name).encode(texts)
+
+
+def hf_name(name: str) -> str:
+    return name if "/" in name or os.path.isdir(name) else f"sentence-transformers/{name}"
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run_emotion(name: str, backends: List[str], texts: List[str], batch_size: int, cache_dir: str) -> Dict:
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    reference = None
+    report = {}
+    for backend in backends:
+        fp32 = AutoModelForSequenceClassification.from_pretrained(name).eval()
+        model = optimize(fp32, backend, name, output="logits", cache_dir=cache_dir)
+        classify_labels(tokenizer, model, texts[:batch_size], batch_size)  # warm-up
+        labels, seconds = timed(classify_labels, tokenizer, model, texts, batch_size)
+        if reference is None:  # torch always runs first
+            reference = labels
+        report[backend] = {
+            "items_per_s": round(len(texts) / seconds, 1),
+            "label_agreement": round(float((labels == reference).mean()), 4),
+        }
+    return report
+
+
+def run_embedding(name: str, backends: List[str], texts: List[str], batch_size: int, cache_dir: str) -> Dict:
+    reference = embedding_reference(name, texts)
+    tokenizer = AutoTokenizer.from_pretrained(hf_name(name))
+    report = {}
+    for backend in backends:
+        fp32 = AutoModel.from_pretrained(hf_name(name)).eval()
+        encoder = TransformerEncoder(tokenizer, optimize(fp32, backend, hf_name(name), output="last_hidden_state",
+                                                         cache_dir=cache_dir), batch_size=batch_size)
+        encoder.encode(texts[:batch_size])  # warm-up
+        vectors, seconds = timed(encoder.encode, texts)
+        ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+        cos = np.sum(ref * vectors / np.linalg.norm(vectors, axis=1, keepdims=True), axis=1)
+        report[backend] = {
+            "items_per_s": round(len(texts) / seconds, 1),
+            "mean_cosine": round(float(cos.mean()), 5),
+            "min_cosine": round(float(cos.min()), 5),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emotion-model", default=EMOTION_MODEL)
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated, torch is always included")
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="torch / ONNX Runtime threads (0 = default)")
+    parser.add_argument("--onnx-dir", default=None, help="keep exported graphs here (default: a temp dir)")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    backends = ["torch"] + [b for b in args.backends.split(",") if b and b != "torch"]
+    texts = sample_texts(args.items, args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = args.onnx_dir or tmp
+        report = {
+            "items": args.items,
+            "threads": torch.get_num_threads(),
+            "emotion": run_emotion(args.emotion_model, backends, texts, args.batch_size, cache_dir),
+            "embedding": run_embedding(args.embedding_model, backends, texts, args.batch_size, cache_dir),
+        }
+
+    failures = [f"emotion/{b}" for b, r in report["emotion"].items() if r["label_agreement"] < args.min_agreement]
+    failures += [f"embedding/{b}" for b, r in report["embedding"].items() if r["min_cosine"] < args.min_cosine]
+    report["parity_failures"] = failures
+    print(json.dumps(report, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
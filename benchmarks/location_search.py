@@ -0,0 +1,167 @@
+"""
+location_search.py
+
+Result completeness and latency of location-restricted vector search on a
+synthetic multi-city corpus: the old post-filter pipeline ($vectorSearch
+top-k, then a $regex $match on location) against the pre-filtered
+`location_key` pipeline with adaptive numCandidates.
+
+Offline (default) the two strategies are emulated with NumPy brute force,
+which isolates the effect of filtering order:
+
+    python benchmarks/location_search.py --rows 50000 --cities 300
+
+With --atlas the synthetic corpus is written to a scratch collection
+(`<COLLECTION>_bench`) on the configured cluster, a vector index with a
+`location_key` filter is created on it, and both real pipelines are timed:
+
+    python benchmarks/location_search.py --atlas --rows 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# `python benchmarks/location_search.py` puts benchmarks/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)) * 1000, 3) if samples else 0.0
+
+
+def synthetic_corpus(rows: int, dims: int, cities: int, seed: int):
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(64, dims)).astype(np.float32)
+    vectors = topics[rng.integers(0, 64, size=rows)] + 0.7 * rng.normal(size=(rows, dims)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    weights = 1.0 / np.arange(1, cities + 1)
+    city = rng.choice(cities, size=rows, p=weights / weights.sum())
+    return vectors, city, rng
+
+
+def _summarize(label: str, completeness: List[float], latencies: List[float]) -> Dict:
+    return {
+        "strategy": label,
+        "mean_completeness": round(float(np.mean(completeness)), 4),
+        "empty_results": int(sum(1 for c in completeness if c == 0)),
+        "p50_ms": percentile_ms(latencies, 50),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+def run_offline(rows: int, dims: int, cities: int, queries: int, k: int, seed: int) -> Dict:
+    vectors, city, rng = synthetic_corpus(rows, dims, cities, seed)
+    members = {c: np.flatnonzero(city == c) for c in range(cities)}
+    query_cities = rng.integers(0, cities, size=queries)
+
+    post, post_t, pre, pre_t = [], [], [], []
+    for qc in query_cities:
+        q = vectors[rng.choice(members[qc])] if len(members[qc]) else vectors[0]
+        expected = min(k, len(members[qc]))
+        if expected == 0:
+            continue
+
+        # Post-filter: global top-k from $vectorSearch, then drop other cities
+        t0 = time.perf_counter()
+        scores = vectors @ q
+        top = np.argpartition(-scores, k)[:k]
+        kept = top[city[top] == qc]
+        post_t.append(time.perf_counter() - t0)
+        post.append(len(kept) / expected)
+
+        # Pre-filter: only rows of the requested city are candidates
+        t0 = time.perf_counter()
+        rows_c = members[qc]
+        local = vectors[rows_c] @ q
+        top = rows_c[np.argsort(-local)[:k]]
+        pre_t.append(time.perf_counter() - t0)
+        pre.append(len(top) / expected)
+
+    return {
+        "mode": "offline",
+        "rows": rows,
+        "cities": cities,
+        "k": k,
+        "results": [_summarize("post_filter_regex", post, post_t), _summarize("pre_filter_location_key", pre, pre_t)],
+    }
+
+
+def run_atlas(rows: int, dims: int, cities: int, queries: int, k: int, seed: int) -> Dict:
+    from pymongo.operations import SearchIndexModel
+
+    from app.db.mongo_client import atlas_client, COLLECTION_NAME
+    from app.services.mongo_vector import build_vector_search_pipeline, num_candidates_for
+
+    vectors, city, rng = synthetic_corpus(rows, dims, cities, seed)
+    coll = atlas_client.get_collection(f"{COLLECTION_NAME}_bench")
+    coll.drop()
+    coll.insert_many([
+        {"_id": i, "location": f"City {c}", "location_key": f"city {c}", "embedding": vectors[i].tolist(),
+         "timestamp": str(i)}
+        for i, c in enumerate(city.tolist())
+    ], ordered=False)
+    coll.create_index([("location_key", 1)])
+    coll.create_search_index(SearchIndexModel(name="vector_index", type="vectorSearch", definition={"fields": [
+        {"type": "vector", "path": "embedding", "numDimensions": dims, "similarity": "cosine"},
+        {"type": "filter", "path": "location_key"},
+    ]}))
+    while not any(ix.get("queryable") for ix in coll.list_search_indexes("vector_index")):
+        time.sleep(5)
+
+    counts = {c: int((city == c).sum()) for c in range(cities)}
+    post, post_t, pre, pre_t = [], [], [], []
+    for qc in rng.integers(0, cities, size=queries).tolist():
+        expected = min(k, counts[qc])
+        if expected == 0:
+            continue
+        q = vectors[rng.choice(np.flatnonzero(city == qc))].tolist()
+
+        legacy = [
+            {"$vectorSearch": {"queryVector": q, "path": "embedding", "numCandidates": 100,
+                               "limit": k, "index": "vector_index"}},
+            {"$match": {"location": {"$regex": f"City {qc}$", "$options": "i"}}},
+        ]
+        t0 = time.perf_counter()
+        got = list(coll.aggregate(legacy))
+        post_t.append(time.perf_counter() - t0)
+        post.append(len(got) / expected)
+
+        num_candidates, exact = num_candidates_for(k, counts[qc], rows)
+        t0 = time.perf_counter()
+        got = list(coll.aggregate(build_vector_search_pipeline(q, f"city {qc}", k, num_candidates, exact)))
+        pre_t.append(time.perf_counter() - t0)
+        pre.append(len(got) / expected)
+
+    coll.drop()
+    return {
+        "mode": "atlas",
+        "rows": rows,
+        "cities": cities,
+        "k": k,
+        "results": [_summarize("post_filter_regex", post, post_t), _summarize("pre_filter_location_key", pre, pre_t)],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--cities", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atlas", action="store_true", help="Run against the configured Atlas cluster")
+    args = parser.parse_args()
+
+    run = run_atlas if args.atlas else run_offline
+    print(json.dumps(run(args.rows, args.dims, args.cities, args.queries, args.k, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
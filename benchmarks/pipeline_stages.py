@@ -0,0 +1,390 @@
+"""
+pipeline_stages.py
+
+Offline per-stage benchmark of the enrichment pipeline. Each stage runs
+through the app's own code paths, with no network or downloads:
+
+- tiny, randomly initialised models (BERT emotion classifier, BERT sentence
+  embedder, BART summarizer), built once into --model-dir with fixed seeds
+- a local fake Serper server
+- mongomock, or a local mongod via --mongo-uri
+- VECTOR_BACKEND=local for similarity search
+
+For every stage x text length x batch size it reports items/second and
+p50/p95/p99 latency per batch. Absolute numbers only mean something on the
+same machine. Run the suite on two commits and compare them; changes over
+--threshold percent are flagged, and the command exits with code 1:
+
+    python benchmarks/pipeline_stages.py --out before.json
+    git checkout my-branch
+    python benchmarks/pipeline_stages.py --out after.json
+    python benchmarks/pipeline_stages.py --compare before.json after.json --threshold 10
+
+Stages: clean, dedup, summarize, classify, embed, mongo_write,
+vector_search, serper, ingest. Text lengths: short (passthrough summary),
+medium (extractive) and long (abstractive).
+"""
+
+import argparse
+import inspect
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+STAGES = ["clean", "dedup", "summarize", "classify", "embed", "mongo_write", "vector_search", "serper", "ingest"]
+LENGTHS = {"short": 20, "medium": 150, "long": 600}  # words per text
+LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+WORDS = ("the city council says floods storm market protest fire police school hospital rain "
+         "officials residents power prices election team match report local river road train "
+         "court judge minister health workers strike museum festival bridge weather").split()
+
+
+# ------------------------------------------------------------------------ #
+# Offline fixtures
+# ------------------------------------------------------------------------ #
+
+def build_tiny_models(model_dir: Path) -> Dict[str, str]:
+    """
+    Write tiny random models with a shared character-level WordPiece vocab;
+    reused if already present. Seeds are fixed so every run loads the same weights.
+    """
+    paths = {name: model_dir / name for name in ("emotion", "embed", "summary")}
+    if all((p / "config.json").exists() or (p / "modules.json").exists() for p in paths.values()):
+        return {k: str(v) for k, v in paths.items()}
+
+    import torch
+    from transformers import (BartConfig, BartForConditionalGeneration, BertConfig,
+                              BertForSequenceClassification, BertModel, BertTokenizerFast)
+    from sentence_transformers import SentenceTransformer, models
+
+    letters = [chr(c) for c in range(97, 123)] + [str(d) for d in range(10)]
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", ",", "!", "?"] + letters \
+        + [f"##{c}" for c in letters] + WORDS
+    model_dir.mkdir(parents=True, exist_ok=True)
+    vocab_file = model_dir / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab))
+
+    def tokenizer():
+        # Loaded from a directory: transformers 5 ignores the `vocab_file` argument
+        return BertTokenizerFast.from_pretrained(model_dir, model_max_length=512)
+
+    bert = dict(vocab_size=len(vocab), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                intermediate_size=64, max_position_embeddings=512)
+
+    torch.manual_seed(0)
+    emotion = BertForSequenceClassification(BertConfig(
+        **bert, num_labels=len(LABELS), id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)}))
+    emotion.save_pretrained(paths["emotion"])
+    tokenizer().save_pretrained(paths["emotion"])
+
+    torch.manual_seed(1)
+    hf_embed = model_dir / "embed_hf"
+    BertModel(BertConfig(**bert)).save_pretrained(hf_embed)
+    tokenizer().save_pretrained(hf_embed)
+    transformer = models.Transformer(str(hf_embed), max_seq_length=256)
+    SentenceTransformer(modules=[
+        transformer, models.Pooling(transformer.get_word_embedding_dimension(), "mean"), models.Normalize(),
+    ]).save(str(paths["embed"]))
+
+    torch.manual_seed(2)
+    summary = BartForConditionalGeneration(BartConfig(
+        vocab_size=len(vocab), d_model=32, encoder_layers=1, decoder_layers=1,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=64, decoder_ffn_dim=64,
+        max_position_embeddings=1024, pad_token_id=0, bos_token_id=2, eos_token_id=3,
+        decoder_start_token_id=2, forced_eos_token_id=3))
+    summary.generation_config.max_length = 32
+    summary.save_pretrained(paths["summary"])
+    tokenizer().save_pretrained(paths["summary"])
+    return {k: str(v) for k, v in paths.items()}
+
+
+class FakeSerper(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.latency)
+        rng = random.Random(body.get("q", ""))
+        news = [{"title": sentence(rng, 10), "link": f"https://example.com/{uuid.uuid4().hex}",
+                 "snippet": sentence(rng, 30), "source": "Example"} for _ in range(body.get("num", 10))]
+        data = json.dumps({"news": news}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def use_mongomock() -> None:
+    """
+    Point the app's shared Atlas client at an in-memory mongomock database.
+    """
+    import mongomock
+    from mongomock.collection import BulkOperationBuilder
+    from app.db import mongo_client
+
+    # pymongo >= 4.11 passes `sort=` when queueing updates; mongomock 4.3 does not accept it
+    add_update = BulkOperationBuilder.add_update
+    if "sort" not in inspect.signature(add_update).parameters:
+        BulkOperationBuilder.add_update = lambda self, *a, sort=None, **k: add_update(self, *a, **k)
+
+    client = mongomock.MongoClient()
+    mongo_client.atlas_client.mongodb_client = client
+    mongo_client.atlas_client.database = client[mongo_client.DB_NAME]
+
+
+def configure(args) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Set the environment before any app module (and so app.config) is imported.
+    """
+    paths = build_tiny_models(Path(args.model_dir))
+    FakeSerper.latency = args.serper_latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSerper)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    scratch = tempfile.mkdtemp(prefix="pipeline_stages_")
+    os.environ.pop("GCP_PROJECT_ID", None)  # local summarizer, never Vertex AI
+    os.environ.update({
+        "EMOTION_MODEL": paths["emotion"],
+        "EMBEDDING_MODEL": paths["embed"],
+        "SUMMARY_MODEL": paths["summary"],
+        "CACHE_ENABLED": "false",
+        "SERPER_API_KEY": "offline",
+        "SERPER_API_URL": f"http://127.0.0.1:{server.server_port}",
+        "SERPER_CACHE_TTL": "0",
+        "SERPER_STALE_TTL": "0",
+        "VECTOR_BACKEND": "local",
+        "VECTOR_INDEX_PATH": os.path.join(scratch, "vector_index"),
+        "GEOCODER": "static",
+        "WARM_UP_ON_STARTUP": "false",
+        "ATLAS_URI": args.mongo_uri or "mongodb://localhost:27017",
+        "DB": os.environ.get("DB") or "pipeline_stages",
+        "COLLECTION": f"bench_{uuid.uuid4().hex[:8]}",
+    })
+    if not args.mongo_uri:
+        use_mongomock()
+    return server, scratch
+
+
+# ------------------------------------------------------------------------ #
+# Workloads
+# ------------------------------------------------------------------------ #
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    # Sentences of ~15 words so the extractive route has something to rank
+    parts = text.split(" ")
+    return " ".join(p + ("." if (i + 1) % 15 == 0 else "") for i, p in enumerate(parts)).capitalize() + "."
+
+
+def make_texts(rng: random.Random, n: int, words: int) -> List[str]:
+    return [f"{uuid.uuid4().hex[:6]} {sentence(rng, words)}" for _ in range(n)]
+
+
+def make_docs(texts: List[str], vectors: List[List[float]], location: str) -> List[Dict]:
+    return [{
+        "location": location, "raw_title": t[:60], "raw_description": t, "summary": t[:200],
+        "sentiment": "neutral", "emotion_scores": {"neutral": 1.0}, "embedding": list(v),
+        "source_url": f"https://example.com/{uuid.uuid4().hex}", "timestamp": "2025-06-11T14:00:00",
+    } for t, v in zip(texts, vectors)]
+
+
+def stage_runner(stage: str, rng: random.Random, words: int, batch: int, scratch: str) -> Callable[[], int]:
+    """
+    A zero-argument callable running one batch of `stage`; returns items processed.
+    Inputs are fresh on every call so nothing is served from a cache.
+    """
+    from app.services import data_ingest, embeddings, google_search, mongo_vector, sentiment, summarizer
+    from app.utils.dedup import NearDuplicateIndex
+    from app.utils.text_utils import clean_texts
+
+    if stage == "clean":
+        return lambda: len(clean_texts(make_texts(rng, batch, words)))
+    if stage == "dedup":
+        index = NearDuplicateIndex()
+        return lambda: len(index.match_batch([uuid.uuid4().hex for _ in range(batch)],
+                                             make_texts(rng, batch, words)))
+    if stage == "summarize":
+        return lambda: len(summarizer.summarize_batch(make_texts(rng, batch, words)))
+    if stage == "classify":
+        return lambda: len(sentiment.classify_batch(make_texts(rng, batch, words)))
+    if stage == "embed":
+        return lambda: len(embeddings.get_batch_embeddings(make_texts(rng, batch, words)))
+    if stage == "mongo_write":
+        def write() -> int:
+            texts = make_texts(rng, batch, words)
+            vectors = np.random.default_rng(rng.randrange(1 << 30)).normal(size=(batch, 32)).tolist()
+            return mongo_vector.insert_news_vectors(make_docs(texts, vectors, "Benchville"))["inserted"]
+        return write
+    if stage == "vector_search":
+        # Seed the index with stored vectors once, then time batches of queries
+        if mongo_vector.get_local_index() is None or len(mongo_vector.get_local_index()) < 500:
+            texts = make_texts(rng, 500, 20)
+            mongo_vector.insert_news_vectors(make_docs(texts, embeddings.get_batch_embeddings(texts), "Benchville"))
+        def search() -> int:
+            queries = embeddings.get_batch_embeddings(make_texts(rng, batch, words))
+            return sum(1 for q in queries if mongo_vector.vector_search_by_location(q, "Benchville", k=5) is not None)
+        return search
+    if stage == "serper":
+        return lambda: len(google_search.fetch_news_many([uuid.uuid4().hex for _ in range(batch)], num_results=10))
+    if stage == "ingest":
+        path = Path(scratch) / f"ingest_{words}_{batch}.json"
+        def ingest() -> int:
+            with open(path, "w") as f:
+                for _ in range(batch):
+                    f.write(json.dumps({"headline": sentence(rng, 10), "short_description": sentence(rng, words),
+                                        "category": "BENCH", "link": f"https://example.com/{uuid.uuid4().hex}",
+                                        "date": "2025-06-11"}) + "\n")
+            collection = mongo_vector.collection
+            return data_ingest.ingest_range(collection, path, batch, batch_size=batch,
+                                            checkpoint_path=None, resume=False)["processed"]
+        return ingest
+    raise ValueError(f"Unknown stage {stage!r}")
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)) * 1000, 3) if samples else 0.0
+
+
+def measure(run: Callable[[], int], repeat: int, warmup: int) -> Dict:
+    for _ in range(warmup):
+        run()
+    latencies, items = [], 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items += run()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {
+        "items": items,
+        "items_per_s": round(items / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": percentile_ms(latencies, 50),
+        "p95_ms": percentile_ms(latencies, 95),
+        "p99_ms": percentile_ms(latencies, 99),
+    }
+
+
+# ------------------------------------------------------------------------ #
+# Comparison
+# ------------------------------------------------------------------------ #
+
+def compare(before_path: str, after_path: str, threshold: float) -> int:
+    """
+    Print per-row changes; returns the number of regressions beyond `threshold` percent.
+    """
+    with open(before_path) as f:
+        before = {(r["stage"], r["length"], r["batch_size"]): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    regressions = 0
+    print(f"{'stage':>14} {'length':>7} {'batch':>5}  {'items/s':>24}  {'p95 ms':>26}")
+    for row in after:
+        key = (row["stage"], row["length"], row["batch_size"])
+        old = before.get(key)
+        if old is None or "error" in row or "error" in old:
+            print(f"{key[0]:>14} {key[1]:>7} {key[2]:>5}  {'(no comparable result)':>24}")
+            continue
+        speed = pct_change(old["items_per_s"], row["items_per_s"])
+        tail = pct_change(old["p95_ms"], row["p95_ms"])
+        regressed = speed < -threshold or tail > threshold
+        regressions += regressed
+        print(f"{key[0]:>14} {key[1]:>7} {key[2]:>5}  "
+              f"{old['items_per_s']:>9} -> {row['items_per_s']:>9} ({speed:+6.1f}%)  "
+              f"{old['p95_ms']:>9} -> {row['p95_ms']:>9} ({tail:+6.1f}%)"
+              f"{'  << REGRESSION' if regressed else ''}")
+    print(f"\n{regressions} regression(s) beyond {threshold}%")
+    return regressions
+
+
+def pct_change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", nargs="*", choices=STAGES, default=STAGES)
+    parser.add_argument("--lengths", nargs="*", choices=list(LENGTHS), default=list(LENGTHS))
+    parser.add_argument("--batch-sizes", nargs="*", type=int, default=[1, 8, 32])
+    parser.add_argument("--repeat", type=int, default=5, help="timed batches per configuration")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed batches per configuration")
+    parser.add_argument("--model-dir", default=str(ROOT / ".cache" / "bench_models"))
+    parser.add_argument("--mongo-uri", help="use this (local) mongod instead of mongomock")
+    parser.add_argument("--serper-latency-ms", type=float, default=0.0, help="fake Serper response delay")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0: library default)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    sys.path.insert(0, str(ROOT))
+    server, scratch = configure(args)
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    rng = random.Random(args.seed)
+    results = []
+    for stage in args.stages:
+        for length in args.lengths:
+            for batch in args.batch_sizes:
+                row = {"stage": stage, "length": length, "batch_size": batch}
+                try:
+                    row.update(measure(stage_runner(stage, rng, LENGTHS[length], batch, scratch),
+                                       args.repeat, args.warmup))
+                except Exception as e:
+                    row["error"] = f"{type(e).__name__}: {e}"
+                results.append(row)
+                print(json.dumps(row), file=sys.stderr)
+    server.shutdown()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "machine": platform.platform(),
+            "mongo": args.mongo_uri or "mongomock",
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
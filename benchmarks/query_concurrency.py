@@ -0,0 +1,107 @@
+"""
+query_concurrency.py
+
+Concurrency benchmark for POST /query.
+
+Fires `--clients` parallel clients at a running backend, each sending
+`--requests` queries, and reports throughput and p50/p95/p99 latency.
+Run it once against the old build and once against the new one to compare:
+
+    uvicorn app.main:app --port 8000
+    python benchmarks/query_concurrency.py --clients 50 --requests 4 --out after.json
+    python benchmarks/query_concurrency.py --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+LOCATIONS = ["Paris", "Berlin", "Nairobi", "Tokyo", "New York", "Delhi", "Lima", "Sydney"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+async def _client(client: httpx.AsyncClient, url: str, worker: int, n: int,
+                  latencies: List[float], errors: List[int]) -> None:
+    for i in range(n):
+        location = LOCATIONS[(worker + i) % len(LOCATIONS)]
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json={"location": location})
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(-1)
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(base_url: str, clients: int, requests_per_client: int, timeout: float) -> Dict:
+    latencies: List[float] = []
+    errors: List[int] = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _client(client, f"{base_url}/query", w, requests_per_client, latencies, errors)
+            for w in range(clients)
+        ))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+        b, a = before[key], after[key]
+        change = ((a - b) / b * 100) if b else 0.0
+        print(f"{key:>15}: {b:>10} -> {a:>10}  ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = asyncio.run(run(args.url, args.clients, args.requests, args.timeout))
+    print(json.dumps(result, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+vector_index_recall.py
+
+Recall / latency benchmark of the local IVF vector index against brute force
+on a synthetic clustered corpus spread over many cities.
+
+    python benchmarks/vector_index_recall.py --rows 100000 --dims 384 --cities 200
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# `python benchmarks/vector_index_recall.py` puts benchmarks/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.vector_index import LocalVectorIndex
+
+
+def percentile_ms(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)) * 1000, 3) if samples else 0.0
+
+
+def synthetic_corpus(rows: int, dims: int, cities: int, topics: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dims)).astype(np.float32)
+    topic = rng.integers(0, topics, size=rows)
+    vectors = centers[topic] + 0.6 * rng.normal(size=(rows, dims)).astype(np.float32)
+    # Zipf-like city popularity: a few busy cities, a long tail of quiet ones
+    weights = 1.0 / np.arange(1, cities + 1)
+    city = rng.choice(cities, size=rows, p=weights / weights.sum())
+    return vectors, [f"city-{c}" for c in city], centers, rng
+
+
+def run(rows: int, dims: int, cities: int, queries: int, k: int, nlist: int, nprobe: int, seed: int) -> Dict:
+    vectors, locations, centers, rng = synthetic_corpus(rows, dims, cities, topics=max(nlist, 32), seed=seed)
+
+    index = LocalVectorIndex(dims, nlist=nlist, nprobe=nprobe, train_min=rows + 1)
+    start = time.perf_counter()
+    for i in range(rows):
+        index.add(i, vectors[i], locations[i])
+    index.train()
+    build_s = time.perf_counter() - start
+
+    topic = rng.integers(0, len(centers), size=queries)
+    qs = centers[topic] + 0.6 * rng.normal(size=(queries, dims)).astype(np.float32)
+    busy = [f"city-{c}" for c in range(min(5, cities))]
+
+    report = {"rows": rows, "dims": dims, "cities": cities, "k": k, "nlist": nlist,
+              "nprobe": nprobe, "build_s": round(build_s, 2)}
+    for label, loc_of in (("global", lambda i: None), ("busy_city", lambda i: busy[i % len(busy)])):
+        ann_t, exact_t, recalls = [], [], []
+        for i, q in enumerate(qs):
+            loc = loc_of(i)
+            t0 = time.perf_counter()
+            approx = index.search(q, k=k, location=loc)
+            t1 = time.perf_counter()
+            exact = index.search_exact(q, k=k, location=loc)
+            t2 = time.perf_counter()
+            ann_t.append(t1 - t0)
+            exact_t.append(t2 - t1)
+            truth = {h["_id"] for h in exact}
+            if truth:
+                recalls.append(len(truth & {h["_id"] for h in approx}) / len(truth))
+        report[label] = {
+            f"recall@{k}": round(float(np.mean(recalls)), 4) if recalls else 0.0,
+            "ann_p50_ms": percentile_ms(ann_t, 50),
+            "ann_p99_ms": percentile_ms(ann_t, 99),
+            "brute_p50_ms": percentile_ms(exact_t, 50),
+            "brute_p99_ms": percentile_ms(exact_t, 99),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dims", type=int, default=384)
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.rows, args.dims, args.cities, args.queries, args.k,
+                         args.nlist, args.nprobe, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import React, { useState, useEffect } from "react";
 import SearchBar from "./components/SearchBar";
 import SentimentCard from "./components/SentimentCard";
 import HistoryTimeline from "./components/HistoryTimeline";
-import { queryLocation } from "./api";
+import { streamLocation } from "./api";
 import "./styles.css";
 
 export default function App() {
@@ -24,8 +24,26 @@ export default function App() {
   setData(null);
 
   try {
-    const result = await queryLocation(location); // <- uses api.js
-    setData(result);
+    // Headlines render first, then each article as it is enriched, then the mood
+    await streamLocation(location, (event) => {
+      if (event.event === "headlines") {
+        setData({
+          location: event.location,
+          articles: event.articles.map((a) => ({ title: a.title, summary: a.snippet, source: a.source, pending: true })),
+        });
+      } else if (event.event === "article") {
+        const { event: _, index, ...article } = event;
+        setData((prev) => ({
+          ...prev,
+          articles: prev.articles.map((a, i) => (i === index ? article : a)),
+        }));
+      } else if (event.event === "summary") {
+        const { event: _, ...summary } = event;
+        setData((prev) => ({ ...prev, ...summary }));
+      } else if (event.event === "error") {
+        setError(event.detail || "Something went wrong.");
+      }
+    });
   } catch (err) {
     setError(err.message || "Something went wrong.");
   } finally {
@@ -45,7 +63,7 @@ export default function App() {
       <p className="subtitle">Ask: What's the public mood in a place right now?</p>
       <SearchBar location={location} setLocation={setLocation} onSearch={handleQuery} />
 
-      {loading && <p>🔄 Fetching live sentiment...</p>}
+      {loading && !data && <p>🔄 Fetching live sentiment...</p>}
       {error && <p className="error">❌ {error}</p>}
 
       {data && (
@@ -57,7 +75,7 @@ export default function App() {
             timestamp={data.timestamp}
             articles={data.articles}
           />
-          <HistoryTimeline events={data.similar_past || []} />
+          {data.similar_past && <HistoryTimeline events={data.similar_past} />}
         </>
       )}
     </div>
@@ -20,5 +20,63 @@ export async function queryLocation(location) {
     throw new Error(detail || "Server error");
   }
 
+  // Job mode (JOB_QUEUE on the backend): 202 with a job to poll
+  if (res.status === 202) {
+    const { poll } = await res.json();
+    return pollJob(poll);
+  }
+
   return res.json();
 }
+
+/**
+ * Poll GET /jobs/{id} until the job has finished.
+ * @param {string} path - The `poll` path returned with the 202.
+ * @param {number} intervalMs - Delay between polls.
+ * @returns {Promise<object>} - The job's result (same shape as POST /query).
+ */
+async function pollJob(path, intervalMs = 1000) {
+  for (;;) {
+    const res = await fetch(`${BASE_URL}${path}`);
+    const job = await res.json();
+    if (!res.ok) throw new Error(job.detail || "Server error");
+    if (job.status === "done") return job.result;
+    if (job.status === "failed") throw new Error(job.error || "Enrichment failed");
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+
+/**
+ * Same query, streamed from POST /query/stream as NDJSON so results can be
+ * rendered while the backend is still working.
+ * @param {string} location - City, region, or country.
+ * @param {(event: object) => void} onEvent - Called per event: "headlines"
+ *   first, one "article" per enriched article ({ index, ... }), then
+ *   "summary" (mood + past events) or "error".
+ * @returns {Promise<void>} - Resolves once the stream has ended.
+ */
+export async function streamLocation(location, onEvent) {
+  const res = await fetch(`${BASE_URL}/query/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ location, timestamp: new Date().toISOString() }),
+  });
+
+  if (!res.ok) {
+    const { detail } = await res.json();
+    throw new Error(detail || "Server error");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value, { stream: !done });
+    const lines = buffer.split("\n");
+    buffer = lines.pop(); // keep a partial line for the next chunk
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+    if (done) break;
+  }
+  if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
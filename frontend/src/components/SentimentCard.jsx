@@ -28,12 +28,17 @@ export default function SentimentCard({ location, mood, insight, timestamp, arti
   return (
     <div className="sentiment-card">
       <h2>
-        {moodEmoji} {location} Update —{" "}
-        <span className="timestamp">{new Date(timestamp).toLocaleString()}</span>
+        {moodEmoji} {location} Update
+        {timestamp && (
+          <>
+            {" "}—{" "}
+            <span className="timestamp">{new Date(timestamp).toLocaleString()}</span>
+          </>
+        )}
       </h2>
 
       <div className="insight" style={{ borderLeft: `5px solid ${moodColor}` }}>
-        <p>{insight}</p>
+        <p>{insight || "🔄 Analyzing the mood..."}</p>
       </div>
 
       <h3>📰 Top Headlines</h3>
@@ -44,7 +49,9 @@ export default function SentimentCard({ location, mood, insight, timestamp, arti
               <strong>{a.title}</strong>
             </a>
             <p className="summary-text">{a.summary}</p>
-            <span className="article-sentiment">Sentiment: <strong>{a.sentiment}</strong></span>
+            <span className="article-sentiment">
+              Sentiment: <strong>{a.pending ? "analyzing..." : a.sentiment}</strong>
+            </span>
           </li>
         ))}
       </ul>
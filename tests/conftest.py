@@ -0,0 +1,33 @@
+import inspect
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# `pytest tests/` puts tests/ on sys.path, not the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Set before app.config is imported. The Mongo client is created with
+# connect=False, so no server is needed unless a test talks to it.
+os.environ.setdefault("TESTING", "1")
+os.environ.setdefault("DB", "live_sentient_test")
+os.environ.setdefault("COLLECTION", "news_test")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("GEOCODE_CACHE_PATH", "")
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """
+    In-memory mongomock database for tests that write through pymongo.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.collection import BulkOperationBuilder
+
+    # pymongo >= 4.11 passes `sort=` when queueing updates; mongomock 4.3 does not accept it
+    add_update = BulkOperationBuilder.add_update
+    if "sort" not in inspect.signature(add_update).parameters:
+        monkeypatch.setattr(BulkOperationBuilder, "add_update",
+                            lambda self, *a, sort=None, **k: add_update(self, *a, **k))
+    return mongomock.MongoClient()["live_sentient_test"]
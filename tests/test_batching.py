@@ -0,0 +1,115 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+from app.utils.batching import MicroBatcher
+
+
+class Recorder:
+    """
+    Batch function that doubles its inputs and records every batch it gets.
+    """
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        with self._lock:
+            self.batches.append(list(items))
+        if self.fail_on is not None and self.fail_on in items:
+            raise ValueError(f"bad item {self.fail_on}")
+        return [item * 2 for item in items]
+
+
+def test_queued_items_share_one_call():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=32, max_wait_ms=50)
+    assert batcher.map(list(range(10))) == [i * 2 for i in range(10)]
+    assert fn.batches == [list(range(10))]
+    assert batcher.stats()["mean_batch_size"] == 10
+
+
+def test_concurrent_callers_are_coalesced():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=64, max_wait_ms=100)
+    start = threading.Barrier(8)
+    results = {}
+
+    def caller(n):
+        start.wait()
+        results[n] = batcher.map([n * 10 + i for i in range(3)])
+
+    threads = [threading.Thread(target=caller, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {n: [(n * 10 + i) * 2 for i in range(3)] for n in range(8)}
+    assert len(fn.batches) < 8
+    assert sum(len(b) for b in fn.batches) == 24
+
+
+def test_flushes_at_max_batch():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=4, max_wait_ms=1000)
+    started = time.perf_counter()
+    assert batcher.map(list(range(8))) == [i * 2 for i in range(8)]
+    # Full batches go at once, without waiting out max_wait
+    assert time.perf_counter() - started < 0.5
+    assert fn.batches == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+def test_flushes_a_partial_batch_after_max_wait():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=100, max_wait_ms=50)
+    started = time.perf_counter()
+    assert batcher.submit(21).result(timeout=2) == 42
+    elapsed = time.perf_counter() - started
+    assert 0.04 <= elapsed < 1.0
+    assert batcher.stats()["max_added_wait_ms"] >= 40
+
+
+def test_exception_reaches_every_waiter_and_worker_survives():
+    fn = Recorder(fail_on=3)
+    batcher = MicroBatcher("test", fn, max_batch=32, max_wait_ms=50)
+    futures = batcher.submit_many(list(range(5)))
+    for future in futures:
+        with pytest.raises(ValueError, match="bad item 3"):
+            future.result(timeout=2)
+    assert batcher.map([7]) == [14]
+
+
+def test_cancelled_items_are_skipped():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=32, max_wait_ms=100)
+    keep, drop = batcher.submit(1), batcher.submit(2)
+    assert drop.cancel()
+    assert keep.result(timeout=2) == 2
+    assert fn.batches == [[1]]
+
+
+def _map_in_child(batcher, results):
+    results.put(batcher.map([1, 2, 3]))
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_restarts_after_fork():
+    fn = Recorder()
+    batcher = MicroBatcher("test", fn, max_batch=32, max_wait_ms=10)
+    assert batcher.map([1]) == [2]  # the parent's worker thread is running now
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    child = ctx.Process(target=_map_in_child, args=(batcher, results))
+    child.start()
+    try:
+        assert results.get(timeout=10) == [2, 4, 6]
+    finally:
+        child.join(10)
+    assert child.exitcode == 0
+    # The parent's worker is unaffected
+    assert batcher.map([5]) == [10]
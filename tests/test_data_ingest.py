@@ -0,0 +1,164 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from app.services import data_ingest
+from app.utils.dedup import NearDuplicateIndex
+
+HEADLINE = "Heavy rain floods Delhi"
+DESCRIPTION = ("Heavy rain flooded several districts of Delhi on Tuesday, forcing thousands "
+               "of residents to leave their homes as rescue teams worked through the night.")
+
+
+def _record(link, description=DESCRIPTION):
+    return {"headline": HEADLINE, "short_description": description, "link": link}
+
+
+class Collection:
+    """
+    Upserts and `$addToSet` updates, rejecting documents whose link is in `reject`.
+    """
+
+    def __init__(self, reject=()):
+        self.docs = {}
+        self.reject = set(reject)
+
+    def bulk_write(self, ops, ordered=True):
+        errors, upserted = [], []
+        for n, op in enumerate(ops):
+            _id, update = op._filter["_id"], op._doc
+            if "$setOnInsert" in update:
+                if update["$setOnInsert"]["link"] in self.reject:
+                    errors.append({"index": n, "errmsg": "rejected"})
+                    continue
+                if _id not in self.docs:
+                    self.docs[_id] = dict(update["$setOnInsert"])
+                    upserted.append({"index": n, "_id": _id})
+            elif _id in self.docs:
+                merged = self.docs[_id].setdefault("syndicated_sources", [])
+                merged.extend(v for v in update["$addToSet"]["syndicated_sources"]["$each"] if v not in merged)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "upserted": upserted})
+        return SimpleNamespace(upserted_ids={u["index"]: u["_id"] for u in upserted})
+
+
+@pytest.fixture(autouse=True)
+def pipeline(monkeypatch):
+    def enrich_batch(records):
+        return [{"raw_title": r["headline"], "link": r["link"], "summary": r["short_description"]}
+                for r in records]
+
+    monkeypatch.setattr(data_ingest, "enrich_batch", enrich_batch)
+    monkeypatch.setattr(data_ingest, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(data_ingest, "_dedup_index", None)
+
+
+def test_near_duplicate_is_folded_into_stored_story():
+    collection = Collection()
+    assert data_ingest.ingest_batch(collection, [_record("https://a.example/1")])["inserted"] == 1
+    written = data_ingest.ingest_batch(collection, [_record("https://b.example/1", DESCRIPTION + " - Reuters")])
+    assert written["inserted"] == 0 and written["near_duplicates"] == 1
+    (stored,) = collection.docs.values()
+    assert stored["syndicated_sources"] == ["https://b.example/1"]
+
+
+def test_rejected_write_drops_its_dedup_key():
+    collection = Collection(reject=["https://a.example/1"])
+    written = data_ingest.ingest_batch(collection, [_record("https://a.example/1")])
+    assert written["inserted"] == 0 and written["errors"] == 1
+    assert len(data_ingest.get_dedup_index()) == 0
+
+    # The next copy is stored in its own right, not folded into a missing document
+    written = data_ingest.ingest_batch(collection, [_record("https://b.example/1", DESCRIPTION + " - Reuters")])
+    assert written["inserted"] == 1 and written["near_duplicates"] == 0
+
+
+def test_failed_batch_drops_all_its_dedup_keys(monkeypatch):
+    def broken(records):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(data_ingest, "enrich_batch", broken)
+    with pytest.raises(RuntimeError):
+        data_ingest.ingest_batch(Collection(), [_record("https://a.example/1")])
+    assert len(data_ingest.get_dedup_index()) == 0
+    assert isinstance(data_ingest.get_dedup_index(), NearDuplicateIndex)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """
+    JSON lines of uneven length with a blank line, a malformed line and no trailing newline.
+    """
+    lines = [json.dumps({"headline": f"story {i}", "short_description": "x" * (i * 7 % 50),
+                         "link": f"https://n.example/{i}"}) for i in range(40)]
+    lines[12:12] = ["", "{not json"]
+    path = tmp_path / "news.json"
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+def _links(records):
+    return [record["link"] for record in records]
+
+
+ALL_LINKS = [f"https://n.example/{i}" for i in range(40)]
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 7, 64])
+def test_shards_cover_every_line_exactly_once(dataset, shards):
+    ranges = data_ingest.shard_byte_ranges(dataset, shards)
+    assert ranges[0][0] == 0 and ranges[-1][1] == dataset.stat().st_size
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    links = [link for start, end in ranges
+             for link in _links(record for _, record in data_ingest.iter_records(dataset, start, end))]
+    assert links == ALL_LINKS
+
+
+class FlakyIngest:
+    """
+    Stands in for `ingest_batch`: records every stored link and fails once
+    `fail_after` records have been stored.
+    """
+
+    def __init__(self, fail_after=None):
+        self.links = []
+        self.fail_after = fail_after
+
+    def __call__(self, collection, records):
+        if self.fail_after is not None and len(self.links) + len(records) > self.fail_after:
+            raise RuntimeError("atlas unavailable")
+        self.links.extend(_links(records))
+        return {"inserted": len(records), "duplicates": 0, "near_duplicates": 0, "errors": 0}
+
+
+@pytest.mark.parametrize("shard", [0, 1])
+def test_resume_after_failure_neither_skips_nor_repeats(dataset, tmp_path, monkeypatch, shard):
+    monkeypatch.setattr(data_ingest, "BATCH_ATTEMPTS", 1)
+    start, end = data_ingest.shard_byte_ranges(dataset, 2)[shard]
+    expected = _links(record for _, record in data_ingest.iter_records(dataset, start, end))
+    checkpoint = tmp_path / "checkpoint.json"
+    options = dict(limit=100, batch_size=4, start=start, end=end, checkpoint_path=checkpoint)
+
+    first = FlakyIngest(fail_after=10)
+    monkeypatch.setattr(data_ingest, "ingest_batch", first)
+    stats = data_ingest.ingest_range(None, dataset, **options)
+    assert stats["failed_at"] is not None and stats["total"] == len(first.links) == 8
+
+    second = FlakyIngest()
+    monkeypatch.setattr(data_ingest, "ingest_batch", second)
+    stats = data_ingest.ingest_range(None, dataset, **options)
+    assert first.links + second.links == expected
+    assert stats["failed_at"] is None and stats["total"] == len(expected)
+
+
+def test_resume_continues_up_to_a_higher_limit(dataset, tmp_path, monkeypatch):
+    checkpoint = tmp_path / "checkpoint.json"
+    runs = [FlakyIngest(), FlakyIngest()]
+    for run, limit in zip(runs, (15, 40)):
+        monkeypatch.setattr(data_ingest, "ingest_batch", run)
+        data_ingest.ingest_range(None, dataset, limit=limit, batch_size=4, checkpoint_path=checkpoint)
+    assert len(runs[0].links) == 15
+    assert runs[0].links + runs[1].links == ALL_LINKS
+    assert data_ingest.load_checkpoint(checkpoint) == {"offset": dataset.stat().st_size, "count": 40}
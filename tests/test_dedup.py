@@ -0,0 +1,69 @@
+import numpy as np
+
+from app.utils.dedup import MinHasher, NearDuplicateIndex, canonical_indices, optimal_bands
+
+STORY = ("Heavy rain flooded several districts of Delhi on Tuesday, forcing thousands "
+         "of residents to leave their homes as rescue teams worked through the night.")
+SYNDICATED = ("Heavy rain flooded several districts of Delhi on Tuesday, forcing thousands "
+              "of residents to leave their homes as rescue teams worked through the night - Reuters")
+OTHER = ("The city council approved a new budget for public transport, adding two metro "
+         "lines and a fleet of electric buses over the next five years.")
+
+
+def _s_curve(bands, rows, s):
+    return 1 - (1 - s ** rows) ** bands
+
+
+def test_optimal_bands_fit_the_signature():
+    for threshold in (0.5, 0.8, 0.9):
+        bands, rows = optimal_bands(threshold, 128)
+        assert bands * rows <= 128
+
+
+def test_optimal_bands_separate_around_threshold():
+    bands, rows = optimal_bands(0.8, 128)
+    assert _s_curve(bands, rows, 0.95) > 0.95
+    assert _s_curve(bands, rows, 0.5) < 0.05
+    # A stricter threshold needs longer bands
+    assert optimal_bands(0.9, 128)[1] >= optimal_bands(0.5, 128)[1]
+
+
+def test_signature_is_deterministic_across_hashers():
+    a, b = MinHasher(64), MinHasher(64)
+    assert np.array_equal(a.signature("some text here"), b.signature("some text here"))
+    assert a.signature("") is None
+
+
+def test_near_duplicate_maps_to_first_copy():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.match_batch(["a", "b", "c"], [STORY, SYNDICATED, OTHER]) == [None, "a", None]
+    assert len(index) == 2  # duplicates are not indexed
+    assert index.stats()["duplicates"] == 1
+
+
+def test_same_key_seen_again_matches_itself():
+    index = NearDuplicateIndex()
+    index.match("a", STORY)
+    assert index.match("a", STORY) == "a"
+
+
+def test_eviction_drops_oldest_entries():
+    index = NearDuplicateIndex(max_items=1)
+    index.match("a", STORY)
+    index.match("c", OTHER)
+    assert "a" not in index and "c" in index
+    assert index.match("b", SYNDICATED) is None
+    # Evicted keys leave no empty band buckets behind
+    assert all(members for bucket in index._buckets for members in bucket.values())
+
+
+def test_discard_forgets_keys():
+    index = NearDuplicateIndex()
+    index.match("a", STORY)
+    index.discard(["a", "missing"])
+    assert len(index) == 0
+    assert index.match("b", SYNDICATED) is None
+
+
+def test_canonical_indices():
+    assert canonical_indices([STORY, OTHER, SYNDICATED, ""]) == [0, 1, 0, 3]
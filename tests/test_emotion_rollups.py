@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import timeline as timeline_route
+from app.services import emotion_rollups
+from app.services.emotion_rollups import bucket_start, build_rollup_ops, timeline, update_rollups
+
+
+@pytest.fixture
+def rollups(mongo_db, monkeypatch):
+    collection = mongo_db["rollups"]
+    monkeypatch.setattr(emotion_rollups, "rollups", collection)
+    return collection
+
+
+@pytest.fixture
+def client(rollups):
+    app = FastAPI()
+    app.include_router(timeline_route.router)
+    return TestClient(app)
+
+
+def _doc(timestamp, sentiment="joy", location="Paris", **scores):
+    return {"location": location, "timestamp": timestamp, "sentiment": sentiment,
+            "emotion_scores": scores or {sentiment: 0.9, "fear": 0.1}}
+
+
+def _buckets(ops):
+    return sorted(op._filter["_id"] for op in ops)
+
+
+def test_hour_buckets_split_on_the_hour():
+    ops = build_rollup_ops([_doc("2025-06-11T10:59:59"), _doc("2025-06-11T11:00:00")], granularities=["hour"])
+    assert _buckets(ops) == ["paris|hour|2025-06-11T10:00:00", "paris|hour|2025-06-11T11:00:00"]
+
+
+def test_day_buckets_split_at_midnight_utc():
+    docs = [_doc("2025-06-11T23:59:59Z"), _doc("2025-06-12T00:00:00Z"),
+            _doc("2025-06-12T01:30:00+02:00")]  # 23:30 UTC on the 11th
+    ops = build_rollup_ops(docs, granularities=["day"])
+    assert _buckets(ops) == ["paris|day|2025-06-11T00:00:00", "paris|day|2025-06-12T00:00:00"]
+    counts = {op._filter["_id"]: op._doc["$inc"]["count"] for op in ops}
+    assert counts["paris|day|2025-06-11T00:00:00"] == 2
+
+
+def test_bucket_start_rejects_unknown_granularity():
+    with pytest.raises(ValueError):
+        bucket_start(datetime(2025, 6, 11, 10, 30), "week")
+
+
+def test_docs_without_timestamp_or_emotion_are_skipped():
+    docs = [_doc("not a date"), {"location": "Paris", "timestamp": "2025-06-11T10:00:00"}]
+    assert build_rollup_ops(docs) == []
+
+
+def test_repeated_stores_only_increment(rollups):
+    doc = _doc("2025-06-11T10:15:00", joy=0.75, fear=0.25)
+    for op in build_rollup_ops([doc]):
+        assert set(op._doc) == {"$inc", "$setOnInsert"}
+        assert op._upsert
+
+    update_rollups([doc])
+    update_rollups([doc])
+    stored = rollups.find_one({"_id": "paris|hour|2025-06-11T10:00:00"})
+    assert stored["count"] == 2
+    assert stored["scores"] == {"joy": 1.5, "fear": 0.5}
+    assert stored["labels"] == {"joy": 2}
+    assert stored["bucket"] == datetime(2025, 6, 11, 10)
+    assert rollups.count_documents({}) == 2  # one hour and one day bucket
+
+
+def test_timeline_returns_mean_scores_per_bucket(rollups):
+    update_rollups([
+        _doc("2025-06-10T09:00:00", "joy", joy=0.8, fear=0.2),
+        _doc("2025-06-11T09:00:00", "fear", joy=0.1, fear=0.9),
+        _doc("2025-06-11T18:00:00", "fear", joy=0.3, fear=0.7),
+    ])
+    result = timeline("paris", "day", datetime(2025, 6, 1), datetime(2025, 6, 12))
+    assert [b["bucket"] for b in result["buckets"]] == ["2025-06-10T00:00:00Z", "2025-06-11T00:00:00Z"]
+    assert result["buckets"][1]["scores"] == {"joy": 0.2, "fear": 0.8}
+    assert result["buckets"][1]["dominant_emotion"] == "fear"
+    assert result["total_articles"] == 3 and result["dominant_emotion"] == "fear"
+
+
+def test_timeline_stops_at_max_buckets(rollups, monkeypatch):
+    monkeypatch.setattr(emotion_rollups, "TIMELINE_MAX_BUCKETS", 3)
+    update_rollups([_doc(f"2025-06-11T0{h}:30:00") for h in range(6)])
+    result = timeline("Paris", "hour", datetime(2025, 6, 11), datetime(2025, 6, 12))
+    assert [b["bucket"] for b in result["buckets"]] == [
+        "2025-06-11T00:00:00Z", "2025-06-11T01:00:00Z", "2025-06-11T02:00:00Z",
+    ]
+
+
+def test_route_returns_timeline(client):
+    update_rollups([_doc("2025-06-11T10:15:00")])
+    response = client.get("/timeline", params={"location": "paris", "granularity": "hour",
+                                               "start": "2025-06-11T00:00:00Z", "end": "2025-06-12T00:00:00Z"})
+    assert response.status_code == 200
+    assert response.json()["buckets"][0]["bucket"] == "2025-06-11T10:00:00Z"
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"location": "Paris", "granularity": "week"}, 400),
+    ({"location": "Paris", "start": "2025-06-12T00:00:00", "end": "2025-06-11T00:00:00"}, 400),
+    ({"location": "Paris", "start": "yesterday"}, 422),
+    ({"granularity": "day"}, 422),
+])
+def test_route_rejects_bad_requests(client, params, status):
+    assert client.get("/timeline", params=params).status_code == status
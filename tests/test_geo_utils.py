@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+import types
+
+import pytest
+
+from app.utils import geo_utils
+from app.utils.geo_utils import (
+    NOT_FOUND, TIMEOUT, GeocoderTimeout, StaticGeocoder, resolve_location, set_geocoder,
+)
+
+PARIS = {"latitude": 48.8566, "longitude": 2.3522, "display_name": "Paris, France"}
+
+
+class CountingGeocoder(StaticGeocoder):
+    def __init__(self, places, fail=None):
+        super().__init__(places)
+        self.calls = 0
+        self.fail = fail
+
+    def geocode(self, location):
+        self.calls += 1
+        if self.fail:
+            raise self.fail
+        return super().geocode(location)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    fake = types.SimpleNamespace(time=lambda: now[0], sleep=lambda seconds: None)
+    monkeypatch.setattr(geo_utils, "time", fake)
+    return now
+
+
+@pytest.fixture
+def geocoder():
+    geocoder = CountingGeocoder({"Paris": PARIS})
+    set_geocoder(geocoder)
+    yield geocoder
+    set_geocoder(None)
+
+
+def test_second_lookup_is_a_cache_hit(geocoder):
+    # The geocode cache stays on although tests run with CACHE_ENABLED=false
+    assert resolve_location("Paris") == PARIS
+    assert resolve_location("  paris ") == PARIS
+    assert geocoder.calls == 1
+
+
+def test_not_found_is_cached_until_the_negative_ttl(geocoder, clock, monkeypatch):
+    monkeypatch.setattr(geo_utils, "GEOCODE_NEGATIVE_TTL", 60.0)
+    assert resolve_location("Atlantis") == {"error": NOT_FOUND}
+    clock[0] += 59
+    assert resolve_location("Atlantis") == {"error": NOT_FOUND}
+    assert geocoder.calls == 1
+    clock[0] += 2
+    resolve_location("Atlantis")
+    assert geocoder.calls == 2
+
+
+def test_timeouts_are_cached_for_the_error_ttl(clock, monkeypatch):
+    monkeypatch.setattr(geo_utils, "GEOCODE_ERROR_TTL", 10.0)
+    geocoder = CountingGeocoder({}, fail=GeocoderTimeout("slow"))
+    set_geocoder(geocoder)
+    try:
+        assert resolve_location("Paris", retries=3) == {"error": TIMEOUT}
+        assert geocoder.calls == 3
+        assert resolve_location("Paris", retries=3) == {"error": TIMEOUT}
+        assert geocoder.calls == 3
+        clock[0] += 11
+        resolve_location("Paris", retries=3)
+        assert geocoder.calls == 6
+    finally:
+        set_geocoder(None)
+
+
+def test_concurrent_cold_lookups_share_one_call(geocoder):
+    release = threading.Event()
+    geocode = geocoder.geocode
+
+    def slow_geocode(location):
+        release.wait(5)
+        return geocode(location)
+
+    geocoder.geocode = slow_geocode
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resolve_location("Paris"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while not geo_utils._inflight:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == [PARIS] * 8
+    assert geocoder.calls == 1
+    assert geo_utils._inflight == {}
+
+
+def test_store_does_not_wait_for_a_slow_geocode(monkeypatch):
+    from app.routes import query
+
+    written, geo_set = [], []
+
+    async def insert(docs):
+        written.extend(docs)
+        return {"inserted_ids": []}
+
+    async def rollups(docs):
+        pass
+
+    async def set_geo(ids, point):
+        geo_set.append((ids, point))
+
+    monkeypatch.setattr(query, "insert_news_vectors_async", insert)
+    monkeypatch.setattr(query, "update_rollups_async", rollups)
+    monkeypatch.setattr(query, "set_geo_async", set_geo)
+    monkeypatch.setattr(query, "GEOCODE_WAIT", 0.01)
+
+    async def run():
+        geocode = asyncio.ensure_future(asyncio.sleep(0.05, result=PARIS))
+        docs = [{"location": "Paris", "raw_title": "t", "source_url": "https://a.example/1"}]
+        await query._store(docs, [0], geocode, None)
+        assert written and "geo" not in written[0] and not geo_set
+        await asyncio.gather(*query._background)
+        return docs
+
+    docs = asyncio.run(run())
+    assert geo_set == [([query.content_id(docs[0])], {"type": "Point", "coordinates": [2.3522, 48.8566]})]
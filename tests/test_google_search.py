@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import google_search
+from app.services.google_search import SerperClient, fetch_news, fetch_news_async, news_cache
+
+
+class FakeSerper:
+    """
+    Local stand-in for the Serper news endpoint. Answers with `script`
+    (status, headers) entries first, then 200s; counts every request.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.script = []
+        self.calls = 0
+        self.times = []
+        self.version = 1
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with fake._lock:
+                    fake.calls += 1
+                    fake.times.append(time.monotonic())
+                    status, headers = fake.script.pop(0) if fake.script else (200, {})
+                    version = fake.version
+                time.sleep(fake.delay)
+                payload = {"news": [{"title": f"{body['q']} v{version}", "link": f"https://news.example/{version}"}]}
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search/news"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def serper(monkeypatch):
+    server = FakeSerper(delay=0.05)
+    client = SerperClient(api_key="test", api_url=server.url, timeout=5, max_retries=3,
+                          backoff_base=0.01, backoff_max=1.0)
+    monkeypatch.setattr(google_search, "_client", client)
+    news_cache.clear()
+    yield server
+    news_cache.clear()
+    client.close()
+    server.close()
+
+
+def _titles(articles):
+    return [a["title"] for a in articles]
+
+
+def test_fresh_hit_makes_no_upstream_call(serper):
+    async def scenario():
+        first = await fetch_news_async("Paris")
+        second = await fetch_news_async("  paris ")
+        await google_search.close_async_client()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert _titles(first) == _titles(second) == ["paris v1"]
+    assert serper.calls == 1
+    assert fetch_news("Paris") == first
+    assert serper.calls == 1
+
+
+def test_stale_entry_is_served_while_one_refresh_runs(serper):
+    key = google_search._cache_key("Paris", 5)
+    stale = [{"title": "Paris v0", "link": "https://news.example/0"}]
+    news_cache._items[key] = (time.monotonic() - news_cache.ttl - 1, stale)
+
+    async def scenario():
+        served = await asyncio.gather(*(fetch_news_async("Paris") for _ in range(5)))
+        assert all(articles == stale for articles in served)
+        await asyncio.gather(*google_search._inflight.values())
+        await google_search.close_async_client()
+
+    asyncio.run(scenario())
+    assert serper.calls == 1
+    articles, fresh = news_cache.get(key)
+    assert fresh and _titles(articles) == ["paris v1"]
+
+
+def test_concurrent_async_lookups_share_one_request(serper):
+    async def scenario():
+        results = await asyncio.gather(*(fetch_news_async("Lyon") for _ in range(10)))
+        await google_search.close_async_client()
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(_titles(articles) == ["lyon v1"] for articles in results)
+    assert serper.calls == 1
+
+
+def test_concurrent_sync_lookups_share_one_request(serper):
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: fetch_news("Lyon"), range(10)))
+    assert all(_titles(articles) == ["lyon v1"] for articles in results)
+    assert serper.calls == 1
+
+
+def test_sync_stale_entry_is_refreshed_in_the_background(serper):
+    key = google_search._cache_key("Paris", 5)
+    stale = [{"title": "Paris v0", "link": "https://news.example/0"}]
+    news_cache._items[key] = (time.monotonic() - news_cache.ttl - 1, stale)
+    assert fetch_news("Paris") == stale
+    deadline = time.monotonic() + 5
+    while news_cache.get(key)[0] == stale and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _titles(news_cache.get(key)[0]) == ["paris v1"]
+    assert serper.calls == 1
+
+
+def test_retries_honour_retry_after(serper):
+    serper.script = [(429, {"Retry-After": "0.3"}), (503, {})]
+    assert _titles(fetch_news("Nice")) == ["nice v1"]
+    assert serper.calls == 3
+    assert serper.times[1] - serper.times[0] >= 0.3
+
+
+def test_async_retries_honour_retry_after(serper):
+    serper.script = [(503, {"Retry-After": "0.3"}), (429, {})]
+
+    async def scenario():
+        articles = await fetch_news_async("Nice")
+        await google_search.close_async_client()
+        return articles
+
+    assert _titles(asyncio.run(scenario())) == ["nice v1"]
+    assert serper.calls == 3
+    assert serper.times[1] - serper.times[0] >= 0.3
+
+
+def test_client_errors_are_not_retried(serper):
+    serper.script = [(401, {})]
+    assert fetch_news("Nice") == []
+    assert serper.calls == 1
+
+
+def test_retries_stop_after_max_retries(serper):
+    serper.script = [(503, {})] * 4
+    assert fetch_news("Nice") == []
+    assert serper.calls == 4
+    assert news_cache.get(google_search._cache_key("Nice", 5)) is None
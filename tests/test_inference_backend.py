@@ -0,0 +1,143 @@
+import random
+from functools import partial
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app.services import embeddings, sentiment
+from app.utils import inference_backend
+from app.utils.inference_backend import TransformerEncoder
+
+LABELS = ["anger", "disgust", "fear", "joy", "sadness", "surprise"]
+WORDS = ("city council protest flood market storm fire rescue election festival "
+         "strike hospital school police court bridge river team victory loss happy sad").split()
+BACKENDS = ["int8", "onnx", "onnx-int8"]
+
+MIN_AGREEMENT = 0.9
+MIN_COSINE = 0.98
+
+
+def _texts(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 40))) for _ in range(n)]
+
+
+TEXTS = _texts(60)
+
+
+@pytest.fixture(scope="module")
+def tiny_models(tmp_path_factory):
+    """
+    A tiny random BERT emotion classifier and BERT encoder sharing a word-level vocab.
+    """
+    from transformers import BertConfig, BertForSequenceClassification, BertModel, BertTokenizerFast
+
+    root = tmp_path_factory.mktemp("models")
+    vocab_file = root / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS))
+    # Wider than the default init, or a random model gives every text the same label
+    bert = dict(vocab_size=5 + len(WORDS), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                intermediate_size=64, max_position_embeddings=128, initializer_range=0.2)
+
+    torch.manual_seed(0)
+    emotion = BertForSequenceClassification(BertConfig(
+        **bert, num_labels=len(LABELS), id2label=dict(enumerate(LABELS)),
+        label2id={label: i for i, label in enumerate(LABELS)}))
+    paths = {"emotion": root / "emotion", "embed": root / "embed"}
+    emotion.save_pretrained(paths["emotion"])
+    torch.manual_seed(1)
+    BertModel(BertConfig(**bert)).save_pretrained(paths["embed"])
+    for path in paths.values():
+        # Loaded from a directory: transformers 5 ignores the `vocab_file` argument
+        (path / "vocab.txt").write_text(vocab_file.read_text())
+        tokenizer = BertTokenizerFast.from_pretrained(path, model_max_length=128)
+        assert tokenizer.unk_token_id not in tokenizer(TEXTS[0])["input_ids"]
+        tokenizer.save_pretrained(path)
+    return {name: str(path) for name, path in paths.items()}
+
+
+@pytest.fixture
+def onnx_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(inference_backend, "optimize", partial(inference_backend.optimize, cache_dir=str(tmp_path)))
+
+
+def _require(backend):
+    if backend.startswith("onnx"):
+        pytest.importorskip("onnxruntime")
+
+
+def _use_emotion_model(monkeypatch, path, backend):
+    monkeypatch.setattr(sentiment, "MODEL_NAME", path)
+    monkeypatch.setattr(sentiment, "EMOTION_BACKEND", backend)
+    monkeypatch.setattr(sentiment, "CLASSIFY_BATCHING", False)
+    for cached in (sentiment._get_tokenizer, sentiment._get_model, sentiment._get_labels):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def emotion_model(monkeypatch):
+    yield partial(_use_emotion_model, monkeypatch)
+    for cached in (sentiment._get_tokenizer, sentiment._get_model, sentiment._get_labels):
+        cached.cache_clear()
+
+
+@pytest.fixture
+def embedding_model(monkeypatch):
+    def use(path, backend):
+        monkeypatch.setattr(embeddings, "LOCAL_MODEL_NAME", path)
+        monkeypatch.setattr(embeddings, "EMBEDDING_BACKEND", backend)
+        monkeypatch.setattr(embeddings, "USE_GEMINI", False)
+        embeddings._local_model.cache_clear()
+
+    yield use
+    embeddings._local_model.cache_clear()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_classify_agrees_with_fp32(backend, tiny_models, emotion_model, onnx_cache):
+    _require(backend)
+    emotion_model(tiny_models["emotion"], "torch")
+    reference = sentiment.classify_batch(TEXTS)
+    # The test only means something if the fp32 model does not answer one label for everything
+    assert len({r["emotion"] for r in reference}) > 1
+
+    emotion_model(tiny_models["emotion"], backend)
+    single = sentiment.classify(TEXTS[0])
+    assert set(single) == {"emotion", "confidence", "scores"}
+    assert set(single["scores"]) == set(LABELS) and single["emotion"] in LABELS
+    assert single["confidence"] == single["scores"][single["emotion"]]
+
+    results = sentiment.classify_batch(TEXTS)
+    assert len(results) == len(TEXTS)
+    agreement = np.mean([r["emotion"] == ref["emotion"] for r, ref in zip(results, reference)])
+    assert agreement >= MIN_AGREEMENT
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_embeddings_match_fp32(backend, tiny_models, embedding_model, onnx_cache):
+    _require(backend)
+    from transformers import AutoModel, AutoTokenizer
+
+    path = tiny_models["embed"]
+    reference = TransformerEncoder(AutoTokenizer.from_pretrained(path), AutoModel.from_pretrained(path).eval())
+    reference = reference.encode(TEXTS)
+
+    embedding_model(path, backend)
+    single = embeddings.get_embedding(TEXTS[0])
+    assert isinstance(single, list) and len(single) == reference.shape[1]
+    assert all(isinstance(x, float) for x in single)
+
+    vectors = np.asarray(embeddings.get_batch_embeddings(TEXTS))
+    assert vectors.shape == reference.shape
+    cosine = np.sum(reference * vectors, axis=1) / np.linalg.norm(vectors, axis=1)
+    assert cosine.min() >= MIN_COSINE
+
+
+def test_unknown_backend_is_rejected(tiny_models):
+    from transformers import AutoModel
+
+    with pytest.raises(ValueError):
+        inference_backend.optimize(AutoModel.from_pretrained(tiny_models["embed"]), "fp8", "tiny")
@@ -0,0 +1,225 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.job_queue import (
+    DONE, FAILED, QUEUED, RUNNING, STALE_AFTER, JobQueue, MemoryJobStore, QueueFull, SqliteJobStore, _new_job,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryJobStore()
+    return SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def _add(store, n, max_depth=0):
+    jobs = [_new_job({"location": f"city {i}"}) for i in range(n)]
+    for i, job in enumerate(jobs):
+        job["created_at"] += i  # distinct, so the sqlite store's FIFO order is defined
+        assert store.add(job, max_depth)
+    return jobs
+
+
+def test_claim_is_fifo_and_marks_running(store):
+    first, second = _add(store, 2)
+    claimed = store.claim()
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == RUNNING and claimed["started_at"] is not None
+    assert claimed["payload"] == {"location": "city 0"}
+    assert store.claim()["id"] == second["id"]
+    assert store.claim() is None
+
+
+def test_finish_stores_result_and_error(store):
+    ok, bad = _add(store, 2)
+    store.claim(), store.claim()
+    store.finish(ok["id"], DONE, result={"articles": [1, 2]})
+    store.finish(bad["id"], FAILED, error="RuntimeError: boom")
+    assert store.get(ok["id"])["result"] == {"articles": [1, 2]}
+    assert store.get(bad["id"])["error"] == "RuntimeError: boom"
+    assert store.counts() == {QUEUED: 0, RUNNING: 0, DONE: 1, FAILED: 1}
+
+
+def test_add_respects_max_depth(store):
+    _add(store, 2, max_depth=2)
+    assert not store.add(_new_job({}), 2)
+    store.claim()  # running jobs no longer count as waiting
+    assert store.add(_new_job({}), 2)
+
+
+def test_release_requeues_running_job(store):
+    (job,) = _add(store, 1)
+    store.claim()
+    store.release(job["id"])
+    assert store.get(job["id"])["status"] == QUEUED
+    assert store.claim()["id"] == job["id"]
+
+
+def test_purge_drops_expired_results_only(store):
+    old, fresh, running = _add(store, 3)
+    for _ in range(3):
+        store.claim()
+    store.finish(old["id"], DONE, result={})
+    store.finish(fresh["id"], DONE, result={})
+    if isinstance(store, MemoryJobStore):
+        store._jobs[old["id"]]["finished_at"] -= 120
+    else:
+        store._connection().execute("UPDATE jobs SET finished_at = finished_at - 120 WHERE id = ?", (old["id"],))
+    store.purge(ttl=60)
+    assert store.get(old["id"]) is None
+    assert store.get(fresh["id"])["status"] == DONE
+    assert store.get(running["id"])["status"] == RUNNING
+
+
+def test_memory_store_never_requeues_running_jobs():
+    store = MemoryJobStore()
+    (job,) = _add(store, 1)
+    store.claim()
+    store._jobs[job["id"]]["started_at"] -= 10 * STALE_AFTER
+    store.purge(ttl=60)
+    assert store.get(job["id"])["status"] == RUNNING
+    assert store.claim() is None
+
+
+def test_sqlite_requeues_jobs_without_heartbeat(tmp_path):
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    alive, dead = _add(store, 2)
+    store.claim(), store.claim()
+    store._connection().execute("UPDATE jobs SET heartbeat_at = heartbeat_at - ?", (2 * STALE_AFTER,))
+    store.heartbeat([alive["id"]])
+    store.purge(ttl=60)
+    assert store.get(alive["id"])["status"] == RUNNING
+    assert store.get(dead["id"])["status"] == QUEUED
+
+
+def test_queue_rejects_when_full(store):
+    async def handler(payload):
+        return payload
+
+    async def scenario():
+        queue = JobQueue(store, handler, workers=1, max_depth=2)
+        await queue.submit({"n": 1})
+        await queue.submit({"n": 2})
+        with pytest.raises(QueueFull):
+            await queue.submit({"n": 3})
+        with pytest.raises(QueueFull):
+            await queue.check_capacity()
+        assert queue.stats()["rejected"] == 2
+        assert queue.retry_after() >= 1
+
+    asyncio.run(scenario())
+
+
+def test_inline_runs_share_the_depth(store):
+    async def handler(payload):
+        return payload
+
+    async def scenario():
+        queue = JobQueue(store, handler, workers=1, max_depth=2)
+        async with queue.inline():
+            await queue.submit({"n": 1})
+            with pytest.raises(QueueFull):
+                await queue.submit({"n": 2})
+        await queue.submit({"n": 2})
+
+    asyncio.run(scenario())
+
+
+def test_workers_run_jobs(store):
+    async def handler(payload):
+        if payload.get("fail"):
+            raise ValueError("bad payload")
+        return {"echo": payload["n"]}
+
+    async def scenario():
+        queue = JobQueue(store, handler, workers=2, max_depth=0)
+        await queue.start()
+        try:
+            ok = await queue.submit({"n": 7})
+            bad = await queue.submit({"n": 8, "fail": True})
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                done = [await queue.get(job["id"]) for job in (ok, bad)]
+                if all(job["status"] in (DONE, FAILED) for job in done):
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+        assert done[0]["status"] == DONE and done[0]["result"] == {"echo": 7}
+        assert done[1]["status"] == FAILED and "bad payload" in done[1]["error"]
+
+    asyncio.run(scenario())
+
+
+def test_workers_survive_store_errors(store, monkeypatch):
+    monkeypatch.setattr("app.services.job_queue.POLL_INTERVAL", 0.01)
+    claim = store.claim
+    failures = [2]
+
+    def flaky_claim():
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError("database is locked")
+        return claim()
+
+    store.claim = flaky_claim
+
+    async def handler(payload):
+        result = {"echo": payload["n"]}
+        if payload.get("opaque"):
+            result["self"] = result  # circular, so the sqlite store cannot encode it
+        return result
+
+    async def scenario():
+        queue = JobQueue(store, handler, workers=1, max_depth=0)
+        await queue.start()
+        try:
+            first = await queue.submit({"n": 1, "opaque": isinstance(store, SqliteJobStore)})
+            second = await queue.submit({"n": 2})
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline:
+                done = [await queue.get(job["id"]) for job in (first, second)]
+                if all(job["status"] in (DONE, FAILED) for job in done):
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+        assert failures == [0]
+        if isinstance(store, SqliteJobStore):
+            assert done[0]["status"] == FAILED and "Storing the result failed" in done[0]["error"]
+        else:
+            assert done[0]["status"] == DONE
+        assert done[1]["status"] == DONE and done[1]["result"] == {"echo": 2}
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_is_refused_before_fetching_news(monkeypatch):
+    from fastapi import HTTPException
+
+    from app.models.user_query import UserQuery
+    from app.routes import query
+
+    fetched = []
+
+    async def fetch(location, timings):
+        fetched.append(location)
+        return [{"title": "t", "snippet": "s", "link": "https://a.example/1"}]
+
+    async def handler(payload):
+        return payload
+
+    async def scenario():
+        queue = JobQueue(MemoryJobStore(), handler, workers=1, max_depth=1)
+        monkeypatch.setattr(query, "job_queue", queue)
+        monkeypatch.setattr(query, "_fetch_articles", fetch)
+        assert (await query._enqueue_query(UserQuery(location="Paris"), {})).status_code == 202
+        with pytest.raises(HTTPException) as e:
+            await query._enqueue_query(UserQuery(location="Lyon"), {})
+        assert e.value.status_code == 429 and "Retry-After" in e.value.headers
+
+    asyncio.run(scenario())
+    assert fetched == ["Paris"]
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+from app.services.mongo_vector import bulk_upsert, content_id, normalize_url
+
+
+class FakeCollection:
+    """
+    Just enough of a pymongo collection for `bulk_upsert`.
+    """
+
+    def __init__(self, existing=()):
+        self.docs = {_id: {"_id": _id} for _id in existing}
+        self.ops = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.ops.extend(ops)
+        upserted = {}
+        for n, op in enumerate(ops):
+            _id = op._filter["_id"]
+            if _id not in self.docs:
+                self.docs[_id] = dict(op._doc["$setOnInsert"])
+                upserted[n] = _id
+            for field, value in op._doc.get("$addToSet", {}).items():
+                merged = self.docs[_id].setdefault(field, [])
+                merged.extend(v for v in value["$each"] if v not in merged)
+        return SimpleNamespace(upserted_ids=upserted)
+
+
+def _doc(_id, **fields):
+    return {"_id": _id, "summary": f"summary {_id}", **fields}
+
+
+def test_bulk_upsert_counts_inserted_and_duplicates():
+    target = FakeCollection(existing=["old"])
+    result = bulk_upsert(target, [_doc("a"), _doc("b"), _doc("old")])
+    assert result == {"inserted": 2, "duplicates": 1, "errors": 0, "inserted_ids": ["a", "b"], "failed": []}
+
+
+def test_bulk_upsert_sends_repeated_ids_once():
+    target = FakeCollection()
+    result = bulk_upsert(target, [_doc("a"), _doc("a"), _doc("b")])
+    assert len(target.ops) == 2
+    assert result["inserted"] == 2 and result["duplicates"] == 1
+
+
+def test_bulk_upsert_empty():
+    target = FakeCollection()
+    assert bulk_upsert(target, [])["inserted"] == 0
+    assert target.ops == []
+
+
+def test_bulk_upsert_merges_syndicated_sources_into_stored_story():
+    target = FakeCollection()
+    bulk_upsert(target, [_doc("a", syndicated_sources=["https://one.example/story"])])
+    bulk_upsert(target, [_doc("a", syndicated_sources=["https://one.example/story", "https://two.example/story"])])
+    assert target.docs["a"]["syndicated_sources"] == ["https://one.example/story", "https://two.example/story"]
+    assert "syndicated_sources" not in target.ops[-1]._doc["$setOnInsert"]
+
+
+def test_bulk_upsert_reports_failed_documents():
+    class FailingCollection:
+        def bulk_write(self, ops, ordered=True):
+            raise BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "too large"}],
+                                  "upserted": [{"index": 0, "_id": "a"}]})
+
+    # Op 1 is "b"; both copies of it failed
+    result = bulk_upsert(FailingCollection(), [_doc("a"), _doc("b"), _doc("b"), _doc("c")])
+    assert result == {"inserted": 1, "duplicates": 1, "errors": 1, "inserted_ids": ["a"], "failed": [1, 2]}
+
+
+def test_normalize_url_drops_tracking_params():
+    assert normalize_url("https://news.example/a?id=7&utm_source=x&fbclid=1&gclid=2&ocid=3") \
+        == "https://news.example/a?id=7"
+
+
+def test_normalize_url_drops_fragment_and_trailing_slash():
+    assert normalize_url("  HTTPS://News.Example/world/story/#comments ") == "https://news.example/world/story"
+
+
+def test_normalize_url_keeps_meaningful_query_and_path_case():
+    assert normalize_url("https://news.example/Story?page=2&q=") == "https://news.example/Story?page=2&q="
+    assert normalize_url("") == ""
+
+
+def test_content_id_matches_trivially_different_links():
+    base = {"location": "Paris", "raw_title": "Flood hits  Paris", "source_url": "https://news.example/a"}
+    variant = {"location": "paris", "raw_title": "flood hits paris",
+               "source_url": "https://NEWS.example/a/?utm_medium=social#top"}
+    assert content_id(base) == content_id(variant)
+
+
+def test_content_id_separates_stories_and_locations():
+    base = {"location": "Paris", "raw_title": "Flood hits Paris", "source_url": "https://news.example/a"}
+    assert content_id(base) != content_id({**base, "source_url": "https://news.example/b"})
+    assert content_id(base) != content_id({**base, "raw_title": "Fire in Paris"})
+    assert content_id(base) != content_id({**base, "location": "Lyon"})
@@ -0,0 +1,96 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.services import sentiment
+from app.services.sentiment import _length_buckets, _run_model
+
+LABELS = ["anger", "disgust", "fear", "joy", "sadness", "surprise"]
+
+
+class StubTokenizer:
+    """
+    One token per word plus [CLS] / [SEP]; `pad` pads to the longest row.
+    """
+
+    def __call__(self, texts, truncation=True):
+        ids = [[101] + [len(word) for word in text.split()] + [102] for text in texts]
+        return {"input_ids": ids, "attention_mask": [[1] * len(row) for row in ids]}
+
+    def pad(self, rows, return_tensors="pt"):
+        width = max(len(row["input_ids"]) for row in rows)
+        return {key: torch.tensor([row[key] + [0] * (width - len(row[key])) for row in rows])
+                for key in rows[0]}
+
+
+class StubModel:
+    """
+    Picks label (number of tokens % 6), so every result can be traced back
+    to its input; records the padded shape of each call.
+    """
+
+    config = SimpleNamespace(id2label=dict(enumerate(LABELS)))
+
+    def __init__(self):
+        self.shapes = []
+
+    def __call__(self, input_ids, attention_mask):
+        self.shapes.append(tuple(input_ids.shape))
+        lengths = attention_mask.sum(dim=1)
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(lengths % 6, len(LABELS)).float() * 5)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    stub = StubModel()
+    monkeypatch.setattr(sentiment, "_get_tokenizer", StubTokenizer)
+    monkeypatch.setattr(sentiment, "_get_model", lambda: stub)
+    sentiment._get_labels.cache_clear()
+    yield stub
+    sentiment._get_labels.cache_clear()
+
+
+def _text(words):
+    return " ".join(["word"] * words)
+
+
+def test_buckets_stay_within_budget():
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 60) for _ in range(200)]
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    chunks = list(_length_buckets(order, lengths, token_budget=256))
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(len(lengths)))
+    for chunk in chunks:
+        assert len(chunk) * max(lengths[i] for i in chunk) <= 256
+
+
+def test_text_longer_than_budget_gets_its_own_chunk():
+    lengths = [5, 500, 6, 7]
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    assert list(_length_buckets(order, lengths, token_budget=64)) == [[0, 2, 3], [1]]
+
+
+def test_run_model_keeps_input_order(model):
+    rng = random.Random(1)
+    words = [rng.randint(1, 40) for _ in range(50)]
+    results = _run_model([_text(n) for n in words], token_budget=128)
+    # The stub's label is (tokens % 6), with tokens = words + 2
+    assert [r["emotion"] for r in results] == [LABELS[(n + 2) % 6] for n in words]
+    for batch_size, width in model.shapes:
+        assert batch_size * width <= 128 or batch_size == 1
+
+
+def test_run_model_runs_oversized_text_alone(model):
+    results = _run_model([_text(3), _text(200), _text(4)], token_budget=64)
+    assert [r["emotion"] for r in results] == [LABELS[5 % 6], LABELS[202 % 6], LABELS[6 % 6]]
+    assert sorted(model.shapes) == [(1, 202), (2, 6)]
+
+
+def test_run_model_keeps_blank_texts_in_place(model):
+    results = _run_model(["", _text(2), "   "], token_budget=64)
+    assert len(results) == 3
+    assert results[1]["emotion"] == LABELS[4]
+    assert set(results[0]["scores"]) == set(LABELS)
@@ -0,0 +1,121 @@
+import pytest
+
+from app.services import summarizer
+
+
+@pytest.fixture(scope="module")
+def tiny_bart(tmp_path_factory):
+    """
+    A tiny random BART with a word-level vocab, saved like a hub checkpoint.
+    """
+    torch = pytest.importorskip("torch")
+    from transformers import BartConfig, BartForConditionalGeneration, BertTokenizerFast
+
+    root = tmp_path_factory.mktemp("bart")
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "."] + "the river flooded city council met on tuesday".split()
+    (root / "vocab.txt").write_text("\n".join(vocab))
+    torch.manual_seed(0)
+    model = BartForConditionalGeneration(BartConfig(
+        vocab_size=len(vocab), d_model=16, encoder_layers=1, decoder_layers=1, encoder_attention_heads=2,
+        decoder_attention_heads=2, encoder_ffn_dim=32, decoder_ffn_dim=32, max_position_embeddings=128,
+        pad_token_id=0, bos_token_id=2, eos_token_id=3, decoder_start_token_id=2, forced_eos_token_id=3))
+    model.save_pretrained(root)
+    # Loaded from the directory: transformers 5 ignores the `vocab_file` argument
+    BertTokenizerFast.from_pretrained(root, model_max_length=64).save_pretrained(root)
+    return str(root)
+
+
+@pytest.fixture
+def local_model(monkeypatch, tiny_bart):
+    monkeypatch.setattr(summarizer, "LOCAL_MODEL_NAME", tiny_bart)
+    summarizer._local_summarizer.cache_clear()
+    yield tiny_bart
+    summarizer._local_summarizer.cache_clear()
+
+
+def test_local_summarizer_falls_back_without_the_pipeline_task(local_model, monkeypatch):
+    from transformers import pipelines
+
+    monkeypatch.delitem(pipelines.SUPPORTED_TASKS, "summarization", raising=False)
+    local = summarizer._local_summarizer()
+    assert isinstance(local, summarizer._Seq2SeqSummarizer)
+
+    results = local(["the river flooded the city.", "city council met on tuesday."], truncation=True, max_length=8)
+    assert len(results) == 2
+    assert all(set(r) == {"summary_text"} and isinstance(r["summary_text"], str) for r in results)
+    assert len(local("the river flooded.")) == 1
+
+
+def test_local_summarizer_uses_the_pipeline_when_supported(local_model, monkeypatch):
+    import transformers
+    from transformers import pipelines
+
+    calls = []
+    monkeypatch.setitem(pipelines.SUPPORTED_TASKS, "summarization", {})
+    monkeypatch.setattr(transformers, "pipeline", lambda task, model: calls.append((task, model)) or "pipeline")
+    assert summarizer._local_summarizer() == "pipeline"
+    assert calls == [("summarization", local_model)]
+
+
+def _tokens(n):
+    return " ".join(["word"] * n)
+
+
+@pytest.mark.parametrize("tokens, route", [
+    (summarizer.SUMMARY_PASSTHROUGH_TOKENS, "passthrough"),
+    (summarizer.SUMMARY_PASSTHROUGH_TOKENS + 1, "extractive"),
+    (summarizer.SUMMARY_ABSTRACTIVE_TOKENS, "extractive"),
+    (summarizer.SUMMARY_ABSTRACTIVE_TOKENS + 1, "abstractive"),
+])
+def test_route_boundaries(tokens, route):
+    assert summarizer.approx_tokens(_tokens(tokens)) == tokens
+    assert summarizer.route_for(_tokens(tokens)) == route
+
+
+def test_approx_tokens_counts_punctuation():
+    assert summarizer.approx_tokens("Floods hit Delhi, again.") == 6
+
+
+def test_batch_sends_only_long_texts_to_the_model(monkeypatch):
+    seen = []
+    monkeypatch.setattr(summarizer, "_summarize_many", lambda texts: seen.extend(texts) or ["model"] * len(texts))
+    short, medium, long = _tokens(10), _tokens(200), _tokens(summarizer.SUMMARY_ABSTRACTIVE_TOKENS + 1)
+    summaries = summarizer.summarize_batch([long, short, medium])
+    assert summaries == ["model", short, medium]  # one "sentence" is its own extractive summary
+    assert seen == [long]
+
+
+STORY = (
+    "Heavy rain flooded the river district of Delhi on Tuesday. "
+    "A local bakery reopened after renovations. "
+    "Rescue teams evacuated residents as the river flooded more streets. "
+    "Dr. Rao said the flooded river district needs rescue boats. "
+    "The city council will meet about the river flooding and rescue funding. "
+    "A football match was postponed."
+)
+
+
+def test_split_sentences_keeps_titles_attached():
+    sentences = summarizer.split_sentences(STORY)
+    assert len(sentences) == 6
+    assert sentences[3].startswith("Dr. Rao said")
+
+
+@pytest.mark.parametrize("max_sentences", [1, 2, 3, 5])
+def test_extractive_summary_keeps_sentence_order(max_sentences):
+    sentences = summarizer.split_sentences(STORY)
+    picked = summarizer.split_sentences(summarizer.extractive_summary(STORY, max_sentences))
+    assert len(picked) == max_sentences
+    positions = [sentences.index(s) for s in picked]
+    assert positions == sorted(positions)
+
+
+def test_extractive_summary_prefers_central_sentences():
+    picked = summarizer.split_sentences(summarizer.extractive_summary(STORY, 3))
+    assert "A local bakery reopened after renovations." not in picked
+    assert "A football match was postponed." not in picked
+
+
+def test_extractive_summary_returns_short_texts_whole():
+    text = "One sentence here. Another one there."
+    assert summarizer.extractive_summary(text, 3) == text
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("vertexai")
+
+from app.services import summarizer
+from app.utils.rate_limit import RateLimitedExecutor
+
+FILLER = " ".join(["word"] * 450)  # long enough for the abstractive route
+
+
+class FakeGemini:
+    """
+    Local stand-in for Vertex AI `generateContent`. Each summary echoes the
+    item id from the prompt. `failures` maps an item id to the statuses its
+    first attempts get (then 200); the peak number of concurrent calls is kept.
+    """
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.failures = {}
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                prompt = body["contents"][0]["parts"][0]["text"]
+                item_id = prompt.split("Article:\n", 1)[-1].split(" ", 1)[0]
+                with fake._lock:
+                    fake.calls += 1
+                    fake.in_flight += 1
+                    fake.peak_in_flight = max(fake.peak_in_flight, fake.in_flight)
+                    pending = fake.failures.get(item_id)
+                    status = pending.pop(0) if pending else 200
+                try:
+                    time.sleep(fake.latency)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+                if status != 200:
+                    return self._reply(status, {"error": {"code": status, "message": "fake failure"}})
+                self._reply(200, {"candidates": [{
+                    "content": {"role": "model", "parts": [{"text": f"{item_id} summary"}]},
+                    "finishReason": "STOP",
+                }]})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    server = FakeGemini()
+    monkeypatch.setenv("GCP_PROJECT_ID", "fake-project")
+    monkeypatch.setattr(summarizer, "USE_GEMINI", True)
+    monkeypatch.setattr(summarizer, "GEMINI_API_ENDPOINT", server.url)
+    monkeypatch.setattr(summarizer, "SUMMARY_LOCAL_FALLBACK", False)
+    summarizer._gemini_model.cache_clear()
+    yield server
+    summarizer._gemini_model.cache_clear()
+    server.close()
+
+
+def _use_executor(monkeypatch, **options):
+    executor = RateLimitedExecutor("gemini-test", summarizer._gemini_summary, max_retries=3, backoff_base=0.01,
+                                   backoff_max=0.05, is_retryable=summarizer._is_retryable, **options)
+    monkeypatch.setattr(summarizer, "_gemini_executor", executor)
+    return executor
+
+
+def _texts(n):
+    return [f"item-{i} {FILLER}" for i in range(n)]
+
+
+def test_batch_results_keep_input_order(gemini, monkeypatch):
+    _use_executor(monkeypatch, max_in_flight=8)
+    summaries = summarizer.summarize_batch(_texts(20))
+    assert summaries == [f"item-{i} summary" for i in range(20)]
+
+
+def test_503_and_429_are_retried(gemini, monkeypatch):
+    executor = _use_executor(monkeypatch, max_in_flight=4)
+    gemini.failures = {"item-1": [503], "item-3": [429, 503]}
+    summaries = summarizer.summarize_batch(_texts(5))
+    assert summaries == [f"item-{i} summary" for i in range(5)]
+    stats = executor.stats()
+    assert stats["retries"] == 3 and stats["failed_items"] == 0
+    assert gemini.calls == 8
+
+
+def test_items_failing_every_retry_are_marked(gemini, monkeypatch):
+    executor = _use_executor(monkeypatch, max_in_flight=4)
+    gemini.failures = {"item-2": [503] * 4, "item-4": [400]}
+    summaries = summarizer.summarize_batch(_texts(5))
+    assert summaries[2].startswith("[Summarization failed") and summaries[4].startswith("[Summarization failed")
+    assert [summaries[i] for i in (0, 1, 3)] == ["item-0 summary", "item-1 summary", "item-3 summary"]
+    assert executor.stats()["failed_items"] == 2
+    assert gemini.calls == 5 + 3  # the 400 is not retried
+
+
+def test_in_flight_cap_is_respected(gemini, monkeypatch):
+    _use_executor(monkeypatch, max_in_flight=3)
+    summarizer.summarize_batch(_texts(12))
+    assert gemini.peak_in_flight == 3
+
+
+def test_rate_limit_bounds_achieved_rps(gemini, monkeypatch):
+    items, rate, burst = 24, 40.0, 4
+    executor = _use_executor(monkeypatch, max_in_flight=8, rate=rate, burst=burst)
+    summarizer.summarize_batch(_texts(items))
+    achieved = executor.stats()["achieved_rps"]
+    # At most `burst` calls up front, then `rate` per second
+    assert achieved <= items / ((items - burst) / rate) * 1.05
+    # Still well above one call at a time (latency 0.05 s: 20 calls/s)
+    assert achieved > 1 / gemini.latency